@@ -110,8 +110,8 @@ def wait_some_time():
 
     now = datetime.now()
 
-    # 秒杀时间段使用适中间隔（防风控）
-    if 11 <= now.hour <= 12 and 55 <= now.minute <= 35:
+    # 秒杀时间段（11:55-12:35）使用适中间隔（防风控）
+    if (now.hour == 11 and now.minute >= 55) or (now.hour == 12 and now.minute <= 35):
         # 秒杀时间：100-500ms随机间隔（安全范围）
         base_interval = random.randint(100, 500) / 1000
         # 添加随机波动，模拟人类行为
@@ -0,0 +1,174 @@
+# -*- coding:utf-8 -*-
+"""
+asyncio抢购引擎
+在一个事件循环中同时进行多个抢购尝试（结算页 -> init.action -> submitOrder），共享同一个Session与Cookie，
+无需为并发而启动多个进程
+"""
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from maotai.jd_logger import logger
+
+
+class AsyncSeckillEngine(object):
+    """
+    asyncio抢购引擎
+    - 并发数固定为concurrency个尝试，每个尝试内部的请求仍按顺序执行
+    - requests是阻塞库，请求在专用线程池中执行；超过request_timeout的步骤不再等待，本次尝试重新开始
+    - 已发出的下单请求无法撤回：超时后仍在后台等待其结果，成功时同样记为抢购成功
+    - 配置了attempt_scheduler时，每次尝试前领取时间槽并等待到该时刻，使尝试均匀分布在抢购窗口内
+    - 任一尝试下单成功后立即停止新的尝试与新的下单请求；结束前等待已发出的下单请求返回
+      （已成功时最多request_timeout秒，仅用于发现重复订单；未成功时最多drain_timeout秒）
+    - run的返回值与submit_seckill_order一致：成功True，失败False
+    """
+
+    def __init__(self, seckill, concurrency=8, max_attempts=200, duration=120.0, request_timeout=5.0,
+                 drain_timeout=10.0, stop_event=None, attempt_scheduler=None):
+        """
+        :param seckill: JdSeckill，需已调用request_seckill_url
+        :param concurrency: 同时进行的抢购尝试数，不应超过连接池大小
+        :param max_attempts: 最多尝试次数
+        :param duration: 最长抢购时间(秒)
+        :param request_timeout: 每个步骤（结算页、下单）的超时时间(秒)
+        :param drain_timeout: 未成功时等待已发出的下单请求返回的最长时间(秒)
+        :param stop_event: 与seckill共享的停止事件（JdSeckill.stop_event），下单成功时设置，设置后不再发起新的尝试
+        :param attempt_scheduler: coordination.AttemptScheduler，为None时尝试之间不等待
+        """
+        self.seckill = seckill
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.duration = duration
+        self.request_timeout = request_timeout
+        self.drain_timeout = drain_timeout
+        self.attempt_scheduler = attempt_scheduler
+        self.attempts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.success = False
+        self.successes = 0  # 下单成功的请求数，大于1说明已发出的下单请求在第一次成功后也成功了
+        self._executor = None
+        self._done = None
+        self._deadline = None
+        self._loop = None
+        # 下单成功或抢购结束后设置，工作线程在发出下单请求前检查
+        self._stop = stop_event if stop_event is not None else threading.Event()
+        self._submits = set()  # 尚未返回的下单请求
+        self._lock = threading.Lock()
+
+    def run(self):
+        """
+        阻塞运行直到下单成功、达到尝试次数上限或超过最长抢购时间
+        :return: 抢购结果 True/False
+        """
+        return asyncio.run(self._run())
+
+    async def _run(self):
+        loop = self._loop = asyncio.get_running_loop()
+        # 超时不再等待的请求仍会占用线程直到requests返回，线程数留出余量
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency * 2, thread_name_prefix='seckill')
+        self._done = asyncio.Event()
+        self._deadline = loop.time() + self.duration
+        start = time.perf_counter()
+
+        workers = [asyncio.create_task(self._attempt_loop()) for _ in range(self.concurrency)]
+        all_finished = asyncio.gather(*workers, return_exceptions=True)
+        succeeded = asyncio.create_task(self._done.wait())
+        try:
+            await asyncio.wait([all_finished, succeeded], timeout=self.duration,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # 成功或超时后不再发出新的下单请求，取消所有仍在进行的尝试
+            self._stop.set()
+            for task in workers + [succeeded]:
+                task.cancel()
+            await asyncio.gather(all_finished, succeeded, return_exceptions=True)
+            await self._drain_submits()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.info('asyncio抢购引擎结束：{}，并发 {}，尝试 {} 次，超时 {} 次，异常 {} 次，耗时 {:.2f}秒'.format(
+            '成功' if self.success else '未成功', self.concurrency, self.attempts, self.timeouts, self.errors,
+            time.perf_counter() - start))
+        if self.successes > 1:
+            logger.warning(f'已发出的下单请求共成功 {self.successes} 次，请检查是否产生重复订单')
+        return self.success
+
+    async def _drain_submits(self):
+        """等待已发出的下单请求返回，其结果由_on_submit_done记录"""
+        with self._lock:
+            pending = [asyncio.wrap_future(future) for future in self._submits]
+        if not pending:
+            return
+        _, not_done = await asyncio.wait(
+            pending, timeout=self.request_timeout if self.success else self.drain_timeout)
+        if not_done:
+            logger.warning(f'仍有 {len(not_done)} 个已发出的下单请求未返回，结果将在返回后记录到日志')
+
+    async def _call(self, func):
+        """在线程池中执行一个阻塞步骤，超过request_timeout抛出asyncio.TimeoutError（请求本身继续执行）"""
+        return await asyncio.wait_for(self._loop.run_in_executor(self._executor, func), self.request_timeout)
+
+    async def _submit(self):
+        """
+        发出下单请求；超过request_timeout抛出asyncio.TimeoutError，但请求的结果仍由_on_submit_done记录
+        :return: 下单结果 True/False
+        """
+        future = self._executor.submit(self._submit_order)
+        with self._lock:
+            self._submits.add(future)
+        future.add_done_callback(self._on_submit_done)
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.request_timeout)
+
+    def _submit_order(self):
+        """在工作线程中执行：抢购已结束时不再发出下单请求"""
+        if self._stop.is_set():
+            return False
+        return self.seckill.submit_seckill_order()
+
+    def _on_submit_done(self, future):
+        """下单请求返回时调用（在工作线程中），超时后才返回的成功结果同样生效"""
+        with self._lock:
+            self._submits.discard(future)
+        if future.cancelled() or future.exception() is not None or not future.result():
+            return
+        with self._lock:
+            self.successes += 1
+            late = self._stop.is_set()
+        self.success = True
+        self._stop.set()
+        if late:
+            logger.warning('抢购结束后返回的下单请求成功')
+        try:
+            self._loop.call_soon_threadsafe(self._done.set)
+        except RuntimeError:
+            # 事件循环已结束，结果只记录在日志中
+            pass
+
+    async def _attempt_loop(self):
+        loop = asyncio.get_running_loop()
+        while not self._stop.is_set():
+            if self.attempts >= self.max_attempts or loop.time() >= self._deadline:
+                return
+            if self.attempt_scheduler is not None:
+                # 等待到共享调度器分配的时间槽
+                await asyncio.sleep(self.attempt_scheduler.claim())
+                if self._stop.is_set():
+                    return
+            self.attempts += 1
+            try:
+                await self._call(self.seckill.request_seckill_checkout_page)
+                result = await self._submit()
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.info(f'抢购请求超过 {self.request_timeout} 秒未返回，放弃本次尝试')
+                continue
+            except Exception as e:
+                self.errors += 1
+                wait_time = self.seckill.smart_error_handler(str(e))
+                if wait_time > 0:
+                    await asyncio.sleep(wait_time)
+                continue
+
+            if result:
+                return
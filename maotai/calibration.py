@@ -0,0 +1,243 @@
+# -*- coding:utf-8 -*-
+"""
+抢购时序记录与闭环校准
+每次抢购把每个请求的计划触发时刻、实际发送时刻、服务器Date和resultCode追加到历史文件，
+下次抢购根据历史数据自动推导提前量和时间差修正量
+"""
+import os
+import json
+import math
+import statistics
+import threading
+import email.utils
+
+from maotai.jd_logger import logger
+from maotai.timer import narrow_offset
+
+HISTORY_FILE = './campaigns/timing_history.jsonl'
+
+# 历史文件保留的抢购次数，也是校准使用的抢购次数
+MAX_CAMPAIGNS = 5
+
+# 每次抢购最早发出的若干个请求视为首轮请求，用于估计抢购高峰时的单向延迟
+FIRST_WAVE_SIZE = 5
+
+# 发往marathon.jd.com的请求阶段；itemko.jd.com的抢购链接轮询(seckill_url)往返耗时不同，不与其混在一起估计
+MARATHON_STAGES = ('seckill_page', 'checkout', 'init', 'submit')
+
+# 触发后第一个请求是itemko.jd.com的抢购链接轮询，提前量按该阶段的单向延迟估计
+TRIGGER_STAGES = ('seckill_url',)
+TRIGGER_URL = 'https://itemko.jd.com/'
+
+
+def parse_http_date_ms(value):
+    """
+    解析HTTP Date头
+    :return: 毫秒时间戳，无法解析返回None
+    """
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() * 1000.0
+    except (TypeError, ValueError):
+        return None
+
+
+class CampaignRecorder(object):
+    """
+    记录一次抢购中每个请求的时序数据
+    时间均为Timer推算的京东毫秒时间；抢购窗口内只缓存在内存中，不做文件操作，
+    抢购结束（JdSeckill._finish_campaign）或下一次抢购开始时才追加写入历史文件
+    """
+
+    def __init__(self, history_file=HISTORY_FILE):
+        self.history_file = history_file
+        self.campaign = None
+        self.meta = dict()
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def begin(self, timer, sku_id, lead_info=None):
+        """
+        开始一次抢购的记录
+        :param timer: Timer
+        :param sku_id: 商品ID
+        :param lead_info: JdSeckill.trigger_lead_info
+        """
+        self.flush()
+        self.campaign = '{}-{}'.format(timer.buy_time.strftime('%Y%m%d%H%M%S'), sku_id)
+        self.meta = {
+            'campaign': self.campaign,
+            'pid': os.getpid(),
+            'buy_time_ms': timer.buy_time_ms,
+            'lead_ms': timer.lead_ms,
+            'diff_time': timer.diff_time,
+            'correction_ms': timer.correction_ms,
+            'one_way_ms': (lead_info or {}).get('one_way_ms'),
+        }
+
+    def record(self, stage, intended_ms, send_ms, recv_ms, server_date=None, result_code=None):
+        """
+        记录一个请求
+        :param stage: 请求阶段，如 seckill_url / checkout / init / submit
+        :param intended_ms: 计划触发时刻
+        :param send_ms: 实际发送时刻
+        :param recv_ms: 收到响应时刻
+        :param server_date: 响应的Date头
+        :param result_code: 下单接口返回的resultCode
+        :return: 记录dict，可在解析响应后补充result_code
+        """
+        if self.campaign is None:
+            return dict()
+        item = dict(self.meta)
+        item.update({
+            'stage': stage,
+            'intended_ms': intended_ms,
+            'send_ms': send_ms,
+            'recv_ms': recv_ms,
+            'server_date_ms': parse_http_date_ms(server_date),
+            'result_code': result_code,
+        })
+        # 调用方随后补充的result_code在写出时一并保存
+        with self._lock:
+            self._buffer.append(item)
+        return item
+
+    def flush(self):
+        """把缓存的记录追加写入历史文件"""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records:
+            return
+        try:
+            directory = os.path.dirname(self.history_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        except Exception as e:
+            logger.warning(f'保存抢购时序记录失败: {e}')
+
+
+def _read_campaigns(history_file):
+    """:return: 按抢购从旧到新排列的 [(campaign, [记录, ...]), ...]"""
+    if not os.path.exists(history_file):
+        return []
+    campaigns = dict()
+    with open(history_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            campaigns.setdefault(item.get('campaign'), []).append(item)
+    return sorted(campaigns.items(), key=lambda kv: kv[0] or '')
+
+
+def load_history(history_file=HISTORY_FILE, max_campaigns=MAX_CAMPAIGNS):
+    """
+    读取最近几次抢购的时序记录
+    :return: [(campaign, [记录, ...]), ...]，按时间从旧到新排列
+    """
+    return _read_campaigns(history_file)[-max_campaigns:]
+
+
+def trim_history(history_file=HISTORY_FILE, max_campaigns=MAX_CAMPAIGNS):
+    """
+    历史文件只保留最近max_campaigns次抢购；在抢购开始前由主进程调用，此时没有进程在写入
+    :return: 删除的抢购次数
+    """
+    campaigns = _read_campaigns(history_file)
+    removed = len(campaigns) - max_campaigns
+    if removed <= 0:
+        return 0
+    temp_file = '{}.{}.tmp'.format(history_file, os.getpid())
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        for _, records in campaigns[-max_campaigns:]:
+            f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+    os.replace(temp_file, history_file)
+    return removed
+
+
+def _first_wave_one_way(records, stages=MARATHON_STAGES):
+    """
+    首轮请求的单向延迟(ms)列表：取往返耗时的一半
+    :param stages: 只统计这些阶段的请求，使估计的单向延迟对应同一个域名
+    """
+    first_wave = sorted((r for r in records if r.get('stage') in stages), key=lambda r: r['send_ms'])
+    return [(r['recv_ms'] - r['send_ms']) / 2.0 for r in first_wave[:FIRST_WAVE_SIZE]]
+
+
+def _arrival_bounds(records):
+    """
+    由服务器Date头约束时间差误差
+    服务器在[Date, Date+1000)内处理请求，处理时刻位于本地推算的[send, recv]之间，
+    与Timer的Date边沿检测相同，求交集得到 (本地推算京东时间 - 真实服务器时间) 的区间
+    :return: (lower, upper)
+    """
+    lower, upper, min_rtt = -math.inf, math.inf, math.inf
+    for r in records:
+        if r.get('server_date_ms') is None:
+            continue
+        probe = (r['send_ms'], r['recv_ms'], r['server_date_ms'])
+        lower, upper, min_rtt = narrow_offset(probe, lower, upper, min_rtt)
+    return lower, upper
+
+
+def calibrate(history, stages=MARATHON_STAGES):
+    """
+    根据历史抢购推导下次抢购的参数
+    :param history: load_history的返回值
+    :param stages: 估计单向延迟使用的请求阶段，应与提前量针对的域名一致
+    :return: dict
+        one_way_ms: 最近抢购首轮请求(stages)单向延迟的中位数，作为提前量依据，无数据为None
+        offset_correction_ms: 需要加到京东时间推算上的修正量，无法确定为None
+    """
+    result = {'one_way_ms': None, 'offset_correction_ms': None, 'campaigns': len(history)}
+    one_way = []
+    for _, records in history:
+        one_way.extend(_first_wave_one_way(records, stages))
+    if one_way:
+        result['one_way_ms'] = statistics.median(one_way)
+
+    # 取最近一次能确定上下界的抢购；记录中的时间已包含当时的修正量，需在其基础上累加
+    for _, records in reversed(history):
+        lower, upper = _arrival_bounds(records)
+        if lower > upper or math.isinf(lower) or math.isinf(upper):
+            continue
+        previous = records[0].get('correction_ms') or 0.0
+        result['offset_correction_ms'] = previous - (lower + upper) / 2.0
+        result['offset_correction_error_ms'] = (upper - lower) / 2.0
+        break
+    return result
+
+
+def report(history, stages=MARATHON_STAGES):
+    """
+    对比每次抢购预测与实际的请求到达时刻
+    预测到达时刻 = 发送时刻 + 提前量依据的单向延迟；实际到达时刻由服务器Date头给出（秒级区间）
+    :param stages: 实测首轮单向延迟使用的请求阶段，与calibrate一致
+    :return: 报告文本行列表
+    """
+    lines = []
+    for campaign, records in history:
+        dated = [r for r in records if r.get('server_date_ms') is not None]
+        if not dated:
+            lines.append(f'{campaign}: {len(records)}个请求，无服务器Date，无法对比')
+            continue
+        one_way = records[0].get('one_way_ms') or 0.0
+        early, late = 0, 0
+        for r in dated:
+            predicted = r['send_ms'] + one_way
+            if predicted < r['server_date_ms']:
+                early += 1
+            elif predicted >= r['server_date_ms'] + 1000.0:
+                late += 1
+        first_wave = _first_wave_one_way(records, stages)
+        lower, upper = _arrival_bounds(records)
+        lines.append('{}: {}个请求，提前量 {:.1f}ms，预测单向延迟 {:.1f}ms，实测首轮单向延迟 {:.1f}ms，'
+                     '预测到达早于服务器时间 {}个、晚于 {}个，时间差误差区间 [{:.1f}, {:.1f}]ms'.format(
+                        campaign, len(records), records[0].get('lead_ms') or 0.0, one_way,
+                        statistics.median(first_wave) if first_wave else float('nan'),
+                        early, late, lower, upper))
+    return lines
@@ -2,6 +2,9 @@ import os
 import configparser
 import threading
 
+# getRaw未提供默认值时的占位对象
+_UNSET = object()
+
 
 class Config(object):
     def __init__(self, config_file='config.ini'):
@@ -18,9 +21,25 @@ class Config(object):
         with self._lock:
             return self._config.get(section, name)
 
-    def getRaw(self, section, name):
+    def getRaw(self, section, name, fallback=_UNSET):
         with self._lock:
-            return self._configRaw.get(section, name)
+            if fallback is _UNSET:
+                return self._configRaw.get(section, name)
+            return self._configRaw.get(section, name, fallback=fallback)
+
+    def getInt(self, section, name, default):
+        """读取整数配置，缺失或格式错误时返回默认值"""
+        try:
+            return int(self.getRaw(section, name, fallback=default))
+        except (TypeError, ValueError):
+            return default
+
+    def getFloat(self, section, name, default):
+        """读取浮点数配置，缺失或格式错误时返回默认值"""
+        try:
+            return float(self.getRaw(section, name, fallback=default))
+        except (TypeError, ValueError):
+            return default
 
     def reload_config(self):
         """重新加载配置文件"""
@@ -0,0 +1,327 @@
+# -*- coding:utf-8 -*-
+"""
+多进程/多线程抢购协调
+所有抢购进程（线程）共享一个停止事件：任一进程下单成功或到达最后购买时间后立即设置，
+其余进程在阶段之间和等待期间检查该事件并停止抢购；父进程收集每个进程的结果与异常，汇总为一次抢购的结果。
+多进程抢购时子进程在购买时间前完成准备后停在共享的启动闸门上，由父进程在触发时刻统一放行；
+配置了总尝试速率时，所有进程（线程）从共享的时间槽计数器领取各自的尝试时刻，使尝试均匀分布在整个抢购窗口
+"""
+import os
+import time
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from maotai.jd_logger import logger
+from maotai.stats import percentile
+from maotai.worker_context import WorkerContext
+
+# 一次多进程（多线程）抢购的汇总结果
+# success: 是否有进程下单成功；workers: 进程（线程）数；results: 各进程返回的结果dict；
+# errors: 各进程抛出的异常描述；stop_reason: success / deadline / finished；elapsed: 耗时(秒)
+CampaignResult = namedtuple('CampaignResult', ['success', 'workers', 'results', 'errors', 'stop_reason', 'elapsed'])
+
+# 子进程中的共享停止事件、启动闸门与尝试调度器，由进程池的initializer设置
+_worker_stop_event = None
+_worker_start_gate = None
+_worker_attempt_scheduler = None
+
+
+def init_worker(stop_event, start_gate=None, attempt_scheduler=None):
+    """进程池initializer：保存共享停止事件、启动闸门与尝试调度器"""
+    global _worker_stop_event, _worker_start_gate, _worker_attempt_scheduler
+    _worker_stop_event = stop_event
+    _worker_start_gate = start_gate
+    _worker_attempt_scheduler = attempt_scheduler
+
+
+class StartGate(object):
+    """
+    多进程共享的启动闸门
+    子进程准备完成后调用wait停在闸门上：先阻塞等待到触发前spin_ms毫秒，再忙等共享内存中的放行时刻，
+    父进程（唯一的计时者）在触发时刻调用release，所有进程几乎同时被放行；
+    放行时刻与唤醒时刻都取单调时钟（系统范围的时钟，各进程可直接比较），差值即放行偏差
+    """
+
+    def __init__(self, context=None):
+        context = context or multiprocessing.get_context()
+        self._released = context.Event()
+        # 放行时刻(单调时钟ns)，0表示尚未放行；忙等时只读，不加锁
+        self._release_ns = context.RawValue('q', 0)
+        self._ready = context.Value('i', 0)
+
+    @property
+    def ready(self):
+        """已停在闸门上（或已通过闸门）的进程数"""
+        return self._ready.value
+
+    def wait(self, deadline_ns=None, spin_ms=5.0):
+        """
+        停在闸门上直到被放行
+        :param deadline_ns: 预计放行的单调时钟时刻(ns)，在其前spin_ms毫秒开始忙等；None表示只阻塞等待
+        :param spin_ms: 忙等的毫秒数
+        :return: 放行偏差(ms)：本进程被唤醒的时刻减去放行时刻
+        """
+        with self._ready.get_lock():
+            self._ready.value += 1
+        if deadline_ns is not None:
+            timeout = (deadline_ns - int(spin_ms * 1e6) - time.monotonic_ns()) / 1e9
+            if timeout > 0:
+                self._released.wait(timeout)
+            # 计时者超过预计时刻1秒仍未放行时改为阻塞等待，避免长时间占用CPU
+            spin_until_ns = max(deadline_ns, time.monotonic_ns()) + int(1e9)
+            while not self._release_ns.value and time.monotonic_ns() < spin_until_ns:
+                # 让出CPU，进程数多于CPU核数时计时者仍能按时放行
+                time.sleep(0)
+        self._released.wait()
+        return (time.monotonic_ns() - self._release_ns.value) / 1e6
+
+    def release(self):
+        """放行所有停在闸门上的进程，之后到达的进程直接通过"""
+        self._release_ns.value = time.monotonic_ns()
+        self._released.set()
+
+
+class AttemptScheduler(object):
+    """
+    按总尝试速率rate错开各执行单元的尝试时刻
+    - 第一次领取时刻为T，时间槽k的时刻为 T + k/rate；各进程（线程）每次尝试前领取下一个时间槽并等待到该时刻，
+      第一轮领到0、1、2…号槽，即各执行单元的相位依次错开1/rate
+    - 时间槽在领取时才分配，某个执行单元卡在慢请求上时由其他执行单元领取后续时间槽，总速率不变
+    - 领取时已过期超过一个间隔的时间槽直接跳过（计为未覆盖），不集中补发
+    计数器在共享内存中，多进程时需通过进程池的initializer传给子进程
+    """
+
+    def __init__(self, rate, context=None):
+        """
+        :param rate: 所有执行单元合计的每秒尝试次数
+        """
+        context = context or multiprocessing.get_context()
+        self.rate = float(rate)
+        self.interval_ns = int(1e9 / self.rate)
+        # [T(单调时钟ns，0表示尚未开始), 下一个时间槽, 已领取的时间槽数, 跳过的时间槽数, 最后领取的时间槽时刻(ns)]
+        self._state = context.Array('q', 5)
+
+    def claim(self, now_ns=None):
+        """
+        领取下一个时间槽
+        :param now_ns: 当前单调时钟时刻(ns)
+        :return: 需要等待的秒数
+        """
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        with self._state.get_lock():
+            state = self._state
+            if not state[0]:
+                state[0] = now_ns
+            slot = state[1]
+            slot_ns = state[0] + slot * self.interval_ns
+            if now_ns - slot_ns > self.interval_ns:
+                # 跳过已过期的时间槽，领取当前时刻之后的第一个
+                current = -(-(now_ns - state[0]) // self.interval_ns)
+                state[3] += current - slot
+                slot, slot_ns = current, state[0] + current * self.interval_ns
+            state[1] = slot + 1
+            state[2] += 1
+            state[4] = slot_ns
+        return max(0, slot_ns - now_ns) / 1e9
+
+    def summary(self):
+        """
+        :return: {'interval_ms': 目标间隔, 'claimed': 已领取的时间槽数, 'skipped': 跳过的时间槽数,
+                  'coverage': 已领取/(已领取+跳过), 'window_ms': 第一个到最后一个时间槽的时长,
+                  'effective_interval_ms': 实际平均间隔}
+        """
+        with self._state.get_lock():
+            start_ns, _, claimed, skipped, last_ns = self._state[:]
+        window_ms = (last_ns - start_ns) / 1e6 if claimed else 0.0
+        return {
+            'interval_ms': self.interval_ns / 1e6,
+            'claimed': claimed,
+            'skipped': skipped,
+            'coverage': claimed / float(claimed + skipped) if claimed else 0.0,
+            'window_ms': window_ms,
+            'effective_interval_ms': window_ms / (claimed - 1) if claimed > 1 else 0.0,
+        }
+
+    def log_summary(self):
+        """输出抢购窗口的尝试覆盖情况"""
+        summary = self.summary()
+        if not summary['claimed']:
+            return
+        logger.info('⏲️ 尝试调度：目标每 {interval_ms:.1f}ms 一次，实际每 {effective_interval_ms:.1f}ms 一次，'
+                    '共 {claimed} 次，跳过 {skipped} 个时间槽，覆盖率 {coverage:.0%}，窗口 {window_ms:.0f}ms'.format(**summary))
+        if summary['skipped']:
+            logger.warning('部分时间槽因所有执行单元都在等待响应而过期，可降低attempt_rate或增加max_processes')
+
+
+def run_worker(seckill, method_name, *args):
+    """
+    在子进程中执行一次抢购
+    :param seckill: WorkerContext（在子进程中重建JdSeckill），或随任务序列化到子进程的抢购对象
+    :param method_name: 抢购方法名，返回True/False
+    :return: {'worker', 'success', 'stopped', 'elapsed', 'notification', 'release_skew_ms'}，
+             stopped表示因其他进程成功或到达截止时间而停止，notification为下单成功的通知内容，
+             release_skew_ms为从启动闸门放行到本进程被唤醒的毫秒数（未使用闸门时为None）
+    """
+    if isinstance(seckill, WorkerContext):
+        seckill = seckill.build()
+    seckill.stop_event = _worker_stop_event
+    seckill.start_gate = _worker_start_gate
+    seckill.attempt_scheduler = _worker_attempt_scheduler
+    result = _run(getattr(seckill, method_name), args, _worker_stop_event, os.getpid())
+    result['notification'] = getattr(seckill, 'order_notification', None)
+    result['release_skew_ms'] = getattr(seckill, 'release_skew_ms', None)
+    return result
+
+
+def _run(func, args, stop_event, worker):
+    start = time.perf_counter()
+    success = bool(func(*args))
+    if success and stop_event is not None:
+        stop_event.set()
+    return {
+        'worker': worker,
+        'success': success,
+        'stopped': not success and stop_event is not None and stop_event.is_set(),
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+class _Campaign(object):
+    """抢购协调的公共部分：等待第一个成功或截止时间，设置停止事件并汇总结果"""
+
+    # 日志中的执行单元名称
+    unit = '进程'
+
+    def __init__(self, workers, deadline_seconds=None):
+        """
+        :param workers: 进程（线程）数
+        :param deadline_seconds: 从现在起最多抢购的秒数（如距离最后购买时间），None表示不限制
+        """
+        self.workers = max(1, workers)
+        self.deadline_seconds = deadline_seconds
+
+    def _wait(self, futures, stop_event, deadline):
+        """
+        等待第一个成功的结果或截止时间，然后设置停止事件并取消尚未开始的任务
+        :return: 停止原因 success / deadline / finished
+        """
+        stop_reason = 'finished'
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                stop_reason = 'deadline'
+                logger.info(f'已到达最后购买时间，通知所有抢购{self.unit}停止')
+                break
+            if any(not f.exception() and f.result()['success'] for f in done):
+                stop_reason = 'success'
+                break
+        stop_event.set()
+        for future in pending:
+            future.cancel()
+        return stop_reason
+
+    def _collect(self, futures, stop_reason, start):
+        results, errors = [], []
+        for future in futures:
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                # 子进程的堆栈保存在__cause__中
+                detail = '{!r}{}'.format(error, '\n{}'.format(error.__cause__) if error.__cause__ else '')
+                logger.error(f'抢购{self.unit}异常: {detail}')
+                errors.append(repr(error))
+            else:
+                results.append(future.result())
+
+        skews = [item['release_skew_ms'] for item in results if item.get('release_skew_ms') is not None]
+        if skews:
+            logger.info('🚦 启动闸门放行偏差：{} 个{}，p50 {:.3f}ms，最大 {:.3f}ms'.format(
+                len(skews), self.unit, percentile(skews, 50), max(skews)))
+
+        success = any(item['success'] for item in results)
+        result = CampaignResult(success, self.workers, results, errors, stop_reason, time.perf_counter() - start)
+        logger.info('🏁 多{unit}抢购结束：{}，{unit} {} 个，成功 {} 个，被停止 {} 个，异常 {} 个，停止原因 {}，耗时 {:.2f}秒'.format(
+            '成功' if success else '未成功', self.workers, sum(1 for item in results if item['success']),
+            sum(1 for item in results if item['stopped']), len(errors), stop_reason, result.elapsed,
+            unit=self.unit))
+        return result
+
+
+class ProcessCampaign(_Campaign):
+    """
+    多进程抢购
+    - 每个进程执行同一个抢购方法，共享停止事件
+    - 第一个成功的结果或截止时间到达后设置停止事件，并取消尚未开始的任务
+    - 进程抛出的异常被记录到结果中，不再丢失
+    - 传入timer时使用启动闸门：子进程提前创建并完成准备，父进程作为唯一的计时者在触发时刻统一放行
+    """
+
+    def __init__(self, workers, deadline_seconds=None, timer=None, attempt_scheduler=None):
+        """
+        :param timer: 计时用的Timer，在其触发时刻放行子进程；None表示不使用启动闸门
+        :param attempt_scheduler: 所有子进程共享的AttemptScheduler，None表示各进程自行决定尝试间隔
+        """
+        super(ProcessCampaign, self).__init__(workers, deadline_seconds)
+        self.timer = timer
+        self.attempt_scheduler = attempt_scheduler
+
+    def run(self, seckill, method_name, *args):
+        """
+        :param seckill: WorkerContext，或可序列化的抢购对象
+        :param method_name: 抢购方法名
+        :return: CampaignResult
+        """
+        start = time.perf_counter()
+        deadline = start + self.deadline_seconds if self.deadline_seconds is not None else None
+        stop_event = multiprocessing.Event()
+        start_gate = StartGate() if self.timer is not None else None
+
+        with ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                 initargs=(stop_event, start_gate, self.attempt_scheduler)) as pool:
+            futures = [pool.submit(run_worker, seckill, method_name, *args) for _ in range(self.workers)]
+            if start_gate is not None:
+                self._release_at_trigger(start_gate)
+            stop_reason = self._wait(futures, stop_event, deadline)
+        # 退出with时等待仍在执行的进程在下一个阶段边界停止
+        return self._collect(futures, stop_reason, start)
+
+    def _release_at_trigger(self, start_gate):
+        """父进程等待到触发时刻后放行启动闸门"""
+        self.timer.start()
+        start_gate.release()
+        ready = start_gate.ready
+        logger.info(f'🚦 启动闸门放行，已就绪进程 {ready}/{self.workers} 个')
+        if ready < self.workers:
+            logger.warning(f'{self.workers - ready} 个抢购进程在触发时刻仍未完成准备，建议增大seckill_prepare_seconds')
+
+
+class ThreadCampaign(_Campaign):
+    """
+    多线程抢购
+    所有线程共享同一个JdSeckill（Session、Cookie与连接池），停止规则与ProcessCampaign相同
+    """
+
+    unit = '线程'
+
+    def run(self, func, stop_event, *args):
+        """
+        :param func: 抢购函数，返回True/False，需在阶段之间检查stop_event
+        :param stop_event: threading.Event
+        :return: CampaignResult
+        """
+        start = time.perf_counter()
+        deadline = start + self.deadline_seconds if self.deadline_seconds is not None else None
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='seckill') as pool:
+            futures = [pool.submit(self._worker, func, stop_event, args) for _ in range(self.workers)]
+            stop_reason = self._wait(futures, stop_event, deadline)
+        return self._collect(futures, stop_reason, start)
+
+    @staticmethod
+    def _worker(func, stop_event, args):
+        return _run(func, args, stop_event, threading.current_thread().name)
@@ -0,0 +1,273 @@
+# -*- coding:utf-8 -*-
+"""
+基于pycurl(libcurl)的HTTP后端
+requests每次请求都要在Python层合并请求头、处理Cookie策略、执行hooks，抢购开始后的高频下单中这部分开销不可忽略；
+CurlSession把请求交给libcurl执行，同时提供与requests.Session兼容的接口，
+Cookie仍保存在RequestsCookieJar中，get_cookies/set_cookies/save_cookies_to_local的行为不变
+依赖 pycurl（可选），未安装时SpiderSession使用requests
+"""
+import json as complexjson
+import threading
+import email.message
+import urllib.request
+from io import BytesIO
+from collections.abc import Mapping
+from urllib.parse import urlencode, urljoin, urlparse
+
+import pycurl
+import requests
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import certifi
+    CA_BUNDLE = certifi.where()
+except ImportError:
+    CA_BUNDLE = None
+
+# 与requests.Session相同的最大重定向次数
+MAX_REDIRECTS = 30
+
+
+class _CookieResponse(object):
+    """供CookieJar.extract_cookies读取Set-Cookie的最小响应对象"""
+
+    def __init__(self, header_lines):
+        self._message = email.message.Message()
+        for name, value in header_lines:
+            self._message[name] = value
+
+    def info(self):
+        return self._message
+
+
+class CurlResponse(object):
+    """与requests.Response兼容的响应对象（仅包含本项目用到的属性）"""
+
+    def __init__(self, url, status_code, header_lines, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.history = []
+        self.headers = CaseInsensitiveDict()
+        for name, value in header_lines:
+            # 与requests一致：同名响应头以逗号合并
+            self.headers[name] = '{}, {}'.format(self.headers[name], value) if name in self.headers else value
+        self.encoding = requests.utils.get_encoding_from_headers(self.headers) or 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self, **kwargs):
+        return complexjson.loads(self.text, **kwargs)
+
+    def iter_content(self, chunk_size=1024):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class CurlSession(object):
+    """
+    与requests.Session兼容的libcurl会话
+    - 每个线程使用自己的Curl句柄，句柄之间通过CurlShare共享连接缓存、DNS缓存和TLS会话
+    - Cookie由RequestsCookieJar管理，每次请求按jar生成Cookie头，并从响应（包括重定向中间响应）提取Set-Cookie
+    - 重定向在Python层处理，规则与requests相同（303及POST的301/302改为GET）
+    """
+
+    def __init__(self, pool_size=10, pinned_ips=None):
+        """
+        :param pool_size: libcurl连接缓存大小
+        :param pinned_ips: {域名: IP}，建立连接时使用该IP（CURLOPT_RESOLVE），原地更新即可生效
+        """
+        self.pool_size = pool_size
+        self.pinned_ips = pinned_ips if pinned_ips is not None else dict()
+        self.headers = CaseInsensitiveDict()
+        self.cookies = RequestsCookieJar()
+        self._stats = dict()
+        self._stats_lock = threading.Lock()
+        self._init_curl()
+
+    def _init_curl(self):
+        self._local = threading.local()
+        self._share = pycurl.CurlShare()
+        self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+        self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+        self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_CONNECT)
+
+    def __getstate__(self):
+        # 多进程抢购会序列化Session，Curl句柄不能序列化，在子进程中重新创建
+        state = self.__dict__.copy()
+        for key in ('_local', '_share', '_stats_lock'):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._stats_lock = threading.Lock()
+        self._init_curl()
+
+    def _curl(self):
+        curl = getattr(self._local, 'curl', None)
+        if curl is None:
+            curl = pycurl.Curl()
+            self._local.curl = curl
+        else:
+            # 连接缓存保存在CurlShare中，重置句柄选项不影响已建立的连接
+            curl.unsetopt(pycurl.SHARE)
+            curl.reset()
+        curl.setopt(pycurl.SHARE, self._share)
+        curl.setopt(pycurl.MAXCONNECTS, self.pool_size)
+        curl.setopt(pycurl.NOSIGNAL, 1)
+        curl.setopt(pycurl.TCP_NODELAY, 1)
+        curl.setopt(pycurl.TCP_KEEPALIVE, 1)
+        curl.setopt(pycurl.ACCEPT_ENCODING, '')
+        if CA_BUNDLE:
+            curl.setopt(pycurl.CAINFO, CA_BUNDLE)
+        return curl
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        curl = getattr(self._local, 'curl', None)
+        if curl is not None:
+            curl.close()
+            self._local.curl = None
+
+    def request(self, method, url, params=None, data=None, headers=None, allow_redirects=True, timeout=None,
+                json=None, **kwargs):
+        """
+        发送请求，参数与requests.Session.request一致
+        不支持verify、proxies、cookies、stream等其余参数，传入时抛出TypeError，避免被静默忽略
+        :return: CurlResponse
+        """
+        if kwargs:
+            raise TypeError('CurlSession.request() 不支持参数: {}'.format(', '.join(sorted(kwargs))))
+        method = method.upper()
+        if params:
+            url = '{}{}{}'.format(url, '&' if urlparse(url).query else '?', urlencode(params, doseq=True))
+        merged = CaseInsensitiveDict(self.headers)
+        for name, value in (headers or {}).items():
+            if value is None:
+                merged.pop(name, None)
+            else:
+                merged[name] = value
+        body = None
+        if data is not None:
+            if isinstance(data, (Mapping, list, tuple)):
+                body = urlencode(data, doseq=True).encode('utf-8')
+                merged.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+            else:
+                body = data.encode('utf-8') if isinstance(data, str) else data
+        elif json is not None:
+            # 与requests一致：同时传入data时忽略json
+            body = complexjson.dumps(json, allow_nan=False).encode('utf-8')
+            merged.setdefault('Content-Type', 'application/json')
+
+        history = []
+        while True:
+            resp = self._perform(method, url, merged, body, timeout)
+            location = resp.headers.get('Location')
+            if not (allow_redirects and location and resp.status_code in (301, 302, 303, 307, 308)):
+                resp.history = history
+                return resp
+            if len(history) >= MAX_REDIRECTS:
+                raise requests.exceptions.TooManyRedirects('Exceeded {} redirects.'.format(MAX_REDIRECTS))
+            history.append(resp)
+            url = urljoin(url, location)
+            if resp.status_code == 303 or (resp.status_code in (301, 302) and method == 'POST'):
+                method, body = 'GET', None
+                merged.pop('Content-Type', None)
+
+    def _perform(self, method, url, headers, body, timeout):
+        # 由CookieJar按域名、路径、过期时间生成Cookie头，与requests相同
+        cookie_request = urllib.request.Request(url, headers=dict(headers), method=method)
+        self.cookies.add_cookie_header(cookie_request)
+        cookie_header = cookie_request.get_header('Cookie')
+
+        header_lines = []
+        status = [0]
+
+        def on_header(line):
+            line = line.decode('iso-8859-1').rstrip('\r\n')
+            if line.startswith('HTTP/'):
+                # 新的状态行（如100 Continue之后的最终响应），丢弃之前的响应头
+                del header_lines[:]
+                status[0] = int(line.split(' ', 2)[1])
+            elif ':' in line:
+                name, value = line.split(':', 1)
+                header_lines.append((name.strip(), value.strip()))
+
+        buffer = BytesIO()
+        curl = self._curl()
+        curl.setopt(pycurl.URL, url)
+        parsed = urlparse(url)
+        pinned_ip = self.pinned_ips.get(parsed.hostname)
+        if pinned_ip:
+            # 只替换连接地址，SNI、Host头和证书校验仍使用域名
+            curl.setopt(pycurl.RESOLVE, ['{}:{}:{}'.format(
+                parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                '[{}]'.format(pinned_ip) if ':' in pinned_ip else pinned_ip)])
+        curl.setopt(pycurl.HEADERFUNCTION, on_header)
+        curl.setopt(pycurl.WRITEDATA, buffer)
+        if method == 'HEAD':
+            curl.setopt(pycurl.NOBODY, 1)
+        elif method == 'POST':
+            curl.setopt(pycurl.POST, 1)
+            curl.setopt(pycurl.POSTFIELDS, body or b'')
+        elif method != 'GET':
+            curl.setopt(pycurl.CUSTOMREQUEST, method)
+            if body is not None:
+                curl.setopt(pycurl.POSTFIELDS, body)
+        request_headers = ['{}: {}'.format(k, v) for k, v in headers.items()]
+        if cookie_header:
+            request_headers.append('Cookie: {}'.format(cookie_header))
+        # 禁止libcurl对POST自动发送Expect: 100-continue，多一次往返
+        request_headers.append('Expect:')
+        curl.setopt(pycurl.HTTPHEADER, request_headers)
+        if timeout:
+            connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            curl.setopt(pycurl.CONNECTTIMEOUT_MS, int(connect_timeout * 1000))
+            curl.setopt(pycurl.TIMEOUT_MS, int((connect_timeout + read_timeout) * 1000))
+
+        try:
+            curl.perform()
+        except pycurl.error as e:
+            code, message = e.args[0], e.args[1] if len(e.args) > 1 else ''
+            if code == pycurl.E_OPERATION_TIMEDOUT:
+                raise requests.exceptions.Timeout('Timeout: {}'.format(message))
+            if code in (pycurl.E_COULDNT_CONNECT, pycurl.E_COULDNT_RESOLVE_HOST, pycurl.E_SEND_ERROR,
+                        pycurl.E_RECV_ERROR, pycurl.E_GOT_NOTHING):
+                raise requests.exceptions.ConnectionError('ConnectionError: {}'.format(message))
+            raise requests.exceptions.RequestException('curl error {}: {}'.format(code, message))
+
+        self._count(parsed.hostname, curl.getinfo(pycurl.NUM_CONNECTS))
+        self.cookies.extract_cookies(_CookieResponse(header_lines), cookie_request)
+        return CurlResponse(url, status[0], header_lines, buffer.getvalue())
+
+    def _count(self, host, new_connections):
+        with self._stats_lock:
+            item = self._stats.setdefault(host, {'connections': 0, 'requests': 0, 'reused': 0})
+            item['connections'] += new_connections
+            item['requests'] += 1
+            item['reused'] += 0 if new_connections else 1
+
+    def connection_stats(self):
+        """
+        每个域名的连接复用统计，格式与TunedHTTPAdapter.connection_stats一致
+        :return: {host: {'connections': 新建连接数, 'requests': 请求数, 'reused': 复用连接的请求数}}
+        """
+        with self._stats_lock:
+            return {host: dict(item) for host, item in self._stats.items()}
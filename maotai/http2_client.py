@@ -0,0 +1,89 @@
+# -*- coding:utf-8 -*-
+"""
+HTTP/2抢购客户端
+抢购关键路径（结算页、init.action、下单）的所有并发请求通过1~2个HTTP/2连接多路复用，
+N个并发尝试不再需要N个连接与N次握手；服务器不支持HTTP/2时自动回退到requests(HTTP/1.1)
+依赖 httpx[http2]（可选），未安装时同样回退
+"""
+import logging
+from urllib.parse import urlparse
+
+from maotai.jd_logger import logger
+from maotai.transport import tuned_socket_options
+
+
+class Http2Client(object):
+    """
+    基于httpx的HTTP/2客户端
+    与requests.Session共享同一个cookie jar，响应中的Set-Cookie对两者同时生效；
+    request的参数与返回的响应对象和requests兼容（text、headers、status_code、json()）
+    """
+
+    def __init__(self, session, hosts, timeout=5.0, http1=True):
+        """
+        :param session: requests.Session，共享其请求头与cookie jar
+        :param hosts: 走HTTP/2的域名，每个域名一个连接，所有并发请求在该连接上多路复用
+        :param timeout: 请求超时(秒)
+        :param http1: 是否允许通过ALPN协商回退到HTTP/1.1；为False时直接使用明文HTTP/2(h2c)，仅用于本地测试
+        """
+        self.session = session
+        self.hosts = set(hosts)
+        self.timeout = timeout
+        self.http1 = http1
+        self.client = None
+        self.http_version = None
+
+    def open(self, probe_urls):
+        """
+        建立HTTP/2连接并确认协商结果
+        :param probe_urls: 用于建立连接的地址，每个域名一个
+        :return: 协商到HTTP/2返回True，否则关闭客户端并返回False（调用方继续使用requests）
+        """
+        try:
+            import httpx
+        except ImportError:
+            logger.warning('未安装httpx[http2]，HTTP/2模式不可用，使用HTTP/1.1')
+            return False
+        # httpx默认每个请求输出一条INFO日志，抢购路径上不需要
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+
+        try:
+            # 多路复用时小帧频繁，必须关闭Nagle算法，否则与延迟确认叠加会产生数十毫秒的停顿
+            transport = httpx.HTTPTransport(http2=True, http1=self.http1, socket_options=tuned_socket_options())
+            self.client = httpx.Client(
+                transport=transport,
+                cookies=self.session.cookies,
+                headers=dict(self.session.headers),
+                timeout=self.timeout)
+            versions = set(self.client.head(url).http_version for url in probe_urls)
+            self.http_version = versions.pop() if len(versions) == 1 else '/'.join(sorted(versions))
+        except Exception as e:
+            logger.warning(f'HTTP/2连接建立失败，使用HTTP/1.1: {e}')
+            self.close()
+            return False
+
+        if self.http_version != 'HTTP/2':
+            logger.warning(f'服务器未协商HTTP/2（{self.http_version}），使用HTTP/1.1')
+            self.close()
+            return False
+        logger.info('⚡ 已建立HTTP/2连接：{}'.format('、'.join(sorted(self.hosts))))
+        return True
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def handles(self, url):
+        """该地址是否走HTTP/2"""
+        return self.client is not None and urlparse(url).hostname in self.hosts
+
+    def request(self, method, url, params=None, data=None, headers=None, allow_redirects=True, timeout=None):
+        """
+        发送请求，参数与requests.Session.request一致
+        :return: httpx.Response
+        """
+        return self.client.request(
+            method, url, params=params, data=data, headers=headers,
+            follow_redirects=allow_redirects,
+            timeout=timeout if timeout is not None else self.timeout)
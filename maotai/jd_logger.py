@@ -1,10 +1,12 @@
+import os
 import logging
 import logging.handlers
 
 '''
 日志模块
 '''
-LOG_FILENAME = '../jd_seckill.log'
+# 可通过环境变量JD_SECKILL_LOG指定日志文件（如单元测试写到临时目录），默认相对运行目录
+LOG_FILENAME = os.environ.get('JD_SECKILL_LOG') or '../jd_seckill.log'
 logger = logging.getLogger()
 
 
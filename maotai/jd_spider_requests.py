@@ -5,15 +5,26 @@ import functools
 import json
 import os
 import pickle
+import threading
+from types import MappingProxyType
 from datetime import datetime, timedelta
 
 from lxml import etree
 
 from error.exception import SKException
 from maotai.jd_logger import logger
-from maotai.timer import Timer
+from maotai.timer import Timer, ClockDriftTracker, PollScheduler
 from maotai.config import global_config
-from concurrent.futures import ProcessPoolExecutor
+from maotai import calibration
+from maotai.calibration import CampaignRecorder
+from maotai.transport import mount_tuned_adapter, diff_connection_stats, ConnectionWarmer, HostResolver
+from maotai.async_engine import AsyncSeckillEngine
+from maotai.pipeline import PipelinedSeckillEngine, default_stages
+from maotai.coordination import ProcessCampaign, ThreadCampaign, AttemptScheduler
+from maotai.http2_client import Http2Client
+from maotai.prepared_requests import PreparedSeckillRequests
+from maotai.metadata_cache import MetadataCache
+from maotai.worker_context import WorkerContext
 from helper.jd_helper import (
     parse_json,
     send_wechat,
@@ -24,6 +35,12 @@ from helper.jd_helper import (
 )
 
 
+# 下单被拒绝且错误信息包含这些关键字时，认为token失效，重新调用init.action获取token；
+# 只匹配明确指向token的信息，“参数错误”“请刷新”等通用提示不触发额外的init.action往返。
+# 明确表示token失效的resultCode可通过配置order_token_reject_codes补充
+ORDER_TOKEN_REJECT_KEYWORDS = ('token', '令牌')
+
+
 class SpiderSession:
     """
     Session相关操作
@@ -32,12 +49,39 @@ class SpiderSession:
     def __init__(self):
         self.cookies_dir_path = "./cookies/"
         self.user_agent = global_config.getRaw('config', 'DEFAULT_USER_AGENT')
+        # 抢购域名的连接池大小与最大并发数一致，避免并发请求因连接池不足而新建连接
+        self.pool_size = global_config.getInt('config', 'max_processes', 8)
+        self.transport_adapter = None
+        # 抢购域名固定使用的IP {域名: IP}，由JdSeckill.rank_seckill_hosts测量后更新
+        self.pinned_ips = dict()
+        # HTTP后端：requests 或 curl(pycurl/libcurl)
+        self.http_backend = global_config.getRaw('config', 'http_backend', fallback='requests').strip().lower()
 
         self.session = self._init_session()
 
     def _init_session(self):
+        if self.http_backend == 'curl':
+            session = self._init_curl_session()
+            if session is not None:
+                return session
+            self.http_backend = 'requests'
         session = requests.session()
         session.headers = self.get_headers()
+        self.transport_adapter = mount_tuned_adapter(session, self.pool_size, pinned_ips=self.pinned_ips)
+        return session
+
+    def _init_curl_session(self):
+        """
+        创建基于libcurl的Session，接口与requests.Session兼容
+        :return: CurlSession，未安装pycurl时返回None
+        """
+        try:
+            from maotai.curl_backend import CurlSession
+        except ImportError:
+            logger.warning('未安装pycurl，HTTP后端使用requests')
+            return None
+        session = CurlSession(pool_size=max(10, self.pool_size), pinned_ips=self.pinned_ips)
+        session.headers.update(self.get_headers())
         return session
 
     def get_headers(self):
@@ -68,6 +112,23 @@ class SpiderSession:
     def set_cookies(self, cookies):
         self.session.cookies.update(cookies)
 
+    def pin_hosts(self, pinned_ips):
+        """
+        抢购域名之后新建的连接固定使用指定IP，已建立的连接不受影响
+        :param pinned_ips: {域名: IP}
+        """
+        self.pinned_ips.clear()
+        self.pinned_ips.update(pinned_ips)
+
+    def connection_stats(self):
+        """
+        抢购域名的连接复用统计
+        :return: {host: {'connections': 新建连接数, 'requests': 请求数, 'reused': 复用连接的请求数}}
+        """
+        if self.transport_adapter is None:
+            return self.session.connection_stats()
+        return self.transport_adapter.connection_stats()
+
     def load_cookies_from_local(self):
         """
         从本地加载Cookie
@@ -357,19 +418,83 @@ class JdSeckill(object):
         # 初始化信息
         self.sku_id = global_config.getRaw('config', 'sku_id')
         self.seckill_num = global_config.getRaw('config', 'seckill_num')
-        self.seckill_init_info = dict()
-        self.seckill_url = dict()
-        self.seckill_order_data = dict()
         self.timers = Timer()
 
         self.session = self.spider_session.get_session()
         self.user_agent = self.spider_session.user_agent
+        self._init_campaign_state()
+
+        # 初始化安全配置管理器和设备指纹收集器
+        self._init_security_components()
+
+    @classmethod
+    def from_worker_context(cls, ctx):
+        """
+        在抢购子进程中由WorkerContext重建，只包含抢购流程需要的属性：
+        不扫码登录、不创建安全配置管理器与设备指纹收集器、不重新校时
+        :param ctx: maotai.worker_context.WorkerContext
+        """
+        self = cls.__new__(cls)
+        self.spider_session = SpiderSession()
+        for name, value, domain, path, secure, expires in ctx.cookies:
+            self.spider_session.get_cookies().set_cookie(requests.cookies.create_cookie(
+                name, value, domain=domain, path=path, secure=secure, expires=expires))
+        self.spider_session.pin_hosts(dict(ctx.pinned_ips))
+        self.qrlogin = None
+        self.secure_config = None
+        self.device_collector = None
+
+        self.sku_id = ctx.sku_id
+        self.seckill_num = ctx.seckill_num
+        # 沿用父进程测得的时间差与提前量
+        self.timers = Timer(sync=False)
+        self.timers.diff_time = ctx.jd_offset_ms
+        self.timers.anchor()
+        self.timers.set_buy_time(ctx.buy_time)
+        self.timers.set_lead(ctx.lead_ms)
+
+        self.session = self.spider_session.get_session()
+        self.user_agent = ctx.user_agent
+        self._init_campaign_state()
+        self.worker_context = ctx
+        self.trigger_lead_info = dict(ctx.trigger_lead_info)
+        self._hosts_ranked_at = time.monotonic()
+        return self
+
+    def _init_campaign_state(self):
+        """抢购流程的状态，主进程与抢购子进程共用"""
+        self.seckill_init_info = dict()
+        self.seckill_url = dict()
+        self.seckill_order_data = dict()
         self.nick_name = None
 
         # 自动化模式相关属性
         self.auto_mode_running = False
         self.login_check_interval = 300  # 5分钟检查一次登录状态
         self.last_login_check = 0
+        # 提前进入秒杀流程的秒数，由Timer精确等待；多进程抢购需在此期间创建进程并完成准备
+        self.seckill_prepare_seconds = global_config.getFloat('config', 'seckill_prepare_seconds', 30.0)
+        self.trigger_lead_info = dict()  # 本次抢购的提前触发量及其依据
+        self.campaign_recorder = CampaignRecorder()  # 抢购请求时序记录，用于下次抢购校准
+        self._next_intended_ms = None  # 下一个请求的计划触发时刻，只由第一个发出的请求取走
+        self._intended_lock = threading.Lock()  # 多线程、asyncio执行器线程同时发送请求时保护_next_intended_ms
+        self._window_conn_stats = None  # 抢购开始时的连接统计，用于检查抢购窗口内是否新建连接
+        self.connection_warmer = None  # 抢购前的连接预热与保活
+        self.http2_client = None  # 抢购请求的HTTP/2多路复用客户端，未启用或不支持时为None
+        self.prepared_requests = None  # 抢购开始前准备好的结算页与下单请求
+        self._hosts_ranked_at = None  # 上次测量抢购域名IP的单调时钟时刻(秒)
+        self._order_token_stale = False  # 缓存的下单token被服务器拒绝，下次提交前需刷新
+        self._order_lock = threading.Lock()  # 多线程抢购时只有一个线程调用init.action生成或刷新下单模板
+        self.order_stats = {'submits': 0, 'init_calls': 0}  # 本次抢购的下单次数与init.action调用次数
+        self._stats_lock = threading.Lock()
+        self.stop_event = None  # 多进程抢购的共享停止事件，由coordination在子进程中设置
+        self.worker_context = None  # 抢购子进程的启动数据，主进程中为None
+        self.start_gate = None  # 多进程抢购的启动闸门，由coordination在子进程中设置
+        self.release_skew_ms = None  # 本进程从启动闸门放行到被唤醒的毫秒数
+        self.attempt_scheduler = None  # 所有抢购进程（线程）共享的尝试调度器，未配置attempt_rate时为None
+        self.order_notification = None  # 抢购子进程下单成功的通知内容，由主进程发送
+        # 用户名、商品名称缓存，抢购流程中只读内存
+        self.metadata_cache = MetadataCache(ttl=global_config.getFloat('config', 'metadata_cache_ttl', 86400.0))
 
         # 配置状态跟踪 - 避免重复询问
         self.config_setup_completed = {
@@ -377,9 +502,6 @@ class JdSeckill(object):
             'wechat_notification': False
         }
 
-        # 初始化安全配置管理器和设备指纹收集器
-        self._init_security_components()
-
     def _init_security_components(self):
         """初始化安全组件"""
         try:
@@ -437,6 +559,8 @@ class JdSeckill(object):
 
     def get_secure_payment_password(self, required=True):
         """获取安全的支付密码"""
+        if self.worker_context is not None:
+            return self.worker_context.payment_password
         if self.secure_config:
             return self.secure_config.get_secure_value(
                 section='account',
@@ -626,6 +750,7 @@ class JdSeckill(object):
         """
         抢购
         """
+        self.prefetch_metadata()
         self._seckill()
 
     @check_login
@@ -642,9 +767,98 @@ class JdSeckill(object):
         logger.info(f'🔄 并发进程数：{work_count}个')
         logger.info(f'⚡ 最大重试次数：{safe_config["max_retries"]}次')
 
-        with ProcessPoolExecutor(work_count) as pool:
-            for i in range(work_count):
-                pool.submit(self.safe_enhanced_seckill, safe_config)
+        # 在父进程中测量一次，固定的IP随WorkerContext传给每个抢购进程
+        self.rank_seckill_hosts()
+        self.prefetch_metadata()
+
+        if self.get_seckill_engine() == 'pipeline':
+            return self.pipeline_seckill(safe_config)
+        worker_model = self.get_worker_model()
+        if worker_model == 'async':
+            return self.async_seckill(safe_config)
+        if worker_model == 'thread':
+            return self.thread_seckill(safe_config)
+
+        # 提前量在父进程中测量一次，子进程只接收重建抢购流程所需的WorkerContext
+        self.apply_trigger_lead(safe_config)
+        context = WorkerContext.from_seckill(self)
+        # 仍在抢购前的准备阶段，缓存缺失（如上面的预取失败）时再请求一次
+        logger.info('用户:{}'.format(self.get_username()))
+        logger.info('商品名称:{}'.format(self.get_sku_title()))
+        # 子进程完成准备后停在启动闸门上，由本进程在触发时刻统一放行；
+        # 任一进程成功或到达最后购买时间后，所有进程在下一个阶段边界停止
+        attempt_scheduler = self.create_attempt_scheduler()
+        campaign = ProcessCampaign(work_count, deadline_seconds=self.campaign_deadline_seconds(), timer=self.timers,
+                                   attempt_scheduler=attempt_scheduler)
+        result = campaign.run(context, 'safe_enhanced_seckill', safe_config)
+        if attempt_scheduler is not None:
+            attempt_scheduler.log_summary()
+        for item in result.results:
+            if item.get('notification'):
+                self.send_detailed_notification(item['notification'])
+        if not result.success:
+            self.send_detailed_notification({
+                'type': '抢购通知',
+                'icon': '😔',
+                'title': '抢购失败',
+                'summary': f'本次抢购未成功，停止原因: {result.stop_reason}',
+                'seckill_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'seckill_status': '失败',
+                'seckill_result': '抢购失败',
+                'seckill_success': False,
+                'error_message': '；'.join(result.errors) or '未抢到',
+                'error_code': result.stop_reason
+            })
+        return result.success
+
+    def create_attempt_scheduler(self):
+        """
+        按attempt_rate创建所有抢购进程（线程）共享的尝试调度器
+        :return: AttemptScheduler，attempt_rate不大于0时返回None（各进程按风控策略的随机间隔重试）
+        """
+        rate = global_config.getFloat('config', 'attempt_rate', 0.0)
+        if rate <= 0:
+            return None
+        logger.info('⏲️ 尝试调度：所有执行单元合计每秒 {:g} 次，每 {:.1f}ms 一次'.format(rate, 1000.0 / rate))
+        return AttemptScheduler(rate)
+
+    def campaign_deadline_seconds(self):
+        """
+        距离本次抢购最后购买时间的秒数（京东时间）
+        :return: 秒数，最后购买时间不晚于购买时间时返回None
+        """
+        last_purchase_time = datetime.strptime('{} {}'.format(
+            self.timers.buy_time.date(), global_config.getRaw('config', 'last_purchase_time')), "%Y-%m-%d %H:%M:%S.%f")
+        if last_purchase_time <= self.timers.buy_time:
+            return None
+        return max(0.0, (last_purchase_time - self.timers.jd_datetime_now()).total_seconds())
+
+    def campaign_duration_seconds(self, default=120.0):
+        """
+        单进程抢购引擎的最长抢购时间：到最后购买时间为止
+        :param default: 未配置有效的最后购买时间时使用的秒数
+        """
+        deadline = self.campaign_deadline_seconds()
+        return default if deadline is None else deadline
+
+    def stop_requested(self):
+        """其他抢购进程是否已成功或已到达最后购买时间"""
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _sleep_or_stop(self, seconds):
+        """
+        等待seconds秒，收到停止信号时立即返回
+        :return: 是否收到停止信号
+        """
+        if self.stop_event is None:
+            time.sleep(seconds)
+            return False
+        return self.stop_event.wait(seconds)
+
+    def _signal_success(self):
+        """下单成功后立即通知其他抢购进程停止"""
+        if self.stop_event is not None:
+            self.stop_event.set()
 
     def _reserve(self):
         """
@@ -670,6 +884,9 @@ class JdSeckill(object):
                     self.submit_seckill_order()
             except Exception as e:
                 logger.info(f'抢购发生异常，稍后继续执行: {str(e)}')
+            finally:
+                # 本轮抢购结束（包括被中断时）保存时序记录
+                self._finish_campaign()
             wait_some_time()
 
     def enhanced_seckill(self):
@@ -683,41 +900,192 @@ class JdSeckill(object):
         # 预热连接
         self.preheat_connections()
 
-        # 获取抢购链接
         try:
-            self.request_seckill_url()
-        except Exception as e:
-            logger.error(f'获取抢购链接失败: {e}')
+            # 获取抢购链接
+            try:
+                self.request_seckill_url()
+            except Exception as e:
+                logger.error(f'获取抢购链接失败: {e}')
+                return False
+
+            # 极速抢购循环
+            retry_count = 0
+            max_fast_retries = 200  # 增加到200次快速重试
+            start_time = time.time()
+
+            while retry_count < max_fast_retries and (time.time() - start_time) < 120:  # 最多抢2分钟
+                if self.stop_requested():
+                    logger.info('收到停止信号，结束抢购')
+                    break
+                try:
+                    self.request_seckill_checkout_page()
+                    if self.stop_requested():
+                        continue
+                    result = self.submit_seckill_order()
+                    if result:
+                        self._signal_success()
+                        logger.info('🎉 抢购成功！')
+                        return True
+
+                except Exception as e:
+                    error_msg = str(e)
+                    wait_time = self.smart_error_handler(error_msg)
+
+                    if wait_time > 0:
+                        self._sleep_or_stop(wait_time)
+
+                    retry_count += 1
+
+                    # 每50次重试输出一次状态
+                    if retry_count % 50 == 0:
+                        logger.info(f'⚡ 已重试 {retry_count} 次，继续抢购...')
+
+            logger.info(f'抢购结束，共重试 {retry_count} 次')
             return False
+        finally:
+            self._finish_campaign()
+
+    def _finish_campaign(self):
+        """抢购结束：保存时序记录并输出抢购窗口内的连接复用情况与下单模板节省的往返次数"""
+        self.campaign_recorder.flush()
+        if self.order_stats['submits']:
+            logger.info('📦 下单模板：提交 {} 次，调用init.action {} 次，节省 {} 次往返'.format(
+                self.order_stats['submits'], self.order_stats['init_calls'],
+                self.order_stats['submits'] - self.order_stats['init_calls']))
+        if self.http2_client is not None:
+            self.http2_client.close()
+            self.http2_client = None
+        if self._window_conn_stats is None:
+            return
+        delta = diff_connection_stats(self._window_conn_stats, self.spider_session.connection_stats())
+        self._window_conn_stats = None
+        for host, item in delta.items():
+            if not item['requests']:
+                continue
+            warmed = self.connection_warmer.warmed.get(host, 0) if self.connection_warmer else 0
+            logger.info('🔗 {}：预热连接 {} 个，抢购窗口内 {} 个请求，复用连接 {} 次，新建连接 {} 个'.format(
+                host, warmed, item['requests'], item['reused'], item['connections']))
+            if item['connections'] > 0:
+                logger.warning(f'{host} 在抢购窗口内新建了 {item["connections"]} 个连接，建议提前预热或增大连接池')
 
-        # 极速抢购循环
-        retry_count = 0
-        max_fast_retries = 200  # 增加到200次快速重试
-        start_time = time.time()
+    def get_seckill_engine(self):
+        """
+        抢购引擎：sync 多进程同步抢购；async 单进程内asyncio并发抢购；pipeline 单进程内错开阶段的流水线抢购
+        """
+        engine = global_config.getRaw('config', 'seckill_engine', fallback='sync').strip().lower()
+        return engine if engine in ('sync', 'async', 'pipeline') else 'sync'
 
-        while retry_count < max_fast_retries and (time.time() - start_time) < 120:  # 最多抢2分钟
-            try:
-                self.request_seckill_checkout_page()
-                result = self.submit_seckill_order()
-                if result:
-                    logger.info('🎉 抢购成功！')
-                    return True
+    def get_worker_model(self):
+        """
+        抢购并发方式：process 多进程；thread 多线程；async asyncio事件循环调度抢购尝试，
+        阻塞请求在线程池中执行（最多async_concurrency*2个线程）
+        thread与async共享同一个Session、Cookie与连接池；未配置worker_model时沿用seckill_engine = async
+        """
+        model = global_config.getRaw('config', 'worker_model', fallback='').strip().lower()
+        if model in ('process', 'thread', 'async'):
+            return model
+        return 'async' if self.get_seckill_engine() == 'async' else 'process'
+
+    def thread_seckill(self, safe_config=None):
+        """
+        多线程抢购 - 在当前进程中完成一次准备（预热、抢购链接、定时），max_processes个线程共享Session执行抢购循环
+        :return: 抢购结果 True/False
+        """
+        safe_config = safe_config or self.get_safe_seckill_config()
+        logger.info(f'🧵 启动多线程抢购：{safe_config["max_processes"]}个线程')
 
+        self.safe_preheat_connections()
+        try:
+            try:
+                self.request_seckill_url()
             except Exception as e:
-                error_msg = str(e)
-                wait_time = self.smart_error_handler(error_msg)
+                logger.error(f'获取抢购链接失败: {e}')
+                return False
 
-                if wait_time > 0:
-                    time.sleep(wait_time)
+            self.stop_event = threading.Event()
+            self.attempt_scheduler = self.create_attempt_scheduler()
+            campaign = ThreadCampaign(safe_config['max_processes'], deadline_seconds=self.campaign_deadline_seconds())
+            result = campaign.run(self._safe_seckill_loop, self.stop_event, safe_config).success
+            if self.attempt_scheduler is not None:
+                self.attempt_scheduler.log_summary()
+            return result
+        finally:
+            self.stop_event = None
+            self.attempt_scheduler = None
+            self._finish_campaign()
+
+    def async_seckill(self, safe_config=None):
+        """
+        asyncio引擎抢购 - 单进程内并发多个抢购尝试，共享Session与Cookie
+        :return: 抢购结果 True/False
+        """
+        safe_config = safe_config or self.get_safe_seckill_config()
+        logger.info('🚀 启动asyncio抢购引擎')
 
-                retry_count += 1
+        self.safe_preheat_connections()
+        try:
+            try:
+                self.request_seckill_url()
+            except Exception as e:
+                logger.error(f'获取抢购链接失败: {e}')
+                return False
 
-                # 每50次重试输出一次状态
-                if retry_count % 50 == 0:
-                    logger.info(f'⚡ 已重试 {retry_count} 次，继续抢购...')
+            self.stop_event = threading.Event()
+            self.attempt_scheduler = self.create_attempt_scheduler()
+            engine = AsyncSeckillEngine(
+                self,
+                concurrency=global_config.getInt('config', 'async_concurrency', safe_config['max_processes']),
+                max_attempts=safe_config['max_retries'],
+                duration=self.campaign_duration_seconds(),
+                request_timeout=global_config.getFloat('config', 'async_request_timeout', 5.0),
+                stop_event=self.stop_event,
+                attempt_scheduler=self.attempt_scheduler)
+            result = engine.run()
+            if self.attempt_scheduler is not None:
+                self.attempt_scheduler.log_summary()
+            if result:
+                logger.info('🎉 抢购成功！')
+            return result
+        finally:
+            self.stop_event = None
+            self.attempt_scheduler = None
+            self._finish_campaign()
+
+    def pipeline_seckill(self, safe_config=None):
+        """
+        流水线引擎抢购 - 保持多个尝试在途并错开阶段，下单等待响应时下一个尝试的结算页请求已经发出
+        :return: 抢购结果 True/False
+        """
+        safe_config = safe_config or self.get_safe_seckill_config()
+        logger.info('🚀 启动流水线抢购引擎')
 
-        logger.info(f'抢购结束，共重试 {retry_count} 次')
-        return False
+        try:
+            try:
+                self.request_seckill_url()
+            except Exception as e:
+                logger.error(f'获取抢购链接失败: {e}')
+                return False
+
+            depth = global_config.getInt('config', 'pipeline_depth', 3)
+            stages = default_stages(self)
+            stagger_ms = global_config.getFloat('config', 'pipeline_stagger_ms', 0.0)
+            if stagger_ms <= 0:
+                # 未配置时按单向延迟估计：每个阶段一个往返，一次尝试的耗时均分给depth个在途尝试
+                one_way_ms = self.trigger_lead_info.get('one_way_ms')
+                stagger_ms = one_way_ms * 2 * len(stages) / max(1, depth) if one_way_ms else 30.0
+            engine = PipelinedSeckillEngine(
+                self,
+                depth=depth,
+                stages=stages,
+                stagger_ms=stagger_ms,
+                max_attempts=safe_config['max_retries'],
+                duration=self.campaign_duration_seconds())
+            result = engine.run()
+            if result:
+                logger.info('🎉 抢购成功！')
+            return result
+        finally:
+            self._finish_campaign()
 
     def smart_error_handler(self, error_msg):
         """
@@ -764,6 +1132,74 @@ class JdSeckill(object):
         except Exception as e:
             logger.warning(f'网络预热失败: {e}')
 
+    def rank_seckill_hosts(self, max_age=None):
+        """
+        解析抢购域名的所有IP并测量TCP建连耗时，之后新建的连接固定到最快的IP（SNI与Host仍为域名）
+        :param max_age: 距上次测量不足该秒数时跳过
+        """
+        if global_config.getRaw('config', 'dns_pinning', fallback='true').strip().lower() != 'true':
+            return
+        if (max_age is not None and self._hosts_ranked_at is not None
+                and time.monotonic() - self._hosts_ranked_at < max_age):
+            return
+        resolver = HostResolver(probes=global_config.getInt('config', 'dns_probe_count', 3))
+        pinned_ips = resolver.rank()
+        self._hosts_ranked_at = time.monotonic()
+        self.spider_session.pin_hosts(pinned_ips)
+        for host, items in resolver.ranking.items():
+            if not items:
+                logger.warning(f'📡 {host} 没有测量到可达的IP，使用系统DNS解析')
+                continue
+            logger.info('📡 {}：选用 {}（建连 {:.1f}ms），其他IP：{}'.format(
+                host, items[0][0], items[0][1],
+                '，'.join(f'{ip} {rtt:.1f}ms' for ip, rtt in items[1:]) or '无'))
+
+    def start_connection_warmer(self):
+        """
+        在抢购前预热marathon与itemko的连接（完成TCP与TLS握手）并保活到抢购时间
+        与preheat_connections不同，预热在触发前几秒进行，连接不会在抢购开始前因空闲被服务器关闭
+        """
+        if self.connection_warmer is not None:
+            self.connection_warmer.stop()
+            self.connection_warmer = None
+        if self.timers.deadline_ns <= time.monotonic_ns():
+            return
+        warm_seconds = global_config.getFloat('config', 'connection_warm_seconds', 5.0)
+        if warm_seconds <= 0:
+            return
+        self.connection_warmer = ConnectionWarmer(
+            self.session,
+            ['https://marathon.jd.com/', 'https://itemko.jd.com/'],
+            connections=global_config.getInt('config', 'connection_warm_count', 2),
+            keepalive_interval=global_config.getFloat('config', 'connection_keepalive_interval', 2.0),
+            headers={'User-Agent': self.user_agent})
+        self.connection_warmer.start(self.timers.deadline_ns, warm_seconds=warm_seconds)
+
+    def open_http2_client(self):
+        """
+        http2 = true 时为marathon.jd.com建立HTTP/2连接，结算页、init.action、下单请求在该连接上多路复用
+        服务器未协商HTTP/2或未安装httpx[http2]时继续使用requests(HTTP/1.1)
+        """
+        if self.http2_client is not None:
+            self.http2_client.close()
+            self.http2_client = None
+        if global_config.getRaw('config', 'http2', fallback='false').strip().lower() != 'true':
+            return
+        client = Http2Client(self.session, ['marathon.jd.com'])
+        if client.open(['https://marathon.jd.com/']):
+            self.http2_client = client
+
+    def prepare_hot_path_requests(self):
+        """
+        抢购开始前准备结算页与下单请求，抢购中每次尝试只替换rid、token和Cookie
+        结算页、下单走HTTP/2时不使用（由httpx发送）
+        """
+        self.prepared_requests = None
+        if self.http2_client is not None:
+            return
+        self.prepared_requests = PreparedSeckillRequests(
+            self.session, self.sku_id, self.seckill_num, self.user_agent)
+
     def get_safe_seckill_config(self):
         """
         获取安全的抢购配置
@@ -820,14 +1256,24 @@ class JdSeckill(object):
         # 安全预热连接
         self.safe_preheat_connections()
 
-        # 获取抢购链接
         try:
-            self.request_seckill_url()
-        except Exception as e:
-            logger.error(f'获取抢购链接失败: {e}')
-            return False
+            # 获取抢购链接
+            try:
+                self.request_seckill_url()
+            except Exception as e:
+                logger.error(f'获取抢购链接失败: {e}')
+                return False
+
+            return self._safe_seckill_loop(safe_config)
+        finally:
+            # 所有退出路径（成功、失败、风控停止、异常）都保存时序记录
+            self._finish_campaign()
 
-        # 安全抢购循环
+    def _safe_seckill_loop(self, safe_config):
+        """
+        安全抢购循环（需已调用request_seckill_url），线程模式下多个线程同时执行
+        :return: 抢购结果 True/False
+        """
         retry_count = 0
         max_retries = safe_config['max_retries']
         retry_range = safe_config['retry_interval_range']
@@ -838,11 +1284,19 @@ class JdSeckill(object):
         last_risk_check = time.time()
 
         while retry_count < max_retries and (time.time() - start_time) < 180:  # 最多抢3分钟
+            if self.stop_requested():
+                logger.info('收到停止信号，结束抢购')
+                break
             try:
-                # 模拟人类行为间隔
-                if retry_count > 0:
+                if self.attempt_scheduler is not None:
+                    # 等待到共享调度器分配的时间槽，所有执行单元的尝试均匀分布在抢购窗口内
+                    if self._sleep_or_stop(self.attempt_scheduler.claim()):
+                        continue
+                elif retry_count > 0:
+                    # 模拟人类行为间隔
                     wait_time = self.safe_retry_interval(retry_range, retry_count)
-                    time.sleep(wait_time)
+                    if self._sleep_or_stop(wait_time):
+                        continue
 
                 # 风控检测
                 if time.time() - last_risk_check > 10:  # 每10秒检测一次
@@ -861,9 +1315,12 @@ class JdSeckill(object):
 
                 # 执行抢购
                 self.request_seckill_checkout_page()
+                if self.stop_requested():
+                    continue
                 result = self.submit_seckill_order()
 
                 if result:
+                    self._signal_success()
                     logger.info('🎉 安全抢购成功！')
                     return True
 
@@ -914,8 +1371,8 @@ class JdSeckill(object):
         检测风控信号
         """
         try:
-            # 简单的风控检测 - 检查登录状态
-            if not self.qrlogin.is_login:
+            # 简单的风控检测 - 检查登录状态（抢购子进程沿用主进程的登录状态）
+            if self.qrlogin is not None and not self.qrlogin.is_login:
                 return True
 
             # 可以添加更多检测逻辑
@@ -953,7 +1410,8 @@ class JdSeckill(object):
         # 随机等待
         wait_time = random.uniform(enhanced_min, enhanced_max)
         logger.info(f'⏳ 风控冷却等待 {wait_time:.1f} 秒')
-        time.sleep(wait_time)
+        if self._sleep_or_stop(wait_time):
+            return
 
         # 模拟人类浏览行为
         self.simulate_human_behavior()
@@ -968,11 +1426,13 @@ class JdSeckill(object):
         try:
             logger.info('🎭 模拟人类浏览行为...')
 
-            # 模拟访问商品页面
-            time.sleep(random.uniform(1.0, 3.0))
+            # 模拟访问商品页面（收到停止信号时立即结束）
+            if self._sleep_or_stop(random.uniform(1.0, 3.0)):
+                return
 
             # 模拟页面停留
-            time.sleep(random.uniform(0.5, 1.5))
+            if self._sleep_or_stop(random.uniform(0.5, 1.5)):
+                return
 
             logger.info('✅ 人类行为模拟完成')
 
@@ -1008,6 +1468,7 @@ class JdSeckill(object):
 
     def make_reserve(self):
         """商品预约 - 新版移动端预约流程"""
+        # 预约不在抢购窗口内，首次运行缓存为空时在此获取商品名称并写入缓存
         logger.info('商品名称:{}'.format(self.get_sku_title()))
 
         print("\n" + "="*60)
@@ -1210,8 +1671,35 @@ class JdSeckill(object):
 
 
 
-    def get_username(self):
-        """获取用户信息"""
+    def prefetch_metadata(self):
+        """抢购前预取用户名与商品名称并写入缓存，抢购流程中只读缓存"""
+        try:
+            self.get_username()
+            self.get_sku_title()
+        except Exception as e:
+            logger.warning(f'预取用户与商品信息失败: {e}')
+
+    def _username_cache_key(self):
+        """用户名的缓存键，按账号(pt_pin)区分；Cookie中没有pt_pin时返回None，不缓存"""
+        for cookie in self.session.cookies:
+            if cookie.name == 'pt_pin' and cookie.value:
+                return 'username:{}'.format(cookie.value)
+        return None
+
+    def get_username(self, cached_only=False):
+        """获取用户信息
+        :param cached_only: 只读缓存，不发送请求；缓存中没有时返回登录时获取的昵称
+        """
+        key = self._username_cache_key()
+        if cached_only:
+            username = self.metadata_cache.get(key) if key else None
+            return self.nick_name if username is None else username
+        if key is None:
+            return self._fetch_username()
+        return self.metadata_cache.get_or_fetch(key, self._fetch_username)
+
+    def _fetch_username(self):
+        """请求用户信息接口获取昵称"""
         url = 'https://passport.jd.com/user/petName/getUserInfoForMiniJd.action'
         payload = {
             'callback': 'jQuery{}'.format(random.randint(1000000, 9999999)),
@@ -1236,27 +1724,35 @@ class JdSeckill(object):
         # jQuery2381773({"imgUrl":"//storage.360buyimg.com/i.imageUpload/xxx.jpg","lastLoginTime":"","nickName":"xxx","plusStatus":"0","realName":"xxx","userLevel":x,"userScoreVO":{"accountScore":xx,"activityScore":xx,"consumptionScore":xxxxx,"default":false,"financeScore":xxx,"pin":"xxx","riskScore":x,"totalScore":xxxxx}})
         return parse_json(resp.text).get('nickName')
 
-    def get_sku_title(self):
-        """获取商品名称"""
+    def get_sku_title(self, cached_only=False):
+        """获取商品名称
+        :param cached_only: 只读缓存，不发送请求；缓存中没有时返回商品ID
+        """
+        sku_id = global_config.getRaw('config', 'sku_id')
+        key = 'sku_title:{}'.format(sku_id)
+        if cached_only:
+            sku_title = self.metadata_cache.get(key)
+        else:
+            sku_title = self.metadata_cache.get_or_fetch(key, lambda: self._fetch_sku_title(sku_id))
+        return sku_title or f"商品ID: {sku_id}"
+
+    def _fetch_sku_title(self, sku_id):
+        """请求商品页面解析商品名称，失败返回None"""
         try:
-            url = 'https://item.jd.com/{}.html'.format(global_config.getRaw('config', 'sku_id'))
+            url = 'https://item.jd.com/{}.html'.format(sku_id)
             resp = self.session.get(url, timeout=5).content
             x_data = etree.HTML(resp)
             sku_title = x_data.xpath('/html/head/title/text()')
-            if sku_title:
-                return sku_title[0]
-            else:
-                # 如果没有找到标题，返回默认值
-                return f"商品ID: {global_config.getRaw('config', 'sku_id')}"
+            return sku_title[0] if sku_title else None
         except Exception as e:
             logger.warning(f'获取商品标题失败: {e}')
-            return f"商品ID: {global_config.getRaw('config', 'sku_id')}"
+            return None
 
     def get_seckill_url(self):
         """获取商品的抢购链接
         点击"抢购"按钮后，会有两次302跳转，最后到达订单结算页面
         这里返回第一次跳转后的页面url，作为商品的抢购链接
-        :return: 商品的抢购链接
+        :return: 商品的抢购链接，收到停止信号（其他进程已成功或已到达最后购买时间）时返回None
         """
         url = 'https://itemko.jd.com/itemShowBtn'
         payload = {
@@ -1270,8 +1766,11 @@ class JdSeckill(object):
             'Host': 'itemko.jd.com',
             'Referer': 'https://item.jd.com/{}.html'.format(self.sku_id),
         }
-        while True:
-            resp = self.session.get(url=url, headers=headers, params=payload)
+        # 按京东时间调整轮询间隔：远离抢购时间稀疏，抢购前后数秒内密集，获取到链接立即返回
+        poller = PollScheduler(self.timers)
+        while not self.stop_requested():
+            payload['_'] = str(int(time.time() * 1000))
+            resp, _ = self._timed_request('seckill_url', 'GET', url=url, headers=headers, params=payload)
             resp_json = parse_json(resp.text)
             if resp_json.get('url'):
                 # https://divide.jd.com/user_routing?skuId=8654289&sn=c3f4ececd8461f0e4d7267e96a91e0e0&from=pc
@@ -1280,33 +1779,179 @@ class JdSeckill(object):
                 seckill_url = router_url.replace(
                     'divide', 'marathon').replace(
                     'user_routing', 'captcha.html')
-                logger.info("抢购链接获取成功: %s", seckill_url)
+                logger.info("抢购链接获取成功: %s（第 %d 次请求，相对抢购时间 %+.1fms）",
+                            seckill_url, poller.polls + 1, poller.latency_ms())
                 return seckill_url
             else:
                 logger.info("抢购链接获取失败，稍后自动重试")
-                wait_some_time()
+                if poller.wait(self._sleep_or_stop):
+                    break
+        logger.info('收到停止信号，停止获取抢购链接')
+        return None
+
+    def measure_one_way_latency(self, url='https://marathon.jd.com/', samples=5):
+        """
+        估计到抢购服务器的单向延迟
+        复用会话中的长连接发送HEAD请求，第一次请求包含建连耗时不计入，取最小往返耗时的一半
+        :param url: 测量地址
+        :param samples: 采样次数
+        :return: (单向延迟ms, 最小往返ms)，全部失败返回(None, None)
+        """
+        rtts = []
+        for i in range(samples + 1):
+            start = time.perf_counter()
+            try:
+                self.session.head(url, timeout=2, allow_redirects=False)
+            except Exception as e:
+                logger.debug(f'单向延迟测量请求失败: {e}')
+                continue
+            if i > 0:
+                rtts.append((time.perf_counter() - start) * 1000.0)
+        if not rtts:
+            return None, None
+        min_rtt = min(rtts)
+        return min_rtt / 2.0, min_rtt
+
+    def apply_trigger_lead(self, safe_config=None):
+        """
+        按测得的单向延迟提前触发，使第一个请求在购买时间到达服务器，提前量不超过风控策略的advance_time_limit
+        触发后第一个请求是itemko.jd.com的抢购链接轮询，测量与历史估计都针对该域名
+        :param safe_config: get_safe_seckill_config的返回值
+        :return: 提前量(ms)
+        """
+        safe_config = safe_config or self.get_safe_seckill_config()
+        limit_ms = safe_config['advance_time_limit'] * 1000.0
+        measured_ms, min_rtt = self.measure_one_way_latency(url=calibration.TRIGGER_URL)
+
+        # 优先使用历史抢购首轮请求的单向延迟（反映抢购高峰时的真实延迟），并按历史修正京东时间
+        calibrated = self._apply_history_calibration(stages=calibration.TRIGGER_STAGES)
+        one_way_ms = calibrated['one_way_ms'] if calibrated['one_way_ms'] is not None else measured_ms
+        if one_way_ms is None:
+            lead_ms = 0.0
+            logger.warning('⏱️ 单向延迟测量失败，不提前触发')
+        else:
+            lead_ms = min(one_way_ms, limit_ms)
+            logger.info('⏱️ 单向延迟估计 {:.1f}ms（实测 {}，历史 {}），提前触发 {:.1f}ms（上限 {:.0f}ms）'.format(
+                one_way_ms,
+                '{:.1f}ms'.format(measured_ms) if measured_ms is not None else '无',
+                '{:.1f}ms'.format(calibrated['one_way_ms']) if calibrated['one_way_ms'] is not None else '无',
+                lead_ms, limit_ms))
+        self.trigger_lead_info = {
+            'one_way_ms': one_way_ms,
+            'measured_one_way_ms': measured_ms,
+            'history_one_way_ms': calibrated['one_way_ms'],
+            'min_rtt_ms': min_rtt,
+            'limit_ms': limit_ms,
+            'lead_ms': lead_ms,
+            'correction_ms': self.timers.correction_ms,
+        }
+        self.timers.set_lead(lead_ms)
+        return lead_ms
+
+    def _apply_history_calibration(self, stages=calibration.MARATHON_STAGES):
+        """
+        读取历史抢购时序记录，输出预测与实际到达时刻的对比报告，并把京东时间修正量应用到Timer
+        历史文件在此（抢购开始前、只有主进程访问时）裁剪到最近几次抢购
+        :param stages: 估计单向延迟使用的请求阶段
+        :return: calibration.calibrate的返回值
+        """
+        try:
+            calibration.trim_history(self.campaign_recorder.history_file)
+            history = calibration.load_history(self.campaign_recorder.history_file)
+        except Exception as e:
+            logger.warning(f'读取抢购时序历史失败: {e}')
+            history = []
+        result = calibration.calibrate(history, stages)
+        for line in calibration.report(history, stages):
+            logger.info(f'📈 历史抢购时序: {line}')
+        if result['offset_correction_ms'] is not None:
+            self.timers.set_correction(result['offset_correction_ms'])
+            logger.info('📈 根据历史抢购修正京东时间 {:+.1f}ms（±{:.1f}ms）'.format(
+                result['offset_correction_ms'], result['offset_correction_error_ms']))
+        return result
+
+    def _timed_request(self, stage, method, url, **kwargs):
+        """
+        发送请求并记录计划触发时刻、实际发送时刻、收到响应时刻和服务器Date，用于下次抢购校准
+        :param stage: 请求阶段名称
+        :return: (响应, 时序记录dict)
+        """
+        if self.http2_client is not None and self.http2_client.handles(url):
+            return self._timed_send(stage, lambda: self.http2_client.request(method, url, **kwargs))
+        return self._timed_send(stage, lambda: self.session.request(method, url, **kwargs))
+
+    def _timed_send(self, stage, send):
+        """
+        调用send发送请求并记录时序，见_timed_request
+        :param send: 无参数，返回响应对象
+        :return: (响应, 时序记录dict)
+        """
+        with self._intended_lock:
+            intended_ms, self._next_intended_ms = self._next_intended_ms, None
+        send_ms = self.timers.jd_now_ms()
+        resp = send()
+        recv_ms = self.timers.jd_now_ms()
+        record = self.campaign_recorder.record(
+            stage, intended_ms if intended_ms is not None else send_ms, send_ms, recv_ms,
+            resp.headers.get('Date'))
+        return resp, record
 
     def request_seckill_url(self):
         """访问商品的抢购链接（用于设置cookie等"""
-        logger.info('用户:{}'.format(self.get_username()))
-        logger.info('商品名称:{}'.format(self.get_sku_title()))
-        self.timers.start()
+        # 抢购子进程不重复输出，由主进程输出一次；抢购失败后会重新进入本方法，
+        # 只读缓存（由各抢购入口的prefetch_metadata填充）
+        if self.worker_context is None:
+            logger.info('用户:{}'.format(self.get_username(cached_only=True)))
+            logger.info('商品名称:{}'.format(self.get_sku_title(cached_only=True)))
+        self.rank_seckill_hosts(max_age=global_config.getFloat('config', 'dns_rerank_interval', 600.0))
+        # 抢购子进程沿用主进程测得的提前量
+        if self.worker_context is None:
+            self.apply_trigger_lead()
+        self.campaign_recorder.begin(self.timers, self.sku_id, self.trigger_lead_info)
+        self.start_connection_warmer()
+        self.open_http2_client()
+        self.prepare_hot_path_requests()
+        self._wait_for_trigger()
+        if self.connection_warmer is not None:
+            self.connection_warmer.stop()
+        self._window_conn_stats = self.spider_session.connection_stats()
+        # 每次抢购重新生成下单模板
+        self.seckill_order_data.pop(self.sku_id, None)
+        self._order_token_stale = False
+        self.order_stats = {'submits': 0, 'init_calls': 0}
+        with self._intended_lock:
+            self._next_intended_ms = self.timers.trigger_time_ms()
         self.seckill_url[self.sku_id] = self.get_seckill_url()
+        if self.seckill_url[self.sku_id] is None:
+            raise SKException('已收到停止信号，未获取到抢购链接')
         logger.info('访问商品的抢购连接...')
         headers = {
             'User-Agent': self.user_agent,
             'Host': 'marathon.jd.com',
             'Referer': 'https://item.jd.com/{}.html'.format(self.sku_id),
         }
-        self.session.get(
+        self._timed_request(
+            'seckill_page', 'GET',
             url=self.seckill_url.get(
                 self.sku_id),
             headers=headers,
             allow_redirects=False)
 
+    def _wait_for_trigger(self):
+        """等待到触发时刻：多进程抢购时停在启动闸门上由主进程统一放行，否则由本进程的Timer精确等待"""
+        if self.start_gate is None:
+            self.timers.start()
+            return
+        logger.info('抢购准备完成，等待启动闸门放行')
+        self.release_skew_ms = self.start_gate.wait(self.timers.deadline_ns, self.timers.spin_ms)
+        logger.info('启动闸门已放行，放行偏差 {:.3f}ms'.format(self.release_skew_ms))
+
     def request_seckill_checkout_page(self):
         """访问抢购订单结算页面"""
         logger.info('访问抢购订单结算页面...')
+        if self.prepared_requests is not None:
+            self._timed_send('checkout', self.prepared_requests.checkout)
+            return
         url = 'https://marathon.jd.com/seckill/seckill.action'
         payload = {
             'skuId': self.sku_id,
@@ -1318,7 +1963,7 @@ class JdSeckill(object):
             'Host': 'marathon.jd.com',
             'Referer': 'https://item.jd.com/{}.html'.format(self.sku_id),
         }
-        self.session.get(url=url, params=payload, headers=headers, allow_redirects=False)
+        self._timed_request('checkout', 'GET', url=url, params=payload, headers=headers, allow_redirects=False)
 
     def _get_seckill_init_info(self):
         """获取秒杀初始化信息（包括：地址，发票，token）
@@ -1335,7 +1980,7 @@ class JdSeckill(object):
             'User-Agent': self.user_agent,
             'Host': 'marathon.jd.com',
         }
-        resp = self.session.post(url=url, data=data, headers=headers)
+        resp, _ = self._timed_request('init', 'POST', url=url, data=data, headers=headers)
 
         resp_json = None
         try:
@@ -1394,6 +2039,48 @@ class JdSeckill(object):
 
         return data
 
+    def _get_order_template(self):
+        """
+        获取缓存的下单请求体
+        地址、发票等静态字段只在第一次提交时通过init.action生成，之后的提交直接复用；
+        只有token被服务器拒绝后才重新调用init.action，并只替换token。
+        多线程同时抢购时由一个线程生成或刷新，其余线程等待后直接使用结果；
+        模板只读，刷新token时生成新的模板，其他线程正在提交的模板不受影响
+        :return: 请求体参数组成的只读dict
+        """
+        template = self.seckill_order_data.get(self.sku_id)
+        if template is not None and not self._order_token_stale:
+            return template
+        with self._order_lock:
+            template = self.seckill_order_data.get(self.sku_id)
+            if template is None:
+                template = MappingProxyType(self._get_seckill_order_data())
+            elif self._order_token_stale:
+                init_info = self._get_seckill_init_info()
+                self.seckill_init_info[self.sku_id] = init_info
+                template = MappingProxyType(dict(template, token=init_info['token']))
+            else:
+                return template
+            with self._stats_lock:
+                self.order_stats['init_calls'] += 1
+            self.seckill_order_data[self.sku_id] = template
+            self._order_token_stale = False
+        return template
+
+    def _mark_order_token_stale(self, order_data):
+        """下单token被拒绝：只有被拒绝的是当前模板时才需要刷新，其他线程已刷新过的不再重复刷新"""
+        if self.seckill_order_data.get(self.sku_id) is order_data:
+            self._order_token_stale = True
+
+    @staticmethod
+    def _is_order_token_rejected(resp_json):
+        """下单失败的原因是否为token失效"""
+        reject_codes = global_config.getRaw('config', 'order_token_reject_codes', fallback='')
+        if str(resp_json.get('resultCode')) in [code.strip() for code in reject_codes.split(',') if code.strip()]:
+            return True
+        error_message = str(resp_json.get('errorMessage', '')).lower()
+        return any(keyword in error_message for keyword in ORDER_TOKEN_REJECT_KEYWORDS)
+
     def submit_seckill_order(self):
         """提交抢购（秒杀）订单
         :return: 抢购结果 True/False
@@ -1403,30 +2090,36 @@ class JdSeckill(object):
             'skuId': self.sku_id,
         }
         try:
-            self.seckill_order_data[self.sku_id] = self._get_seckill_order_data()
+            order_data = self._get_order_template()
         except Exception as e:
             logger.info('抢购失败，无法获取生成订单的基本信息，接口返回:【{}】'.format(str(e)))
             return False
 
         logger.info('提交抢购订单...')
-        headers = {
-            'User-Agent': self.user_agent,
-            'Host': 'marathon.jd.com',
-            'Referer': 'https://marathon.jd.com/seckill/seckill.action?skuId={0}&num={1}&rid={2}'.format(
-                self.sku_id, self.seckill_num, int(time.time())),
-        }
-        resp = self.session.post(
-            url=url,
-            params=payload,
-            data=self.seckill_order_data.get(
-                self.sku_id),
-            headers=headers)
+        if self.prepared_requests is not None:
+            resp, timing = self._timed_send('submit', lambda: self.prepared_requests.submit(order_data))
+        else:
+            headers = {
+                'User-Agent': self.user_agent,
+                'Host': 'marathon.jd.com',
+                'Referer': 'https://marathon.jd.com/seckill/seckill.action?skuId={0}&num={1}&rid={2}'.format(
+                    self.sku_id, self.seckill_num, int(time.time())),
+            }
+            resp, timing = self._timed_request(
+                'submit', 'POST',
+                url=url,
+                params=payload,
+                data=order_data,
+                headers=headers)
+        with self._stats_lock:
+            self.order_stats['submits'] += 1
         resp_json = None
         try:
             resp_json = parse_json(resp.text)
         except Exception as e:
             logger.info('抢购失败，返回信息:{}'.format(resp.text[0: 128]))
             return False
+        timing['result_code'] = resp_json.get('resultCode')
         # 返回信息
         # 抢购失败：
         # {'errorMessage': '很遗憾没有抢到，再接再厉哦。', 'orderId': 0, 'resultCode': 60074, 'skuId': 0, 'success': False}
@@ -1459,6 +2152,9 @@ class JdSeckill(object):
             return True
         else:
             logger.info('抢购失败，返回信息:{}'.format(resp_json))
+            if self._is_order_token_rejected(resp_json):
+                logger.info('下单token被拒绝，下次提交前重新获取')
+                self._mark_order_token_stale(order_data)
 
             # 发送详细的抢购失败通知
             error_message = resp_json.get('errorMessage', '未知错误')
@@ -1531,7 +2227,8 @@ class JdSeckill(object):
 
     def get_time_status(self):
         """获取当前时间状态，判断应该执行什么操作"""
-        now = datetime.now()
+        # 使用单调时钟推算的京东时间，系统时间跳变不影响调度
+        now = self.timers.jd_datetime_now()
 
         # 获取配置的预约时间
         reserve_time_str = self.get_reserve_time_str()
@@ -1658,6 +2355,13 @@ class JdSeckill(object):
 
         reserve_completed = False
         seckill_completed = False
+        last_campaign_time = None
+
+        # 长期运行时后台定期校时并跟踪时钟漂移
+        drift_tracker = None
+        if global_config.getRaw('config', 'drift_tracking', fallback='true').strip().lower() == 'true':
+            drift_tracker = ClockDriftTracker(self.timers)
+            drift_tracker.start()
 
         while self.auto_mode_running:
             try:
@@ -1670,24 +2374,50 @@ class JdSeckill(object):
                 # 获取当前时间状态
                 time_status = self.get_time_status()
 
+                # 切换到下一个抢购日时重置当日状态
+                if last_campaign_time is not None and time_status['next_action_time'] != last_campaign_time:
+                    reserve_completed = False
+                    seckill_completed = False
+                    # 未开启后台校时时每个抢购日重新测量一次时间差，避免沿用多天前的锚点
+                    if drift_tracker is None:
+                        self.timers.resync()
+                        logger.info('切换到下一个抢购日，已重新校时：时间差 {}ms'.format(self.timers.diff_time))
+                last_campaign_time = time_status['next_action_time']
+
+                # 工作日的next_action_time即下一次抢购时间，Timer和后台校时都以它为目标
+                if time_status['status'] in ('reserve_time', 'seckill_time'):
+                    self.timers.set_buy_time(time_status['next_action_time'])
+                    # 边缘节点的延迟会变化，定期重新测量抢购域名的IP
+                    self.rank_seckill_hosts(max_age=global_config.getFloat('config', 'dns_rerank_interval', 600.0))
+                    self.prefetch_metadata()
+
                 # 显示状态面板
                 self.display_status_panel(time_status, reserve_completed, seckill_completed)
 
-                if time_status['status'] == 'waiting_reserve':
+                status = time_status['status']
+                # 预约完成且临近抢购时间时提前进入秒杀流程，由Timer按单调时钟精确等待到抢购时刻
+                if (status == 'reserve_time' and reserve_completed
+                        and time_status['time_to_action'] <= self.seckill_prepare_seconds):
+                    status = 'seckill_time'
+
+                if status == 'weekend':
+                    print("⏳ 周末不抢购，等待工作日...")
+                    self._sleep_before_action(time_status, 3600)
+
+                elif status == 'waiting_reserve':
                     if not reserve_completed:
                         print("⏳ 等待预约时间...")
                         sleep_time = min(300, time_status['time_to_action'] - 300)  # 提前5分钟准备
                         if sleep_time > 0:
-                            print(f"将在 {int(sleep_time)} 秒后重新检查")
-                            time.sleep(sleep_time)
+                            self._sleep_before_action(time_status, sleep_time)
                         else:
                             print("即将进入预约时间段")
-                            time.sleep(30)
+                            self._sleep_before_action(time_status, 30)
                     else:
                         print("✅ 预约已完成，等待秒杀时间")
-                        time.sleep(60)
+                        self._sleep_before_action(time_status, 60)
 
-                elif time_status['status'] == 'reserve_time':
+                elif status == 'reserve_time':
                     if not reserve_completed:
                         print("🎯 开始执行预约...")
                         try:
@@ -1696,12 +2426,12 @@ class JdSeckill(object):
                             # 预约成功通知已在make_reserve方法中发送
                         except Exception as e:
                             # 预约失败通知已在make_reserve方法中发送
-                            time.sleep(30)
+                            self._sleep_before_action(time_status, 30)
                     else:
                         print("✅ 预约已完成，等待秒杀时间")
-                        time.sleep(30)
+                        self._sleep_before_action(time_status, 30)
 
-                elif time_status['status'] == 'seckill_time':
+                elif status == 'seckill_time':
                     if not seckill_completed:
                         print("🔥 开始执行秒杀...")
                         try:
@@ -1722,19 +2452,17 @@ class JdSeckill(object):
                                 'error_message': str(e)
                             }
                             self.send_detailed_notification(notification_data)
-                            time.sleep(10)
+                            self._sleep_before_action(time_status, 10)
                     else:
                         print("✅ 秒杀已完成")
-                        time.sleep(60)
+                        self._sleep_before_action(time_status, 60)
 
-                elif time_status['status'] == 'finished':
+                elif status == 'finished':
                     print("🌙 今日任务完成，重置状态等待明天")
                     reserve_completed = False
                     seckill_completed = False
-                    # 等待到明天
-                    sleep_time = min(3600, time_status['time_to_action'])  # 最多等待1小时
-                    print(f"将在 {int(sleep_time)} 秒后重新检查")
-                    time.sleep(sleep_time)
+                    # 等待到明天，最多等待1小时
+                    self._sleep_before_action(time_status, 3600)
 
             except KeyboardInterrupt:
                 print("\n\n🛑 用户中断程序")
@@ -1746,8 +2474,26 @@ class JdSeckill(object):
                 print("程序将在30秒后重试...")
                 time.sleep(30)
 
+        if drift_tracker:
+            drift_tracker.stop()
         print("🏁 全自动化模式已停止")
 
+    def _sleep_before_action(self, time_status, max_wait):
+        """
+        等待到下一次状态检查：最多等待max_wait秒，且不越过秒杀准备时刻（准备时刻已过时只按max_wait等待）
+        以Timer锚定的单调时钟为准，系统时间跳变不影响唤醒时刻
+        :param time_status: get_time_status的返回值
+        :param max_wait: 最长等待秒数
+        """
+        now_ns = time.monotonic_ns()
+        deadline_ns = now_ns + int(max_wait * 1e9)
+        action_ms = Timer.datetime_to_ms(time_status['next_action_time']) - self.seckill_prepare_seconds * 1000
+        action_ns = self.timers.monotonic_deadline_ns(action_ms)
+        if action_ns > now_ns:
+            deadline_ns = min(deadline_ns, action_ns)
+        print(f"将在 {int((deadline_ns - now_ns) / 1e9)} 秒后重新检查")
+        self.timers.sleep_until(deadline_ns)
+
     def enhanced_error_handler(self, func, *args, **kwargs):
         """增强的错误处理器"""
         max_retries = 3
@@ -1797,6 +2543,14 @@ class JdSeckill(object):
 
     def safe_seckill(self):
         """安全的秒杀执行"""
+        self.prefetch_metadata()
+        if self.get_seckill_engine() == 'pipeline':
+            return self.enhanced_error_handler(self.pipeline_seckill)
+        worker_model = self.get_worker_model()
+        if worker_model == 'async':
+            return self.enhanced_error_handler(self.async_seckill)
+        if worker_model == 'thread':
+            return self.enhanced_error_handler(self.thread_seckill)
         return self.enhanced_error_handler(self._seckill)
 
     def send_notification(self, title, message, notification_type="info"):
@@ -1847,6 +2601,12 @@ class JdSeckill(object):
 
     def send_detailed_notification(self, notification_data):
         """发送详细的markdown格式通知"""
+        if self.worker_context is not None:
+            # 抢购子进程没有通知配置，下单成功的通知交给主进程发送
+            if notification_data.get('seckill_success'):
+                self.order_notification = notification_data
+            logger.info(f"详细通知: {notification_data.get('title', '通知')}")
+            return
         try:
             # 生成markdown格式消息
             markdown_message = self._generate_markdown_message(notification_data)
@@ -1896,7 +2656,7 @@ class JdSeckill(object):
             f"- **通知时间**: {current_time}",
             f"- **通知类型**: {data.get('type', '系统通知')}",
             f"- **用户账号**: {username}",
-            f"- **商品信息**: {self.get_sku_title() if hasattr(self, 'get_sku_title') else '未知商品'}",
+            f"- **商品信息**: {self.get_sku_title(cached_only=True)}",
             f""
         ]
 
@@ -0,0 +1,79 @@
+# -*- coding:utf-8 -*-
+"""
+用户与商品信息缓存
+用户名、商品名称只用于日志和通知，不影响下单；在抢购前预取一次，保存到本地文件并设置有效期，
+之后从内存读取，抢购流程中不再为它们发送请求
+"""
+import os
+import json
+import time
+
+from maotai.jd_logger import logger
+
+CACHE_FILE = './campaigns/metadata_cache.json'
+
+
+class MetadataCache(object):
+    """
+    带有效期的键值缓存，启动时从本地文件加载，写入时整体保存
+    值为空（None、空字符串）时不缓存，下次重新获取
+    """
+
+    def __init__(self, cache_file=CACHE_FILE, ttl=86400.0):
+        """
+        :param cache_file: 缓存文件路径
+        :param ttl: 有效期(秒)
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._items = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return dict()
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            return items if isinstance(items, dict) else dict()
+        except (OSError, ValueError) as e:
+            logger.warning(f'读取信息缓存失败: {e}')
+            return dict()
+
+    def _save(self):
+        try:
+            directory = os.path.dirname(self.cache_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            # 先写临时文件再替换，避免多个进程同时写入时留下不完整的文件
+            temp_file = '{}.{}.tmp'.format(self.cache_file, os.getpid())
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._items, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f'保存信息缓存失败: {e}')
+
+    def get(self, key):
+        """
+        :return: 未过期的缓存值，不存在或已过期返回None
+        """
+        item = self._items.get(key)
+        if not item or time.time() - item.get('updated_at', 0) > self.ttl:
+            return None
+        return item.get('value')
+
+    def set(self, key, value):
+        if not value:
+            return
+        self._items[key] = {'value': value, 'updated_at': time.time()}
+        self._save()
+
+    def get_or_fetch(self, key, fetch):
+        """
+        读取缓存，不存在或已过期时调用fetch获取并写入缓存
+        :param fetch: 无参数，返回要缓存的值
+        """
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            self.set(key, value)
+        return value
@@ -0,0 +1,206 @@
+# -*- coding:utf-8 -*-
+"""
+流水线抢购引擎
+一次抢购尝试包含结算页、下单两个串行往返（init.action生成的下单模板已缓存，只在首次下单和token被拒绝后
+随下单阶段请求），顺序执行时每个阶段都要空等一个RTT。
+流水线引擎同时保持depth个尝试在途，并把各尝试的开始时刻错开，使它们处在不同阶段：
+当前尝试等待下单响应时，下一个尝试的结算页请求已经发出
+"""
+import time
+import threading
+
+from maotai.jd_logger import logger
+from maotai.stats import percentile
+
+
+class StageStats(object):
+    """单个阶段的排队深度（进入该阶段时已在该阶段的尝试数，含自身）与耗时统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self.in_flight = 0
+        self.depths = []
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """:return: 进入阶段的perf_counter时刻"""
+        with self._lock:
+            self.in_flight += 1
+            self.depths.append(self.in_flight)
+        return time.perf_counter()
+
+    def leave(self, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            self.in_flight -= 1
+            self.latencies.append(elapsed_ms)
+        return elapsed_ms
+
+    def summary(self):
+        with self._lock:
+            depths, latencies = list(self.depths), list(self.latencies)
+        return {
+            'stage': self.name,
+            'count': len(latencies),
+            'depth_mean': sum(depths) / len(depths) if depths else 0.0,
+            'depth_max': max(depths) if depths else 0,
+            'p50_ms': percentile(latencies, 50),
+            'p90_ms': percentile(latencies, 90),
+            'max_ms': max(latencies) if latencies else 0.0,
+        }
+
+
+def default_stages(seckill):
+    """
+    默认的抢购阶段：结算页、下单，每个阶段一个网络往返
+    下单模板的获取（缓存未命中时调用init.action）包含在submit_seckill_order中，不单独作为阶段
+    :return: [(阶段名, 无参数函数), ...]
+    """
+    return [
+        ('checkout', seckill.request_seckill_checkout_page),
+        ('submit', seckill.submit_seckill_order),
+    ]
+
+
+class PipelinedSeckillEngine(object):
+    """
+    流水线抢购引擎
+    - depth个工作线程各自循环执行完整的尝试（各阶段按顺序），共享同一个Session与Cookie
+    - 相邻两个尝试的开始时刻至少间隔 一次尝试的平均耗时/depth，使在途尝试均匀分布在各阶段；
+      还没有完成的尝试时使用stagger_ms
+    - 任一尝试下单成功后不再开始新的尝试与新的阶段；run在返回前等待已发出的请求结束（最多join_timeout秒），
+      调用方随后关闭连接时不会有线程仍在发送请求
+    - run的返回值与submit_seckill_order一致：成功True，失败False
+    """
+
+    def __init__(self, seckill, depth=3, stages=None, stagger_ms=30.0, max_attempts=200, duration=120.0,
+                 join_timeout=10.0):
+        """
+        :param seckill: JdSeckill，需已调用request_seckill_url
+        :param depth: 同时在途的尝试数，不应超过连接池大小
+        :param stages: [(阶段名, 无参数函数), ...]，最后一个阶段返回下单结果；默认为default_stages(seckill)
+        :param stagger_ms: 初始的尝试开始间隔(ms)
+        :param max_attempts: 最多尝试次数
+        :param duration: 最长抢购时间(秒)
+        :param join_timeout: 结束时等待工作线程退出的最长时间(秒)
+        """
+        self.seckill = seckill
+        self.depth = max(1, depth)
+        self.stages = stages or default_stages(seckill)
+        self.stage_stats = [StageStats(name) for name, _ in self.stages]
+        self.stagger_ms = stagger_ms
+        self.max_attempts = max_attempts
+        self.duration = duration
+        self.join_timeout = join_timeout
+        self.attempts = 0
+        self.errors = 0
+        self.success = False
+        self._attempt_ms = None  # 一次尝试耗时的指数移动平均
+        self._last_start = 0.0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._deadline = None
+        self._active = 0
+
+    def run(self):
+        """
+        阻塞运行直到下单成功、达到尝试次数上限或超过最长抢购时间
+        :return: 抢购结果 True/False
+        """
+        start = time.perf_counter()
+        self._deadline = start + self.duration
+        workers = [threading.Thread(target=self._worker, name='pipeline-{}'.format(i), daemon=True)
+                   for i in range(self.depth)]
+        self._active = len(workers)
+        for worker in workers:
+            worker.start()
+        # 下单成功或所有线程都已结束时_done被设置
+        self._done.wait(self.duration)
+        # 成功或超时后通知其余线程退出，并等待已发出的请求返回（其下单结果仍然有效）
+        self._done.set()
+        join_deadline = time.perf_counter() + self.join_timeout
+        for worker in workers:
+            worker.join(max(0.0, join_deadline - time.perf_counter()))
+        alive = sum(1 for worker in workers if worker.is_alive())
+        if alive:
+            logger.warning(f'流水线引擎仍有 {alive} 个线程的请求未返回')
+
+        logger.info('流水线抢购引擎结束：{}，深度 {}，尝试 {} 次，异常 {} 次，耗时 {:.2f}秒'.format(
+            '成功' if self.success else '未成功', self.depth, self.attempts, self.errors,
+            time.perf_counter() - start))
+        self.log_stage_stats()
+        return self.success
+
+    def log_stage_stats(self):
+        """输出各阶段的排队深度与耗时"""
+        for item in self.stage_stats:
+            summary = item.summary()
+            if not summary['count']:
+                continue
+            logger.info('📊 阶段 {stage}：{count} 次，在途深度 平均 {depth_mean:.1f} 最大 {depth_max}，'
+                        '耗时 p50 {p50_ms:.1f}ms p90 {p90_ms:.1f}ms 最大 {max_ms:.1f}ms'.format(**summary))
+
+    def _next_start(self):
+        """
+        领取下一次尝试的开始时刻
+        :return: 需要等待的秒数，不应再开始新的尝试时返回None
+        """
+        with self._lock:
+            if self._done.is_set() or self.attempts >= self.max_attempts:
+                return None
+            now = time.perf_counter()
+            if now >= self._deadline:
+                return None
+            stagger_ms = self._attempt_ms / self.depth if self._attempt_ms else self.stagger_ms
+            start = max(now, self._last_start + stagger_ms / 1000.0)
+            self._last_start = start
+            self.attempts += 1
+            return start - now
+
+    def _worker(self):
+        try:
+            self._attempt_loop()
+        finally:
+            with self._lock:
+                self._active -= 1
+                if self._active == 0:
+                    self._done.set()
+
+    def _attempt_loop(self):
+        while True:
+            delay = self._next_start()
+            if delay is None:
+                return
+            if delay > 0 and self._done.wait(delay):
+                return
+            attempt_start = time.perf_counter()
+            try:
+                result = self._attempt()
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                wait_time = self.seckill.smart_error_handler(str(e))
+                if wait_time > 0 and self._done.wait(wait_time):
+                    return
+                continue
+            attempt_ms = (time.perf_counter() - attempt_start) * 1000.0
+            with self._lock:
+                self._attempt_ms = attempt_ms if self._attempt_ms is None else \
+                    0.8 * self._attempt_ms + 0.2 * attempt_ms
+            if result:
+                self.success = True
+                self._done.set()
+                return
+
+    def _attempt(self):
+        result = None
+        for (name, func), stats in zip(self.stages, self.stage_stats):
+            if self._done.is_set():
+                return False
+            started = stats.enter()
+            try:
+                result = func()
+            finally:
+                stats.leave(started)
+        return result
@@ -0,0 +1,110 @@
+# -*- coding:utf-8 -*-
+"""
+抢购热路径的预处理请求
+结算页与下单请求在抢购开始前准备好：URL、请求头、环境设置（代理、证书）只计算一次，下单请求体预先编码为bytes，
+每次发送只替换 rid（时间戳）、token 和 Cookie 头，省去每次尝试中的请求头合并、表单编码和请求准备
+"""
+import time
+from urllib.parse import quote_plus, urlencode
+
+import requests
+from requests.models import RequestEncodingMixin
+
+CHECKOUT_URL = 'https://marathon.jd.com/seckill/seckill.action'
+SUBMIT_URL = 'https://marathon.jd.com/seckillnew/orderService/pc/submitOrder.action'
+
+
+class PreparedSeckillRequests(object):
+    """
+    结算页与下单的预处理请求
+    - requests后端：用session.prepare_request准备一次，发送时复制PreparedRequest并替换可变部分后用session.send发送
+    - 其他后端（如CurlSession）：使用预先拼好的URL、请求头和请求体调用session.request
+    """
+
+    def __init__(self, session, sku_id, seckill_num, user_agent):
+        self.session = session
+        self.sku_id = sku_id
+        self.seckill_num = seckill_num
+        self.user_agent = user_agent
+        # 结算页：除rid外的URL与请求头
+        self._checkout_url_prefix = '{}?{}&rid='.format(
+            CHECKOUT_URL, urlencode({'skuId': sku_id, 'num': seckill_num}))
+        self._checkout_headers = {
+            'User-Agent': user_agent,
+            'Host': 'marathon.jd.com',
+            'Referer': 'https://item.jd.com/{}.html'.format(sku_id),
+        }
+        # 下单：除rid外的Referer与请求头
+        self._submit_url = '{}?{}'.format(SUBMIT_URL, urlencode({'skuId': sku_id}))
+        self._submit_referer_prefix = 'https://marathon.jd.com/seckill/seckill.action?skuId={0}&num={1}&rid='.format(
+            sku_id, seckill_num)
+        self._submit_headers = {
+            'User-Agent': user_agent,
+            'Host': 'marathon.jd.com',
+            'Referer': self._submit_referer_prefix,
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+        # 下单请求体缓存：不含token的部分按模板对象缓存，token变化时只重新编码token
+        # (模板, 前缀)与(模板, token, 请求体)，都整体替换，多线程同时编码时不会读到不同模板的前缀与token
+        self._prefix = None
+        self._encoded = None
+
+        self._prepared = hasattr(session, 'prepare_request')
+        if self._prepared:
+            self._checkout_template = session.prepare_request(requests.Request(
+                'GET', self._checkout_url_prefix + '0', headers=self._checkout_headers))
+            self._submit_template = session.prepare_request(requests.Request(
+                'POST', self._submit_url, headers=self._submit_headers, data=b''))
+            self._send_kwargs = session.merge_environment_settings(CHECKOUT_URL, {}, None, None, None)
+
+    def encode_body(self, order_data):
+        """
+        编码下单请求体，编码规则与requests相同（值为None的字段不发送）
+        :param order_data: 下单模板dict，模板对象不变时只重新编码token
+        :return: bytes
+        """
+        token = order_data.get('token')
+        encoded = self._encoded
+        if encoded is not None and encoded[0] is order_data and encoded[1] == token:
+            return encoded[2]
+        prefix = self._prefix
+        if prefix is None or prefix[0] is not order_data:
+            fields = [(k, v) for k, v in order_data.items() if k != 'token']
+            prefix = (order_data, RequestEncodingMixin._encode_params(fields).encode('utf-8') + b'&token=')
+            self._prefix = prefix
+        body = prefix[1] + quote_plus(str(token)).encode('utf-8')
+        self._encoded = (order_data, token, body)
+        return body
+
+    def _send(self, template, url, headers, body, allow_redirects):
+        prepared = template.copy()
+        prepared.url = url
+        prepared.headers.update(headers)
+        if body is not None:
+            prepared.body = body
+            prepared.headers['Content-Length'] = str(len(body))
+        # Cookie可能被之前的响应更新，每次按当前cookie jar重新生成
+        prepared.headers.pop('Cookie', None)
+        prepared.prepare_cookies(self.session.cookies)
+        return self.session.send(prepared, allow_redirects=allow_redirects, **self._send_kwargs)
+
+    def checkout(self):
+        """发送结算页请求"""
+        url = self._checkout_url_prefix + str(int(time.time()))
+        if self._prepared:
+            return self._send(self._checkout_template, url, {}, None, allow_redirects=False)
+        return self.session.request('GET', url, headers=self._checkout_headers, allow_redirects=False)
+
+    def submit(self, order_data):
+        """
+        发送下单请求
+        :param order_data: 下单模板dict
+        """
+        body = self.encode_body(order_data)
+        referer = self._submit_referer_prefix + str(int(time.time()))
+        if self._prepared:
+            return self._send(self._submit_template, self._submit_url, {'Referer': referer}, body,
+                              allow_redirects=True)
+        headers = dict(self._submit_headers)
+        headers['Referer'] = referer
+        return self.session.request('POST', self._submit_url, data=body, headers=headers)
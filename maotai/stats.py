@@ -0,0 +1,18 @@
+# -*- coding:utf-8 -*-
+"""
+统计工具：各抢购模块输出耗时、偏差分布时共用
+"""
+
+
+def percentile(values, q):
+    """
+    按最近秩取百分位数
+    :param values: 数值序列
+    :param q: 百分位(0-100)
+    :return: 百分位数，values为空返回0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
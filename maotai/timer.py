@@ -1,15 +1,50 @@
 # -*- coding:utf-8 -*-
 import time
+import random
 import requests
 import json
+import math
+import statistics
+import threading
+import email.utils
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from maotai.jd_logger import logger
 from maotai.config import global_config
 
+# 一次时间差测量结果
+# offset: 本地时间减服务器时间(ms)；rtt: 请求往返耗时(ms)；error: 误差上界(ms)，None表示未知
+OffsetSample = namedtuple('OffsetSample', ['source', 'offset', 'rtt', 'error'])
+
+
+def narrow_offset(probe, lower, upper, min_rtt):
+    """
+    用一次Date探测结果收窄时间差区间
+    服务器在[Date, Date+1000)内处理请求，处理时刻位于本地的[send, recv]之间
+    :param probe: (本地发送时刻ms, 本地接收时刻ms, 服务器Date ms)
+    :return: (lower, upper, min_rtt)，lower/upper为 本地时间 - 服务器时间 的区间
+    """
+    send_ms, recv_ms, date_ms = probe
+    lower = max(lower, send_ms - (date_ms + 1000.0))
+    upper = min(upper, recv_ms - date_ms)
+    return lower, upper, min(min_rtt, recv_ms - send_ms)
+
 
 class Timer(object):
-    def __init__(self, sleep_interval=0.5):
+    # 各时间源返回值的分辨率(ms)，服务器时间会被截断到该精度
+    SOURCE_RESOLUTION_MS = {
+        '_get_jd_time_from_page': 1000,      # HTTP Date头只精确到秒
+        '_get_time_from_worldclock': 60000,  # worldclockapi只精确到分钟
+        '_get_time_from_beijing_time': 1,
+    }
+
+    def __init__(self, sleep_interval=0.5, sync=True):
+        """
+        :param sleep_interval: legacy触发方式的轮询间隔(秒)
+        :param sync: 是否立即测量时间差，为False时以本地时间为准，可稍后调用resync
+        """
         # '2018-09-28 22:45:50.000'
         # buy_time = 2020-12-22 09:59:59.500
         localtime = time.localtime(time.time())
@@ -35,48 +70,126 @@ class Timer(object):
         #                 localtime.tm_mday + 1).__str__() + ' ' + buy_time_everyday,
         #         "%Y-%m-%d %H:%M:%S.%f")
         else:
-            self.buy_time = datetime.strptime(
-                localtime.tm_year.__str__() + '-' + localtime.tm_mon.__str__() + '-' + (
-                        localtime.tm_mday + 1).__str__() + ' ' + buy_time_everyday,
-                "%Y-%m-%d %H:%M:%S.%f")
+            # 取明天的购买时间（用timedelta避免月末日期越界）
+            self.buy_time = buy_time_config + timedelta(days=1)
 
         # self.buy_time = buy_time_config
         print("购买时间：{}".format(self.buy_time))
 
-        self.buy_time_ms = int(time.mktime(self.buy_time.timetuple()) * 1000.0 + self.buy_time.microsecond / 1000)
+        self.buy_time_ms = self.datetime_to_ms(self.buy_time)
         self.sleep_interval = sleep_interval
 
+        # 每个时间源的采样次数，取往返耗时最小的一次
+        self.sync_samples = max(1, global_config.getInt('config', 'time_sync_samples', 5))
+        # 校时方式：sample 多次采样；edge 通过Date头的秒跳变边沿获取亚秒级精度
+        self.sync_mode = global_config.getRaw('config', 'time_sync_mode', fallback='sample').strip().lower()
+        # Date头时间源地址（京东页面时间源与边沿检测共用），任何返回Date头的服务器均可
+        self.sync_url = global_config.getRaw('config', 'time_sync_url', fallback='https://www.jd.com').strip()
+        # 边沿检测相邻探测请求的最小间隔(ms)
+        self.edge_probe_interval_ms = global_config.getFloat('config', 'time_sync_edge_interval_ms', 5.0)
+        # 并发校时：得到quorum个时间源的结果后即取消其余较慢的时间源
+        self.sync_quorum = max(1, global_config.getInt('config', 'time_sync_quorum', 2))
+        # 并发校时的总超时时间(秒)
+        self.sync_timeout = global_config.getFloat('config', 'time_sync_timeout', 5.0)
+        # 触发方式：precise 粗睡眠+忙等待的高精度触发；legacy 按sleep_interval轮询
+        self.trigger_mode = global_config.getRaw('config', 'trigger_mode', fallback='precise').strip().lower()
+        # precise模式下，距离触发时刻不足该值(ms)时改为忙等待
+        self.spin_ms = global_config.getFloat('config', 'trigger_spin_ms', 5.0)
+        # 每次触发的实际误差(ms)，正数表示晚于设定时刻
+        self.wake_errors = []
+        # 提前触发量(ms)：补偿请求到达服务器的单向延迟，使请求在购买时间到达而不是在购买时间发出
+        self.lead_ms = 0.0
+        # 根据历史抢购校准得到的京东时间修正量(ms)，叠加在测得的时间差之上
+        self.correction_ms = 0.0
+        # 时间差的误差上界(ms)，None表示未知（仅使用了本地时间）
+        self.diff_error = None
+        self.diff_time = self.local_jd_time_diff() if sync else 0
+        # 把京东时间锚定到单调时钟，之后的所有等待都以单调时钟为准，不受系统时间跳变影响
+        self.anchor()
+
+    @staticmethod
+    def datetime_to_ms(dt):
+        """本地datetime转毫秒时间戳"""
+        return int(time.mktime(dt.timetuple()) * 1000.0 + dt.microsecond / 1000)
+
+    def anchor(self, mono_ns=None, jd_ms=None):
+        """
+        记录单调时钟与京东时间的对应关系，并重新计算购买时间对应的单调时钟时刻
+        只在时间差重新测量后调用
+        :param mono_ns: 锚点的单调时钟时刻(ns)，默认取当前时刻并按diff_time推算京东时间
+        :param jd_ms: 锚点对应的京东毫秒时间
+        """
+        if mono_ns is None:
+            mono_ns = time.monotonic_ns()
+            jd_ms = time.time() * 1000.0 - self.diff_time
+        # 锚点以一个元组整体替换，后台校时线程更新时其他线程不会读到新旧混合的锚点
+        self._anchor = (mono_ns, jd_ms + self.correction_ms)
+        self.deadline_ns = self.monotonic_deadline_ns(self.trigger_time_ms())
+
+    def resync(self):
+        """重新测量时间差并重新锚定"""
         self.diff_time = self.local_jd_time_diff()
+        self.anchor()
+        return self.diff_time
 
-    def jd_time(self):
+    def set_buy_time(self, buy_time):
         """
-        获取网络时间毫秒（多种备选方案）
-        :return:
+        更新购买时间（长期运行时切换到下一个抢购日）
+        :param buy_time: 本地datetime
         """
-        # 尝试多个时间源
-        time_sources = [
-            self._get_jd_time_from_page,
-            self._get_time_from_worldclock,
-            self._get_time_from_beijing_time,
-            self._get_local_time_as_fallback
-        ]
+        self.buy_time = buy_time
+        self.buy_time_ms = self.datetime_to_ms(buy_time)
+        self.deadline_ns = self.monotonic_deadline_ns(self.trigger_time_ms())
 
-        for source in time_sources:
-            try:
-                result = source()
-                if result:
-                    return result
-            except Exception as e:
-                logger.debug(f'时间源 {source.__name__} 失败: {e}')
-                continue
+    def set_correction(self, correction_ms):
+        """
+        设置京东时间修正量，之后每次重新锚定都会叠加该修正量
+        :param correction_ms: 修正的毫秒数，正数表示京东时间比测得的更晚
+        """
+        previous = self.correction_ms
+        self.correction_ms = correction_ms
+        mono_ns, jd_ms = self._anchor
+        self.anchor(mono_ns, jd_ms - previous)
 
-        # 所有方案都失败，使用本地时间
-        logger.warning('所有网络时间源都失败，使用本地时间')
-        return self.local_time()
+    def set_lead(self, lead_ms):
+        """
+        设置提前触发量
+        :param lead_ms: 提前的毫秒数
+        """
+        self.lead_ms = max(0.0, lead_ms)
+        self.deadline_ns = self.monotonic_deadline_ns(self.trigger_time_ms())
+
+    def trigger_time_ms(self):
+        """实际触发的京东毫秒时间：购买时间减去提前量"""
+        return self.buy_time_ms - self.lead_ms
+
+    def monotonic_deadline_ns(self, jd_ms):
+        """
+        京东毫秒时间转换为单调时钟时刻(ns)
+        :param jd_ms: 京东毫秒时间
+        """
+        anchor_mono_ns, anchor_jd_ms = self._anchor
+        return anchor_mono_ns + int((jd_ms - anchor_jd_ms) * 1e6)
+
+    def jd_now_ms(self):
+        """由单调时钟推算的当前京东毫秒时间"""
+        anchor_mono_ns, anchor_jd_ms = self._anchor
+        return anchor_jd_ms + (time.monotonic_ns() - anchor_mono_ns) / 1e6
+
+    def jd_datetime_now(self):
+        """由单调时钟推算的当前京东时间(datetime)，用于长期运行时的调度"""
+        return datetime.fromtimestamp(self.jd_now_ms() / 1000.0)
+
+    def jd_time(self):
+        """
+        获取网络时间毫秒（多个时间源并发查询取共识）
+        :return:
+        """
+        return int(round(self.local_time() - self.measure_offset().offset))
 
     def _get_jd_time_from_page(self):
         """从京东页面获取时间"""
-        url = 'https://www.jd.com'
+        url = self.sync_url
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
@@ -116,11 +229,6 @@ class Timer(object):
                 return int(timestamp)
         return None
 
-    def _get_local_time_as_fallback(self):
-        """本地时间作为最后备选"""
-        logger.info('使用本地时间作为时间源')
-        return self.local_time()
-
     def local_time(self):
         """
         获取本地毫秒时间
@@ -133,15 +241,428 @@ class Timer(object):
         计算本地与京东服务器时间差
         :return:
         """
-        return self.local_time() - self.jd_time()
+        sample = self.measure_offset()
+        self.diff_error = sample.error
+        if sample.error is not None:
+            logger.info('时间同步：来源 {}，时间差 {:.1f}ms，往返 {:.1f}ms，误差 ±{:.1f}ms'.format(
+                sample.source, sample.offset, sample.rtt, sample.error))
+        return int(round(sample.offset))
+
+    def measure_offset(self):
+        """
+        测量本地与服务器的时间差：并发查询所有时间源，按误差加权取中位数作为共识
+        :return: OffsetSample
+        """
+        if self.sync_mode == 'edge':
+            sample = self.measure_offset_by_date_edge()
+            if sample:
+                return sample
+            logger.warning('Date头边沿检测失败，改用多次采样校时')
+
+        time_sources = [
+            self._get_jd_time_from_page,
+            self._get_time_from_worldclock,
+            self._get_time_from_beijing_time,
+        ]
+
+        results = self._probe_sources_concurrently(time_sources)
+        if not results:
+            logger.warning('所有网络时间源都失败，使用本地时间')
+            return OffsetSample('local', 0.0, 0.0, None)
+
+        consensus = self._weighted_median(results)
+        for sample in results:
+            logger.info('时间源 {}：时间差 {:.1f}ms，误差 ±{:.1f}ms，与共识相差 {:+.1f}ms'.format(
+                sample.source, sample.offset, sample.error, sample.offset - consensus.offset))
+        return consensus
+
+    def _probe_sources_concurrently(self, sources):
+        """
+        并发查询所有时间源，得到quorum个结果或超时后取消其余时间源
+        :param sources: 时间源函数列表
+        :return: 每个成功时间源的最佳OffsetSample列表
+        """
+        quorum = min(self.sync_quorum, len(sources))
+        stop_event = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(sources))
+        futures = {executor.submit(self._sample_source, source, self.sync_samples, stop_event): source
+                   for source in sources}
+        pending = set(futures)
+        results = []
+        deadline = time.monotonic() + self.sync_timeout
+        try:
+            while pending and len(results) < quorum:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        samples = future.result()
+                    except Exception as e:
+                        logger.debug(f'时间源 {futures[future].__name__} 失败: {e}')
+                        continue
+                    if samples:
+                        results.append(self._select_best_sample(samples))
+        finally:
+            # 通知仍在采样的时间源尽快结束，不等待其返回
+            stop_event.set()
+            for future in pending:
+                future.cancel()
+                logger.debug(f'时间源 {futures[future].__name__} 响应较慢，已取消')
+            executor.shutdown(wait=False)
+        return results
+
+    @staticmethod
+    def _weighted_median(samples):
+        """
+        按误差倒数加权取时间差的中位数，误差越小（RTT越短、分辨率越高）的时间源权重越大
+        :param samples: OffsetSample列表
+        :return: 位于加权中位数的OffsetSample
+        """
+        ordered = sorted(samples, key=lambda s: s.offset)
+        weights = [1.0 / max(s.error, 1.0) for s in ordered]
+        half = sum(weights) / 2.0
+        accumulated = 0.0
+        for sample, weight in zip(ordered, weights):
+            accumulated += weight
+            if accumulated >= half:
+                return sample
+        return ordered[-1]
+
+    def _sample_source(self, source, count, stop_event=None):
+        """
+        对单个时间源采样count次，每次用单调时钟记录收发时刻并按RTT/2修正
+        :param source: 返回服务器毫秒时间的函数
+        :param count: 采样次数
+        :param stop_event: 设置后停止后续采样
+        :return: OffsetSample列表
+        """
+        resolution = self.SOURCE_RESOLUTION_MS.get(source.__name__, 1)
+        samples = []
+        for _ in range(count):
+            if stop_event is not None and stop_event.is_set():
+                break
+            send_ns = time.perf_counter_ns()
+            send_wall_ms = time.time() * 1000.0
+            try:
+                server_ms = source()
+            except Exception as e:
+                logger.debug(f'时间源 {source.__name__} 失败: {e}')
+                continue
+            rtt = (time.perf_counter_ns() - send_ns) / 1e6
+            if not server_ms:
+                continue
+            # 服务器时间被截断到分辨率，取区间中点；请求在服务器处理的时刻近似为本地发送后RTT/2
+            server_mid_ms = server_ms + resolution / 2.0
+            local_mid_ms = send_wall_ms + rtt / 2.0
+            samples.append(OffsetSample(source.__name__, local_mid_ms - server_mid_ms, rtt,
+                                        rtt / 2.0 + resolution / 2.0))
+        return samples
+
+    @staticmethod
+    def _select_best_sample(samples):
+        """
+        剔除时间差偏离中位数超出误差范围的异常样本后，取往返耗时最小的样本
+        :param samples: OffsetSample列表
+        :return: OffsetSample
+        """
+        median_offset = statistics.median(s.offset for s in samples)
+        median_error = statistics.median(s.error for s in samples)
+        kept = [s for s in samples if abs(s.offset - median_offset) <= s.error + median_error] or samples
+        return min(kept, key=lambda s: s.rtt)
+
+    def measure_offset_by_date_edge(self, max_rounds=4, target_error_ms=1.0):
+        """
+        通过HTTP Date头的秒跳变边沿测量时间差
+        Date头只精确到秒：服务器在[D, D+1000)内处理的请求都返回D。每个探测请求把时间差限定在
+        (发送时刻 - (D+1000), 接收时刻 - D] 内，在预测的秒跳变时刻附近密集探测并求所有区间的交集，
+        即可从只报告整秒的服务器得到毫秒级的时间差
+        :param max_rounds: 最多探测的秒跳变次数
+        :param target_error_ms: 误差达到该值后提前结束
+        :return: OffsetSample，失败返回None
+        """
+        lower, upper = -math.inf, math.inf
+        min_rtt = math.inf
+        session = requests.Session()
+        try:
+            # 前两次请求用于建立连接并得到初始区间
+            for _ in range(2):
+                probe = self._probe_date(session)
+                if not probe:
+                    return None
+                lower, upper, min_rtt = narrow_offset(probe, lower, upper, min_rtt)
+
+            for _ in range(max_rounds):
+                # 预测下一次秒跳变对应的本地时间区间 [boundary + lower, boundary + upper]
+                offset_mid = (lower + upper) / 2.0
+                server_now_ms = self.local_time() - offset_mid
+                boundary_ms = math.ceil((server_now_ms + min_rtt) / 1000.0) * 1000
+                window_start = boundary_ms + lower - min_rtt / 2.0
+                window_end = boundary_ms + upper + min_rtt / 2.0
+
+                wait_ms = window_start - self.local_time()
+                if wait_ms > 0:
+                    time.sleep(wait_ms / 1000.0)
+
+                probes = 0
+                while probes < 2 or self.local_time() < window_end:
+                    probe_start = time.perf_counter()
+                    probe = self._probe_date(session)
+                    if not probe:
+                        return None
+                    lower, upper, min_rtt = narrow_offset(probe, lower, upper, min_rtt)
+                    probes += 1
+                    remain = self.edge_probe_interval_ms / 1000.0 - (time.perf_counter() - probe_start)
+                    if remain > 0:
+                        time.sleep(remain)
+
+                if lower > upper:
+                    # 区间为空，说明服务器Date不一致（如多台后端时钟不同），放弃边沿检测
+                    logger.warning('Date头边沿检测结果不一致，区间为空')
+                    return None
+                if upper - lower <= target_error_ms * 2:
+                    break
+        except Exception as e:
+            logger.debug(f'Date头边沿检测失败: {e}')
+            return None
+        finally:
+            session.close()
+
+        if math.isinf(lower) or math.isinf(upper):
+            return None
+        return OffsetSample('date_edge', (lower + upper) / 2.0, min_rtt, (upper - lower) / 2.0)
+
+    def _probe_date(self, session):
+        """
+        发送一次轻量HEAD请求读取服务器Date头
+        :return: (发送时刻ms, 接收时刻ms, Date毫秒时间戳)，失败返回None
+        """
+        send_ns = time.perf_counter_ns()
+        send_wall_ms = time.time() * 1000.0
+        resp = session.head(self.sync_url, timeout=3, allow_redirects=False)
+        recv_wall_ms = send_wall_ms + (time.perf_counter_ns() - send_ns) / 1e6
+        server_date = resp.headers.get('Date')
+        if not server_date:
+            return None
+        date_ms = email.utils.parsedate_to_datetime(server_date).timestamp() * 1000.0
+        return send_wall_ms, recv_wall_ms, date_ms
 
     def start(self):
-        logger.info('正在等待到达设定时间:{}，检测本地时间与京东服务器时间误差为【{}】毫秒'.format(self.buy_time, self.diff_time))
+        logger.info('正在等待到达设定时间:{}，检测本地时间与京东服务器时间误差为【{}】毫秒，提前触发【{:.1f}】毫秒'.format(
+            self.buy_time, self.diff_time, self.lead_ms))
+        if self.trigger_mode == 'legacy':
+            while True:
+                # 由单调时钟推算京东时间，系统时间跳变不影响触发时刻
+                # 具体精度依赖获取京东服务器时间的网络时间损耗
+                if self.jd_now_ms() >= self.trigger_time_ms():
+                    break
+                else:
+                    time.sleep(self.sleep_interval)
+            wake_error = self.jd_now_ms() - self.trigger_time_ms()
+        else:
+            wake_error = self.sleep_until()
+
+        self.wake_errors.append(wake_error)
+        logger.info('时间到达，开始执行……（触发误差 {:.3f}ms）'.format(wake_error))
+
+    def sleep_until(self, deadline_ns=None):
+        """
+        高精度等待到单调时钟时刻deadline_ns
+        先用time.sleep粗等待到触发前spin_ms毫秒（Linux下time.sleep基于clock_nanosleep，唤醒误差通常在百微秒内），
+        再用perf_counter忙等待（Windows下monotonic分辨率较低，perf_counter精度更高），使唤醒误差远小于1ms
+        :param deadline_ns: 单调时钟时刻(ns)，由monotonic_deadline_ns得到；默认等待购买时间，
+                            每段睡眠后重新读取，后台校时更新的锚点会立即生效
+        :return: 实际唤醒误差(ms)，正数表示晚于设定时刻
+        """
+        spin_ns = int(self.spin_ms * 1e6)
         while True:
-            # 本地时间减去与京东的时间差，能够将时间误差提升到0.1秒附近
-            # 具体精度依赖获取京东服务器时间的网络时间损耗
-            if self.local_time() - self.diff_time >= self.buy_time_ms:
-                logger.info('时间到达，开始执行……')
+            target_ns = self.deadline_ns if deadline_ns is None else deadline_ns
+            remaining_ns = target_ns - time.monotonic_ns()
+            if remaining_ns <= spin_ns:
                 break
-            else:
-                time.sleep(self.sleep_interval)
+            # 分段睡眠，每段最多1秒
+            time.sleep(min(remaining_ns - spin_ns, 1e9) / 1e9)
+
+        target_perf = time.perf_counter() + (target_ns - time.monotonic_ns()) / 1e9
+        while time.perf_counter() < target_perf:
+            pass
+        return (time.perf_counter() - target_perf) * 1000.0
+
+
+class PollScheduler(object):
+    """
+    按距离购买时间调整轮询间隔（以Timer推算的京东时间为准）
+    - 距离购买时间超过fast_before_ms：每slow_interval_ms轮询一次，且不会睡过密集轮询窗口的起点
+    - 购买时间前fast_before_ms到购买时间后fast_after_ms：每秒轮询fast_rate次
+    - 密集窗口之后：每settle_interval_ms轮询一次
+    每个间隔带±10%的随机抖动，避免固定节奏
+    """
+
+    def __init__(self, timer, fast_rate=None, fast_before_ms=None, fast_after_ms=None,
+                 slow_interval_ms=500.0, settle_interval_ms=200.0):
+        """
+        :param timer: Timer
+        :param fast_rate: 密集窗口内每秒轮询次数
+        :param fast_before_ms: 密集窗口在购买时间前开始的毫秒数
+        :param fast_after_ms: 密集窗口在购买时间后结束的毫秒数
+        :param slow_interval_ms: 密集窗口前的轮询间隔(ms)
+        :param settle_interval_ms: 密集窗口后的轮询间隔(ms)
+        """
+        self.timer = timer
+        self.fast_rate = max(1.0, fast_rate or global_config.getFloat('config', 'seckill_url_poll_rate', 10.0))
+        self.fast_before_ms = fast_before_ms if fast_before_ms is not None else \
+            global_config.getFloat('config', 'seckill_url_fast_before', 2.0) * 1000.0
+        self.fast_after_ms = fast_after_ms if fast_after_ms is not None else \
+            global_config.getFloat('config', 'seckill_url_fast_after', 3.0) * 1000.0
+        self.slow_interval_ms = slow_interval_ms
+        self.settle_interval_ms = settle_interval_ms
+        self.polls = 0
+
+    def interval_ms(self, now_ms=None):
+        """
+        当前时刻到下一次轮询的间隔(ms)
+        :param now_ms: 京东毫秒时间，默认取当前时刻
+        """
+        if now_ms is None:
+            now_ms = self.timer.jd_now_ms()
+        to_buy_ms = self.timer.buy_time_ms - now_ms
+        if to_buy_ms > self.fast_before_ms:
+            interval = self.slow_interval_ms * random.uniform(0.9, 1.1)
+            return min(interval, to_buy_ms - self.fast_before_ms)
+        if to_buy_ms >= -self.fast_after_ms:
+            return 1000.0 / self.fast_rate * random.uniform(0.9, 1.1)
+        return self.settle_interval_ms * random.uniform(0.9, 1.1)
+
+    def wait(self, sleep=None):
+        """
+        等待到下一次轮询
+        :param sleep: 等待函数，参数为秒数，返回True表示收到停止信号；默认time.sleep
+        :return: 是否收到停止信号
+        """
+        self.polls += 1
+        return bool((sleep or time.sleep)(self.interval_ms() / 1000.0))
+
+    def latency_ms(self, now_ms=None):
+        """当前时刻晚于购买时间的毫秒数，负数表示早于购买时间"""
+        if now_ms is None:
+            now_ms = self.timer.jd_now_ms()
+        return now_ms - self.timer.buy_time_ms
+
+
+class ClockDriftTracker(object):
+    """
+    后台时钟漂移跟踪
+    长期运行时按计划重新测量时间差，拟合单调时钟相对京东时间的线性漂移(ms/小时)，
+    越接近抢购时间采样越密，并把预测的触发时刻时间差发布到Timer
+    """
+
+    def __init__(self, timer, min_interval=None, max_interval=None, history_size=50):
+        """
+        :param timer: 需要维护的Timer
+        :param min_interval: 最短采样间隔(秒)，临近抢购时使用
+        :param max_interval: 最长采样间隔(秒)，远离抢购时使用
+        :param history_size: 参与拟合的最近测量次数
+        """
+        self.timer = timer
+        self.min_interval = min_interval or global_config.getFloat('config', 'drift_min_interval', 30.0)
+        self.max_interval = max_interval or global_config.getFloat('config', 'drift_max_interval', 1800.0)
+        # 距离抢购不足该秒数时不再重新校时，避免在触发前改变锚点和占用网络
+        self.freeze_seconds = 5.0
+        # (单调时钟ms, 京东时间减单调时钟ms, 误差ms)
+        self.history = deque(maxlen=history_size)
+        self.drift_ms_per_hour = 0.0
+        self.predicted_offset = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台校时线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='ClockDriftTracker', daemon=True)
+        self._thread.start()
+        logger.info('后台时钟漂移跟踪已启动')
+
+    def stop(self):
+        """停止后台校时线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self._seconds_to_trigger() > self.freeze_seconds:
+                try:
+                    self.resample()
+                except Exception as e:
+                    logger.warning(f'后台校时失败: {e}')
+            self._stop_event.wait(self._next_interval())
+
+    def _seconds_to_trigger(self):
+        return (self.timer.deadline_ns - time.monotonic_ns()) / 1e9
+
+    def _next_interval(self):
+        """
+        下一次采样的间隔：取距离抢购时间的1/10，限制在[min_interval, max_interval]内，
+        并保证在冻结窗口开始前完成最后一次采样
+        """
+        seconds_to_trigger = self._seconds_to_trigger()
+        if seconds_to_trigger <= 0:
+            return self.max_interval
+        interval = min(max(seconds_to_trigger / 10.0, self.min_interval), self.max_interval)
+        before_freeze = seconds_to_trigger - self.freeze_seconds - 1.0
+        if before_freeze > 0:
+            interval = min(interval, before_freeze)
+        return max(interval, 1.0)
+
+    def resample(self):
+        """重新测量一次时间差，更新漂移模型并发布预测值"""
+        sample = self.timer.measure_offset()
+        if sample.error is None:
+            return
+        mono_ms = time.monotonic_ns() / 1e6
+        jd_ms = time.time() * 1000.0 - sample.offset
+        with self._lock:
+            self.history.append((mono_ms, jd_ms - mono_ms, sample.error))
+            self._publish(sample)
+
+    def _fit(self):
+        """
+        按误差加权最小二乘拟合 (京东时间 - 单调时钟) = a + b * 单调时钟
+        :return: (a, b)，b为每毫秒的漂移量；样本不足或时间跨度过短时b为0
+        """
+        xs = [h[0] for h in self.history]
+        ys = [h[1] for h in self.history]
+        ws = [1.0 / max(h[2], 1.0) ** 2 for h in self.history]
+        total = sum(ws)
+        mean_x = sum(w * x for w, x in zip(ws, xs)) / total
+        mean_y = sum(w * y for w, y in zip(ws, ys)) / total
+        # 至少3次测量且跨度超过10分钟才估计漂移率
+        if len(xs) < 3 or xs[-1] - xs[0] < 600000:
+            return mean_y, 0.0
+        var_x = sum(w * (x - mean_x) ** 2 for w, x in zip(ws, xs))
+        if var_x <= 0:
+            return mean_y, 0.0
+        slope = sum(w * (x - mean_x) * (y - mean_y) for w, x, y in zip(ws, xs, ys)) / var_x
+        return mean_y - slope * mean_x, slope
+
+    def _publish(self, sample):
+        """把预测的触发时刻时间差写回Timer并重新锚定"""
+        intercept, slope = self._fit()
+        self.drift_ms_per_hour = slope * 3600000.0
+        trigger_mono_ms = self.timer.deadline_ns / 1e6
+        now_mono_ms = time.monotonic_ns() / 1e6
+        # 未到抢购时间时按触发时刻预测，已过则按当前时刻
+        predict_at = max(trigger_mono_ms, now_mono_ms)
+        predicted = intercept + slope * predict_at
+        self.timer.diff_time = int(round(sample.offset))
+        self.timer.diff_error = sample.error
+        self.timer.anchor(int(now_mono_ms * 1e6), now_mono_ms + predicted)
+        # 以本地时间表示的触发时刻时间差，便于与diff_time对比
+        self.predicted_offset = time.time() * 1000.0 - (now_mono_ms + predicted)
+        logger.info('后台校时：时间差 {:.1f}ms（误差 ±{:.1f}ms），漂移率 {:+.2f}ms/小时，预测触发时刻时间差 {:.1f}ms'.format(
+            sample.offset, sample.error, self.drift_ms_per_hour, self.predicted_offset))
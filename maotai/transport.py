@@ -0,0 +1,332 @@
+# -*- coding:utf-8 -*-
+"""
+HTTP传输层调优
+为抢购相关域名挂载专用的连接池适配器：连接池大小与并发数匹配，开启TCP_NODELAY与TCP keepalive，
+并统计每个域名的连接复用情况，确保抢购窗口内不再新建连接；
+抢购前解析抢购域名的所有IP并按TCP建连耗时排序，连接固定到最快的IP（SNI、Host与证书校验仍使用域名）
+"""
+import time
+import socket
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from urllib3.poolmanager import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from maotai.jd_logger import logger
+
+# 抢购关键路径上的域名
+SECKILL_HOSTS = (
+    'marathon.jd.com',
+    'itemko.jd.com',
+    'divide.jd.com',
+)
+
+
+def tuned_socket_options(keepalive_idle=30, keepalive_interval=10):
+    """
+    抢购连接的socket选项
+    - TCP_NODELAY: 关闭Nagle算法，小请求立即发出
+    - SO_KEEPALIVE: 空闲连接定期探测，尽早发现被中间设备断开的连接
+    :param keepalive_idle: 空闲多少秒后开始keepalive探测（平台支持时生效）
+    :param keepalive_interval: keepalive探测间隔(秒)（平台支持时生效）
+    """
+    options = list(HTTPConnection.default_socket_options)
+    if (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) not in options:
+        options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive_idle))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, keepalive_interval))
+    return options
+
+
+class _PinnedConnectionMixin(object):
+    """建立TCP连接时改用固定的IP，域名（SNI、Host头、证书校验）保持不变"""
+    pinned_ip = None
+
+    def _new_conn(self):
+        if not self.pinned_ip:
+            return super()._new_conn()
+        # urllib3用_dns_host作为连接地址，host属性同样读取它，只在建立socket期间替换
+        dns_host = self._dns_host
+        self._dns_host = self.pinned_ip
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = dns_host
+
+
+class PinnedHTTPConnection(_PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class PinnedHTTPSConnection(_PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _PinnedPoolMixin(object):
+    """新建连接时按pinned_ips为连接指定IP"""
+    pinned_ips = {}
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn.pinned_ip = self.pinned_ips.get(self.host)
+        return conn
+
+
+class PinnedHTTPConnectionPool(_PinnedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = PinnedHTTPConnection
+
+
+class PinnedHTTPSConnectionPool(_PinnedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = PinnedHTTPSConnection
+
+
+class PinnedPoolManager(PoolManager):
+    """创建的连接池共享同一个pinned_ips，更新后对之后新建的连接生效"""
+
+    def __init__(self, *args, pinned_ips=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pinned_ips = pinned_ips if pinned_ips is not None else dict()
+        self.pool_classes_by_scheme = {'http': PinnedHTTPConnectionPool, 'https': PinnedHTTPSConnectionPool}
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context=request_context)
+        pool.pinned_ips = self.pinned_ips
+        return pool
+
+
+class TunedHTTPAdapter(HTTPAdapter):
+    """
+    抢购用连接池适配器
+    同一个适配器可挂载到多个域名上，每个域名一个连接池，连接池大小应不小于共用该Session的并发数，
+    否则超出的请求会新建连接并在用完后丢弃
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['socket_options', 'pinned_ips']
+
+    def __init__(self, pool_maxsize=DEFAULT_POOLSIZE, socket_options=None, pinned_ips=None, **kwargs):
+        """
+        :param socket_options: socket选项，默认tuned_socket_options()
+        :param pinned_ips: {域名: IP}，原地更新即可切换之后新建连接的IP
+        """
+        self.socket_options = socket_options if socket_options is not None else tuned_socket_options()
+        self.pinned_ips = pinned_ips if pinned_ips is not None else dict()
+        super().__init__(pool_maxsize=pool_maxsize, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        # 与HTTPAdapter.init_poolmanager相同，改用PinnedPoolManager
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        pool_kwargs.setdefault('socket_options', self.socket_options)
+        self.poolmanager = PinnedPoolManager(num_pools=connections, maxsize=maxsize, block=block,
+                                             pinned_ips=self.pinned_ips, **pool_kwargs)
+
+    def connection_stats(self):
+        """
+        每个域名的连接复用统计
+        :return: {host: {'connections': 新建连接数, 'requests': 请求数, 'reused': 复用已有连接的请求数}}
+        """
+        stats = dict()
+        pools = self.poolmanager.pools
+        with pools.lock:
+            items = list(pools._container.items())
+        for key, pool in items:
+            item = stats.setdefault(key.key_host, {'connections': 0, 'requests': 0, 'reused': 0})
+            item['connections'] += pool.num_connections
+            item['requests'] += pool.num_requests
+            item['reused'] += max(0, pool.num_requests - pool.num_connections)
+        return stats
+
+
+def mount_tuned_adapter(session, pool_maxsize, hosts=SECKILL_HOSTS, pinned_ips=None):
+    """
+    为session的抢购域名挂载TunedHTTPAdapter
+    :param session: requests.Session
+    :param pool_maxsize: 每个域名的连接池大小
+    :param pinned_ips: {域名: IP}，见TunedHTTPAdapter
+    :return: TunedHTTPAdapter
+    """
+    adapter = TunedHTTPAdapter(pool_maxsize=max(DEFAULT_POOLSIZE, pool_maxsize), pinned_ips=pinned_ips)
+    for host in hosts:
+        session.mount('https://{}/'.format(host), adapter)
+        session.mount('http://{}/'.format(host), adapter)
+    return adapter
+
+
+def diff_connection_stats(before, after):
+    """
+    两次connection_stats之间的增量
+    :return: {host: {'connections': ..., 'requests': ..., 'reused': ...}}
+    """
+    delta = dict()
+    for host, item in after.items():
+        base = before.get(host, {})
+        delta[host] = {k: v - base.get(k, 0) for k, v in item.items()}
+    return delta
+
+
+class HostResolver(object):
+    """
+    抢购域名预解析与IP排序
+    一个域名通常解析到多个边缘节点IP，各IP的往返耗时差别很大；对每个IP多次测量TCP建连耗时，取最小值排序
+    """
+
+    def __init__(self, hosts=SECKILL_HOSTS, port=443, probes=3, timeout=1.0):
+        """
+        :param hosts: 需要解析的域名
+        :param port: 测量建连耗时使用的端口
+        :param probes: 每个IP的测量次数
+        :param timeout: 单次建连超时(秒)
+        """
+        self.hosts = list(hosts)
+        self.port = port
+        self.probes = max(1, probes)
+        self.timeout = timeout
+        # {host: [(ip, rtt_ms), ...]}，按rtt升序，不可达的IP不包含在内
+        self.ranking = dict()
+
+    def resolve(self, host):
+        """
+        :return: 域名解析到的所有IP，保持解析顺序
+        """
+        ips = []
+        for family, _, _, _, sockaddr in socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM):
+            if family in (socket.AF_INET, socket.AF_INET6) and sockaddr[0] not in ips:
+                ips.append(sockaddr[0])
+        return ips
+
+    def probe(self, ip):
+        """
+        :return: 多次TCP建连耗时的最小值(ms)，全部失败返回None
+        """
+        best = None
+        for _ in range(self.probes):
+            start = time.perf_counter()
+            try:
+                sock = socket.create_connection((ip, self.port), timeout=self.timeout)
+            except OSError:
+                continue
+            rtt = (time.perf_counter() - start) * 1000.0
+            sock.close()
+            best = rtt if best is None else min(best, rtt)
+        return best
+
+    def rank(self):
+        """
+        解析所有域名并并发测量每个IP
+        :return: {host: 最快的IP}，解析失败或全部不可达的域名不包含在内
+        """
+        targets = []
+        for host in self.hosts:
+            try:
+                targets.extend((host, ip) for ip in self.resolve(host))
+            except OSError as e:
+                logger.warning(f'域名 {host} 解析失败: {e}')
+        ranking = {host: [] for host in self.hosts}
+        if targets:
+            with ThreadPoolExecutor(max_workers=min(16, len(targets))) as executor:
+                for (host, ip), rtt in zip(targets, executor.map(lambda t: self.probe(t[1]), targets)):
+                    if rtt is not None:
+                        ranking[host].append((ip, rtt))
+        for items in ranking.values():
+            items.sort(key=lambda item: item[1])
+        self.ranking = ranking
+        return {host: items[0][0] for host, items in ranking.items() if items}
+
+
+class ConnectionWarmer(object):
+    """
+    抢购前的连接预热与保活
+    在触发前几秒并发建立每个域名的连接（完成TCP与TLS握手）并放回连接池，之后定期用HEAD请求保活，
+    使抢购开始后的请求直接复用已握手的连接，握手耗时不再出现在关键路径上
+    """
+
+    def __init__(self, session, urls, connections=2, keepalive_interval=2.0, headers=None):
+        """
+        :param session: requests.Session，需已挂载TunedHTTPAdapter且连接池大小不小于connections
+        :param urls: 需要预热的地址列表，每个域名一个
+        :param connections: 每个域名预热的连接数
+        :param keepalive_interval: 保活请求间隔(秒)
+        :param headers: 预热请求的请求头
+        """
+        self.session = session
+        self.urls = list(urls)
+        self.connections = max(1, connections)
+        self.keepalive_interval = keepalive_interval
+        self.headers = headers
+        # 每个域名最近一次成功预热的连接数
+        self.warmed = dict()
+        self.rounds = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def warm(self):
+        """
+        并发向每个地址发出connections个请求：所有请求同时发出，迫使连接池为每个请求建立（或复用）一个连接
+        :return: {host: 成功的连接数}
+        """
+        tasks = [url for url in self.urls for _ in range(self.connections)]
+        barrier = threading.Barrier(len(tasks))
+
+        def probe(url):
+            try:
+                barrier.wait(timeout=3)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                self.session.head(url, headers=self.headers, timeout=3, allow_redirects=False)
+                return urlparse(url).hostname, True
+            except Exception as e:
+                logger.debug(f'预热连接 {url} 失败: {e}')
+                return urlparse(url).hostname, False
+
+        warmed = dict()
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            for host, ok in executor.map(probe, tasks):
+                warmed[host] = warmed.get(host, 0) + (1 if ok else 0)
+        self.warmed = warmed
+        self.rounds += 1
+        return warmed
+
+    def start(self, deadline_ns, warm_seconds=5.0, stop_margin=0.3):
+        """
+        后台预热并保活到抢购时间
+        :param deadline_ns: 抢购触发的单调时钟时刻(ns)
+        :param warm_seconds: 触发前多少秒开始预热
+        :param stop_margin: 触发前多少秒停止保活，避免保活请求在触发时刻占用连接
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(deadline_ns, warm_seconds, stop_margin),
+                                        name='ConnectionWarmer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self, deadline_ns, warm_seconds, stop_margin):
+        start_ns = deadline_ns - int(warm_seconds * 1e9)
+        stop_ns = deadline_ns - int(stop_margin * 1e9)
+        wait_seconds = (start_ns - time.monotonic_ns()) / 1e9
+        if wait_seconds > 0 and self._stop_event.wait(wait_seconds):
+            return
+        while not self._stop_event.is_set():
+            round_start = time.monotonic_ns()
+            if round_start >= stop_ns:
+                break
+            warmed = self.warm()
+            if self.rounds == 1:
+                logger.info('🔥 连接预热完成：{}'.format(
+                    '，'.join(f'{host} {n}个' for host, n in warmed.items())))
+            # 下一轮保活需在stop_ns之前完成，否则本轮即为最后一轮
+            next_ns = round_start + int(self.keepalive_interval * 1e9)
+            if next_ns + (time.monotonic_ns() - round_start) >= stop_ns:
+                break
+            if self._stop_event.wait((next_ns - time.monotonic_ns()) / 1e9):
+                break
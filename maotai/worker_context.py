@@ -0,0 +1,47 @@
+# -*- coding:utf-8 -*-
+"""
+抢购子进程的启动数据
+多进程抢购不再把整个JdSeckill（Session、QrLogin、Timer、SecureConfigManager及其密钥、设备指纹收集器）序列化到每个进程，
+父进程只准备一份不可变的WorkerContext，子进程据此重建只包含抢购流程所需属性的JdSeckill
+"""
+import time
+from collections import namedtuple
+
+# cookies: ((name, value, domain, path, secure, expires), ...)
+# pinned_ips: ((域名, IP), ...)，抢购域名固定使用的IP
+# buy_time: 购买时间(本地datetime)；jd_offset_ms: 本地时间减京东时间(ms)，已包含历史修正与漂移预测
+# lead_ms / trigger_lead_info: 父进程测得的提前触发量及其依据，trigger_lead_info为((key, value), ...)
+# payment_password: 支付密码，下单请求体需要；是子进程唯一需要的敏感信息
+_FIELDS = ['sku_id', 'seckill_num', 'user_agent', 'cookies', 'pinned_ips', 'buy_time', 'jd_offset_ms', 'lead_ms',
+           'trigger_lead_info', 'payment_password']
+
+
+class WorkerContext(namedtuple('WorkerContext', _FIELDS)):
+    """抢购子进程的启动数据（不可变）"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_seckill(cls, seckill):
+        """
+        由父进程的JdSeckill生成
+        :param seckill: 已完成登录、定时与提前量测量的JdSeckill
+        """
+        cookies = tuple((c.name, c.value, c.domain, c.path, bool(c.secure), c.expires) for c in seckill.session.cookies)
+        return cls(
+            sku_id=seckill.sku_id,
+            seckill_num=seckill.seckill_num,
+            user_agent=seckill.user_agent,
+            cookies=cookies,
+            pinned_ips=tuple(sorted(seckill.spider_session.pinned_ips.items())),
+            buy_time=seckill.timers.buy_time,
+            jd_offset_ms=time.time() * 1000.0 - seckill.timers.jd_now_ms(),
+            lead_ms=seckill.timers.lead_ms,
+            trigger_lead_info=tuple(sorted(seckill.trigger_lead_info.items())),
+            payment_password=seckill.get_secure_payment_password(required=False) or '',
+        )
+
+    def build(self):
+        """在子进程中重建JdSeckill"""
+        from maotai.jd_spider_requests import JdSeckill
+        return JdSeckill.from_worker_context(self)
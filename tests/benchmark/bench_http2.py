@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP/1.1与HTTP/2抢购请求对比基准测试
+使用本地模拟服务器（HTTP/1.1与h2c各一个，响应延迟和连接建立耗时相同），
+N个并发抢购尝试各自顺序发送 结算页GET -> init POST -> 下单POST，对比：
+- 服务器端建立的连接数
+- 连接建立耗时（HTTP/2为Http2Client.open：复制Session的请求头与Cookie、建立连接并确认协商结果）
+- 冷启动（HTTP/1.1含连接建立）与热连接下的单请求延迟p50/p99
+- 总耗时与每秒完成的尝试数
+
+需要安装 httpx[http2]，用法（在项目根目录运行）:
+    python tests/benchmark/bench_http2.py --concurrency 8 --attempts 40
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# 添加项目根目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_clock_server import FakeClockServer
+from maotai.transport import mount_tuned_adapter
+from maotai.http2_client import Http2Client
+from maotai.stats import percentile
+
+ORDER_DATA = {'skuId': '100012043978', 'num': '2', 'addressId': '1', 'token': 'x' * 32}
+
+
+def run_attempts(send, url, concurrency, attempts):
+    """
+    并发执行抢购尝试
+    :param send: send(method, url, data) 发送一个请求
+    :return: (每个请求的延迟ms列表, 总耗时秒)
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def attempt(_):
+        for method, data in (('GET', None), ('POST', ORDER_DATA), ('POST', ORDER_DATA)):
+            start = time.perf_counter()
+            send(method, url, data)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(attempt, range(attempts)))
+    return latencies, time.perf_counter() - start
+
+
+def bench_http1(args):
+    with FakeClockServer(latency_ms=args.latency_ms, handshake_ms=args.handshake_ms) as server:
+        session = requests.Session()
+        mount_tuned_adapter(session, args.concurrency, hosts=(server.url.split('//')[1].rstrip('/'),))
+
+        def send(method, url, data):
+            session.request(method, url, data=data, timeout=10).content
+
+        cold, cold_elapsed = run_attempts(send, server.url, args.concurrency, args.concurrency)
+        warm, warm_elapsed = run_attempts(send, server.url, args.concurrency, args.attempts)
+        # HTTP/1.1的连接在冷启动请求中建立，耗时已计入冷启动延迟
+        return 0.0, cold, warm, warm_elapsed, server.connections
+
+
+def _make_session():
+    """与抢购时相同：Session带有请求头与登录Cookie，由Http2Client.open复制到HTTP/2客户端"""
+    session = requests.Session()
+    session.headers.update({'User-Agent': 'Mozilla/5.0 bench'})
+    session.cookies.set('thor', 'x' * 64, domain='127.0.0.1')
+    return session
+
+
+def bench_http2(args):
+    from fake_h2_server import FakeH2Server
+    with FakeH2Server(latency_ms=args.latency_ms, handshake_ms=args.handshake_ms) as server:
+        # 与抢购路径相同，经Http2Client.open建立连接并确认协商到HTTP/2；
+        # 模拟服务器是明文h2c，不能通过ALPN协商，因此http1=False
+        client = Http2Client(_make_session(), ['127.0.0.1'], timeout=10, http1=False)
+        start = time.perf_counter()
+        if not client.open([server.url]):
+            raise RuntimeError('Http2Client.open未能建立HTTP/2连接')
+        open_ms = (time.perf_counter() - start) * 1000.0
+
+        def send(method, url, data):
+            client.request(method, url, data=data).content
+
+        cold, cold_elapsed = run_attempts(send, server.url, args.concurrency, args.concurrency)
+        warm, warm_elapsed = run_attempts(send, server.url, args.concurrency, args.attempts)
+        client.close()
+        return open_ms, cold, warm, warm_elapsed, server.connections
+
+
+def check_fallback():
+    """HTTP/2客户端连接只支持HTTP/1.1的服务器时应回退"""
+    with FakeClockServer() as server:
+        client = Http2Client(_make_session(), ['127.0.0.1'])
+        return not client.open([server.url]) and client.client is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP/1.1与HTTP/2抢购请求对比')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发抢购尝试数')
+    parser.add_argument('--attempts', type=int, default=40, help='热连接阶段的抢购尝试总数')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='服务器响应延迟(ms)')
+    parser.add_argument('--handshake-ms', type=float, default=30.0, help='新连接的建立耗时(ms)，模拟TLS握手')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    print('=' * 80)
+    print('HTTP/1.1 vs HTTP/2：并发 {}，响应延迟 {}ms，连接建立 {}ms'.format(
+        args.concurrency, args.latency_ms, args.handshake_ms))
+    print('=' * 80)
+    print('{:<10}{:>8}{:>12}{:>12}{:>12}{:>12}{:>12}{:>14}'.format(
+        'protocol', 'conns', 'open ms', 'cold p50', 'cold p99', 'warm p50', 'warm p99', 'attempts/s'))
+
+    results = [('HTTP/1.1', bench_http1)]
+    try:
+        import httpx
+        import h2
+        results.append(('HTTP/2', bench_http2))
+    except ImportError:
+        print('未安装httpx[http2]，跳过HTTP/2')
+
+    for name, bench in results:
+        open_ms, cold, warm, warm_elapsed, connections = bench(args)
+        print('{:<10}{:>8}{:>12.2f}{:>12.2f}{:>12.2f}{:>12.2f}{:>12.2f}{:>14.1f}'.format(
+            name, connections, open_ms, percentile(cold, 50), percentile(cold, 99),
+            percentile(warm, 50), percentile(warm, 99), args.attempts / warm_elapsed))
+
+    if len(results) > 1:
+        print()
+        print('HTTP/1.1服务器回退检查：{}'.format('通过' if check_fallback() else '失败'))
+
+
+if __name__ == '__main__':
+    main()
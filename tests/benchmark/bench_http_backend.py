@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP后端单次请求客户端开销基准测试
+对本地模拟服务器（零延迟）顺序发送与抢购相同形态的请求：
+- checkout: 带查询参数与自定义请求头的GET
+- submit: 约35个字段表单的POST
+Session中预置30个Cookie。以发送线程的CPU时间(time.thread_time)衡量客户端开销，服务器线程不计入
+
+用法（在项目根目录运行，curl后端需要pycurl）:
+    python tests/benchmark/bench_http_backend.py --requests 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import requests
+
+# 添加项目根目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_clock_server import FakeClockServer
+from maotai.transport import mount_tuned_adapter
+from maotai.stats import percentile
+
+SUBMIT_FIELDS = dict(('field{}'.format(i), 'value-{}-中文'.format(i)) for i in range(35))
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Host': '127.0.0.1',
+    'Referer': 'https://marathon.jd.com/seckill/seckill.action?skuId=100012043978&num=2&rid=1700000000',
+}
+
+
+def make_sessions(server):
+    sessions = []
+    session = requests.Session()
+    mount_tuned_adapter(session, 10, hosts=(server.url.split('//')[1].rstrip('/'),))
+    sessions.append(('requests', session))
+    try:
+        from maotai.curl_backend import CurlSession
+        sessions.append(('curl', CurlSession()))
+    except ImportError:
+        print('未安装pycurl，跳过curl后端')
+    for _, session in sessions:
+        for i in range(30):
+            session.cookies.set('cookie{}'.format(i), 'x' * 40, domain='127.0.0.1', path='/')
+    return sessions
+
+
+def bench(session, url, kind, count):
+    """
+    :return: (每个请求的CPU时间us列表, 每个请求的耗时us列表)
+    """
+    cpu, wall = [], []
+    for i in range(count):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        if kind == 'checkout':
+            session.get(url, params={'skuId': '100012043978', 'num': 2, 'rid': i},
+                        headers=HEADERS, allow_redirects=False).text
+        else:
+            session.post(url, params={'skuId': '100012043978'}, data=SUBMIT_FIELDS, headers=HEADERS).text
+        cpu.append((time.thread_time() - cpu_start) * 1e6)
+        wall.append((time.perf_counter() - wall_start) * 1e6)
+    return cpu, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP后端单次请求客户端开销对比')
+    parser.add_argument('--requests', type=int, default=2000, help='每种请求的次数')
+    args = parser.parse_args()
+
+    print('=' * 80)
+    print('HTTP后端客户端开销（单位us，CPU为发送线程CPU时间）')
+    print('=' * 80)
+    print('{:<10}{:<10}{:>12}{:>12}{:>12}{:>12}'.format(
+        'backend', 'request', 'cpu p50', 'cpu p99', 'wall p50', 'wall p99'))
+    with FakeClockServer() as server:
+        for name, session in make_sessions(server):
+            for kind in ('checkout', 'submit'):
+                # 预热：建立连接、加载模块
+                bench(session, server.url, kind, 20)
+                cpu, wall = bench(session, server.url, kind, args.requests)
+                print('{:<10}{:<10}{:>12.1f}{:>12.1f}{:>12.1f}{:>12.1f}'.format(
+                    name, kind, percentile(cpu, 50), percentile(cpu, 99),
+                    percentile(wall, 50), percentile(wall, 99)))
+
+
+if __name__ == '__main__':
+    main()
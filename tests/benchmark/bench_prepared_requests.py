@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+预处理请求的单次抢购尝试CPU开销基准测试
+一次尝试 = 结算页GET + 下单POST（约35个字段），Session中预置30个Cookie；
+请求交给不联网的适配器，直接返回空响应，只测量客户端构造请求的开销(time.process_time)：
+- per-attempt: 每次尝试构造请求头、编码表单并准备请求（原实现）
+- prepared: 使用PreparedSeckillRequests，只替换rid、token和Cookie
+
+用法（在项目根目录运行）:
+    python tests/benchmark/bench_prepared_requests.py --attempts 5000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import requests
+from requests.adapters import BaseAdapter
+
+# 添加项目根目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+
+from maotai.prepared_requests import PreparedSeckillRequests
+
+SKU_ID = '100012043978'
+SECKILL_NUM = '2'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+ORDER_DATA = dict(('field{}'.format(i), 'value-{}-中文'.format(i)) for i in range(34))
+ORDER_DATA['token'] = 'x' * 32
+
+
+class DummyAdapter(BaseAdapter):
+    """不联网的适配器，返回空的200响应"""
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = request.url
+        resp.request = request
+        resp._content = b'{}'
+        return resp
+
+    def close(self):
+        pass
+
+
+def make_session():
+    session = requests.Session()
+    session.mount('https://', DummyAdapter())
+    for i in range(30):
+        session.cookies.set('cookie{}'.format(i), 'x' * 40, domain='.jd.com', path='/')
+    return session
+
+
+def attempt_per_request(session):
+    """与request_seckill_checkout_page、submit_seckill_order原实现相同的请求构造"""
+    session.request('GET', 'https://marathon.jd.com/seckill/seckill.action',
+                    params={'skuId': SKU_ID, 'num': SECKILL_NUM, 'rid': int(time.time())},
+                    headers={
+                        'User-Agent': USER_AGENT,
+                        'Host': 'marathon.jd.com',
+                        'Referer': 'https://item.jd.com/{}.html'.format(SKU_ID),
+                    }, allow_redirects=False)
+    session.request('POST', 'https://marathon.jd.com/seckillnew/orderService/pc/submitOrder.action',
+                    params={'skuId': SKU_ID}, data=ORDER_DATA,
+                    headers={
+                        'User-Agent': USER_AGENT,
+                        'Host': 'marathon.jd.com',
+                        'Referer': 'https://marathon.jd.com/seckill/seckill.action?skuId={0}&num={1}&rid={2}'.format(
+                            SKU_ID, SECKILL_NUM, int(time.time())),
+                    })
+
+
+def bench(attempt, count):
+    """:return: 每次尝试的平均CPU时间(us)"""
+    for _ in range(50):
+        attempt()
+    start = time.process_time()
+    for _ in range(count):
+        attempt()
+    return (time.process_time() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预处理请求的单次抢购尝试CPU开销对比')
+    parser.add_argument('--attempts', type=int, default=5000, help='尝试次数')
+    args = parser.parse_args()
+
+    session = make_session()
+    prepared = PreparedSeckillRequests(session, SKU_ID, SECKILL_NUM, USER_AGENT)
+
+    def attempt_prepared():
+        prepared.checkout()
+        prepared.submit(ORDER_DATA)
+
+    before = bench(lambda: attempt_per_request(session), args.attempts)
+    after = bench(attempt_prepared, args.attempts)
+    print('=' * 60)
+    print('单次抢购尝试（结算页 + 下单）客户端CPU时间')
+    print('=' * 60)
+    print('{:<16}{:>14}'.format('方式', 'CPU us/次'))
+    print('{:<16}{:>14.1f}'.format('per-attempt', before))
+    print('{:<16}{:>14.1f}'.format('prepared', after))
+    print('节省 {:.1f}%'.format((1 - after / before) * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+校时与触发精度基准测试
+使用本地模拟时间服务器（已知时钟偏差、可控延迟与抖动），离线测量：
+1. 各校时方式估计的时间差与真实时间差的误差
+2. 各触发方式的唤醒误差
+输出p50/p99/max，便于对比改动前后的精度
+
+用法（在项目根目录运行，需要config.ini）:
+    python tests/benchmark/bench_timer_precision.py --runs 20
+"""
+
+import os
+import sys
+import random
+import logging
+import argparse
+
+import requests
+
+# 添加项目根目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_clock_server import FakeClockServer
+from maotai.stats import percentile
+
+# 网络场景：往返延迟与单向抖动(ms)
+SCENARIOS = [
+    ('loopback', 0.0, 0.0),
+    ('rtt40', 40.0, 2.0),
+    ('rtt40_jitter20', 40.0, 20.0),
+]
+
+
+def print_table(title, rows):
+    """
+    打印百分位数表
+    :param rows: [(名称, [误差ms, ...]), ...]
+    """
+    print()
+    print(title)
+    print('-' * 72)
+    print('{:<32}{:>6}{:>11}{:>11}{:>11}'.format('strategy', 'n', 'p50(ms)', 'p99(ms)', 'max(ms)'))
+    for name, values in rows:
+        if not values:
+            print('{:<32}{:>6}{:>11}'.format(name, 0, 'failed'))
+            continue
+        values = [abs(v) for v in values]
+        print('{:<32}{:>6}{:>11.3f}{:>11.3f}{:>11.3f}'.format(
+            name, len(values), percentile(values, 50), percentile(values, 99), max(values)))
+
+
+def make_timer(server):
+    from maotai.timer import Timer
+    timer = Timer(sync=False)
+    timer.sync_url = server.url
+    return timer
+
+
+def legacy_single_sample(timer, server):
+    """改动前的校时方式：单次请求，直接用本地时间减服务器时间"""
+    server_ms = timer._get_jd_time_from_page()
+    return timer.local_time() - server_ms
+
+
+def date_multi_sample(timer, server):
+    """Date头多次采样，RTT/2与分辨率修正后取往返最小的样本"""
+    samples = timer._sample_source(timer._get_jd_time_from_page, timer.sync_samples)
+    return timer._select_best_sample(samples).offset
+
+
+def ms_multi_sample(timer, server):
+    """毫秒时间戳接口多次采样"""
+    url = server.url + 'timestamp'
+
+    def fake_timestamp_source():
+        return int(requests.get(url, timeout=3).json()['data']['t'])
+
+    samples = timer._sample_source(fake_timestamp_source, timer.sync_samples)
+    return timer._select_best_sample(samples).offset
+
+
+def date_edge(timer, server):
+    """Date头秒跳变边沿检测"""
+    sample = timer.measure_offset_by_date_edge()
+    return sample.offset if sample else None
+
+
+OFFSET_STRATEGIES = [
+    ('legacy_single', legacy_single_sample),
+    ('date_multi_sample', date_multi_sample),
+    ('ms_multi_sample', ms_multi_sample),
+    ('date_edge', date_edge),
+]
+
+
+def bench_offset(runs, edge_runs):
+    """校时误差：估计的时间差减真实时间差"""
+    rows = []
+    for scenario, latency_ms, jitter_ms in SCENARIOS:
+        server = FakeClockServer(latency_ms=latency_ms, jitter_ms=jitter_ms).start()
+        try:
+            timer = make_timer(server)
+            for name, strategy in OFFSET_STRATEGIES:
+                errors = []
+                for _ in range(edge_runs if strategy is date_edge else runs):
+                    # 每次使用随机的时钟偏差，避免与秒边界的相位固定
+                    server.skew_ms = random.uniform(-1500.0, 1500.0)
+                    try:
+                        offset = strategy(timer, server)
+                    except Exception as e:
+                        print(f'{scenario}/{name} 失败: {e}')
+                        continue
+                    if offset is not None:
+                        errors.append(offset - (-server.skew_ms))
+                rows.append(('{}/{}'.format(scenario, name), errors))
+        finally:
+            server.stop()
+    print_table('校时误差 |估计时间差 - 真实时间差|', rows)
+
+
+def bench_wake(runs):
+    """触发唤醒误差：实际唤醒时刻减设定时刻"""
+    from datetime import datetime, timedelta
+    server = FakeClockServer().start()
+    try:
+        timer = make_timer(server)
+        default_spin_ms = timer.spin_ms
+        strategies = [
+            ('legacy_poll_{}s'.format(timer.sleep_interval), 'legacy', default_spin_ms),
+            ('precise_spin_{}ms'.format(default_spin_ms), 'precise', default_spin_ms),
+            ('precise_sleep_only', 'precise', 0.0),
+        ]
+        rows = []
+        for name, mode, spin_ms in strategies:
+            timer.trigger_mode = mode
+            timer.spin_ms = spin_ms
+            timer.wake_errors = []
+            for _ in range(runs):
+                delay_ms = random.uniform(50.0, 300.0)
+                timer.set_buy_time(datetime.now() + timedelta(milliseconds=delay_ms))
+                timer.start()
+            rows.append((name, list(timer.wake_errors)))
+    finally:
+        server.stop()
+    print_table('触发唤醒误差 |实际唤醒时刻 - 设定时刻|', rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='校时与触发精度基准测试')
+    parser.add_argument('--runs', type=int, default=20, help='每种方式的测量次数')
+    parser.add_argument('--edge-runs', type=int, default=5, help='边沿检测的测量次数（每次约需数秒）')
+    parser.add_argument('--skip-offset', action='store_true', help='跳过校时误差测试')
+    parser.add_argument('--skip-wake', action='store_true', help='跳过触发误差测试')
+    args = parser.parse_args()
+
+    # 屏蔽逐次测量的日志输出
+    logging.getLogger().setLevel(logging.WARNING)
+    from maotai.jd_logger import logger
+    logger.setLevel(logging.WARNING)
+
+    print('=' * 72)
+    print('校时与触发精度基准测试')
+    print('=' * 72)
+    if not args.skip_offset:
+        bench_offset(args.runs, args.edge_runs)
+    if not args.skip_wake:
+        bench_wake(args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+抢购并发方式（worker_model）对比基准测试
+对本地模拟服务器（默认往返延迟20ms）用三种方式运行N个抢购执行单元，每次尝试为 结算页GET + 下单POST：
+- process: ProcessPoolExecutor，每个进程导入 maotai.jd_spider_requests 并创建自己的Session（默认spawn方式，与Windows相同）
+- thread: N个线程共享一个Session与连接池
+- async: AsyncSeckillEngine，并发N，共享一个Session
+对比：总内存RSS（父进程+子进程）、从创建到全部就绪的启动耗时、每秒完成的尝试数
+
+用法（在项目根目录运行，RSS读取/proc，仅Linux准确）:
+    python tests/benchmark/bench_worker_models.py --workers 8 --duration 3
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+
+# 添加项目根目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_clock_server import FakeClockServer
+
+ORDER_DATA = dict(('field{}'.format(i), 'value-{}'.format(i)) for i in range(35))
+
+
+def rss_mb(pid=None):
+    """进程的常驻内存(MB)，无/proc时返回当前进程的峰值RSS"""
+    try:
+        with open('/proc/{}/status'.format(pid or 'self')) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024.0 / (1024.0 if sys.platform == 'darwin' else 1.0)
+
+
+def attempt(session, url):
+    session.get(url + 'seckill.action', params={'skuId': '100012043978', 'num': 2}).content
+    session.post(url + 'submitOrder.action', data=ORDER_DATA).content
+
+
+def attempt_loop(session, url, duration):
+    count = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        attempt(session, url)
+        count += 1
+    return count
+
+
+def process_worker(url, duration):
+    """子进程：与真实抢购进程相同地导入抢购模块，就绪后运行duration秒"""
+    import maotai.jd_spider_requests  # noqa: F401
+    session = requests.Session()
+    ready = time.time()
+    rss = rss_mb()
+    return ready, rss, attempt_loop(session, url, duration)
+
+
+def bench_process(url, workers, duration, start_method):
+    context = multiprocessing.get_context(start_method)
+    created = time.time()
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        results = list(pool.map(process_worker, [url] * workers, [duration] * workers))
+    spawn = max(r[0] for r in results) - created
+    rss = rss_mb() + sum(r[1] for r in results)
+    return spawn, rss, sum(r[2] for r in results) / duration
+
+
+def shared_session(workers):
+    from maotai.transport import mount_tuned_adapter
+    session = requests.Session()
+    mount_tuned_adapter(session, workers, hosts=('127.0.0.1',))
+    return session
+
+
+def bench_thread(url, workers, duration):
+    created = time.time()
+    session = shared_session(workers)
+    ready = []
+
+    def worker():
+        ready.append(time.time())
+        return attempt_loop(session, url, duration)
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(worker) for _ in range(workers)]
+        time.sleep(min(duration / 2.0, 1.0))
+        rss = rss_mb()
+        attempts = sum(f.result() for f in futures)
+    return max(ready) - created, rss, attempts / duration
+
+
+class BenchSeckill(object):
+    """供AsyncSeckillEngine调用的抢购步骤"""
+
+    def __init__(self, session, url):
+        self.session = session
+        self.url = url
+
+    def request_seckill_checkout_page(self):
+        self.session.get(self.url + 'seckill.action', params={'skuId': '100012043978', 'num': 2}).content
+
+    def submit_seckill_order(self):
+        self.session.post(self.url + 'submitOrder.action', data=ORDER_DATA).content
+        return False
+
+    def smart_error_handler(self, error_msg):
+        return 0
+
+
+def bench_async(url, workers, duration):
+    from maotai.async_engine import AsyncSeckillEngine
+    created = time.time()
+    engine = AsyncSeckillEngine(BenchSeckill(shared_session(workers), url), concurrency=workers,
+                                max_attempts=10 ** 9, duration=duration)
+    spawn = time.time() - created
+    rss_samples = []
+
+    def sample():
+        time.sleep(min(duration / 2.0, 1.0))
+        rss_samples.append(rss_mb())
+
+    with ThreadPoolExecutor(1) as pool:
+        pool.submit(sample)
+        engine.run()
+    return spawn, rss_samples[0], engine.attempts / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description='抢购并发方式对比')
+    parser.add_argument('--workers', type=int, default=8, help='执行单元数（进程/线程/并发尝试）')
+    parser.add_argument('--duration', type=float, default=3.0, help='每种方式运行的秒数')
+    parser.add_argument('--latency', type=float, default=20.0, help='模拟服务器往返延迟(ms)')
+    parser.add_argument('--start-method', default='spawn', help='process方式的进程启动方式：spawn / fork / forkserver')
+    args = parser.parse_args()
+
+    with FakeClockServer(latency_ms=args.latency) as server:
+        # 父进程与线程、async方式一样先导入抢购模块，RSS对比的基线相同
+        import maotai.jd_spider_requests  # noqa: F401
+        rows = [
+            ('process', bench_process(server.url, args.workers, args.duration, args.start_method)),
+            ('thread', bench_thread(server.url, args.workers, args.duration)),
+            ('async', bench_async(server.url, args.workers, args.duration)),
+        ]
+
+    print('=' * 64)
+    print('抢购并发方式对比：{} 个执行单元，往返延迟 {}ms'.format(args.workers, args.latency))
+    print('=' * 64)
+    print('{:<10}{:>14}{:>16}{:>16}'.format('model', 'RSS MB', 'spawn ms', 'attempts/s'))
+    for name, (spawn, rss, rate) in rows:
+        print('{:<10}{:>14.1f}{:>16.1f}{:>16.1f}'.format(name, rss, spawn * 1000.0, rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地模拟时间服务器
+可控制时钟偏差、Date头行为和网络延迟，用于离线测量校时与触发精度
+"""
+
+import json
+import math
+import time
+import random
+import threading
+import email.utils
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeClockServer(object):
+    """
+    模拟时间服务器
+    - 任意路径的 HEAD/GET 请求返回带Date头的空响应
+    - GET /timestamp 返回淘宝时间接口格式的毫秒时间 {"data": {"t": "..."}}
+    """
+
+    def __init__(self, skew_ms=0.0, latency_ms=0.0, jitter_ms=0.0, date_mode='floor', handshake_ms=0.0,
+                 host='127.0.0.1', port=0):
+        """
+        :param skew_ms: 服务器时钟比本地快的毫秒数
+        :param latency_ms: 模拟的网络往返延迟，请求与响应方向各占一半
+        :param jitter_ms: 每个方向额外的随机延迟上限
+        :param date_mode: floor 按RFC截断到秒；round 四舍五入到秒（模拟不规范的服务器）
+        :param handshake_ms: 每个新连接的额外建立耗时，模拟TLS握手
+        """
+        self.skew_ms = skew_ms
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.date_mode = date_mode
+        self.handshake_ms = handshake_ms
+        self.requests = 0
+        self.connections = 0
+        # 最近一次请求的请求头
+        self.last_headers = dict()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def server_time_ms(self):
+        """服务器当前毫秒时间"""
+        return time.time() * 1000.0 + self.skew_ms
+
+    def date_header(self, server_ms):
+        seconds = server_ms / 1000.0
+        seconds = math.floor(seconds) if self.date_mode == 'floor' else round(seconds)
+        return email.utils.formatdate(seconds, usegmt=True)
+
+    def _one_way_delay(self):
+        return (self.latency_ms / 2.0 + random.uniform(0, self.jitter_ms)) / 1000.0
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                server.connections += 1
+                if server.handshake_ms > 0:
+                    time.sleep(server.handshake_ms / 1000.0)
+
+            def _respond(self, with_body):
+                # 请求方向的延迟
+                delay = server._one_way_delay()
+                if delay > 0:
+                    time.sleep(delay)
+                server.requests += 1
+                server.last_headers = dict(self.headers)
+                server_ms = server.server_time_ms()
+                if self.path.startswith('/timestamp'):
+                    body = json.dumps({'data': {'t': str(int(server_ms))}}).encode('utf-8')
+                else:
+                    body = b''
+                # 响应方向的延迟
+                delay = server._one_way_delay()
+                if delay > 0:
+                    time.sleep(delay)
+                self.send_response_only(200)
+                self.send_header('Date', server.date_header(server_ms))
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if with_body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                self._respond(True)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
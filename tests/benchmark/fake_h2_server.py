@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地HTTP/2模拟服务器
+明文HTTP/2(h2c, prior knowledge)，每个请求在latency_ms后返回，同一连接上的请求并发处理；
+依赖h2库（pip install h2）
+"""
+
+import time
+import socket
+import threading
+import email.utils
+
+import h2.config
+import h2.events
+import h2.connection
+
+
+class FakeH2Server(object):
+    """
+    HTTP/2模拟服务器
+    任意路径、任意方法返回200和Date头，响应体为 {}
+    """
+
+    def __init__(self, latency_ms=0.0, handshake_ms=0.0, host='127.0.0.1', port=0):
+        """
+        :param latency_ms: 每个请求的响应延迟
+        :param handshake_ms: 每个新连接的额外建立耗时，模拟TLS握手
+        """
+        self.latency_ms = latency_ms
+        self.handshake_ms = handshake_ms
+        self.requests = 0
+        self.connections = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(128)
+        self._running = False
+
+    @property
+    def url(self):
+        host, port = self._sock.getsockname()[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        if self.handshake_ms > 0:
+            time.sleep(self.handshake_ms / 1000.0)
+        config = h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+        h2conn = h2.connection.H2Connection(config=config)
+        lock = threading.Lock()
+        methods = dict()
+
+        def send_pending():
+            data = h2conn.data_to_send()
+            if data:
+                conn.sendall(data)
+
+        def respond(stream_id):
+            body = b'' if methods.pop(stream_id, None) == 'HEAD' else b'{}'
+            with lock:
+                try:
+                    h2conn.send_headers(stream_id, [
+                        (':status', '200'),
+                        ('date', email.utils.formatdate(usegmt=True)),
+                        ('content-type', 'application/json'),
+                        ('content-length', str(len(body))),
+                    ])
+                    if body:
+                        h2conn.send_data(stream_id, body, end_stream=True)
+                    else:
+                        h2conn.end_stream(stream_id)
+                    send_pending()
+                except Exception:
+                    pass
+
+        with lock:
+            h2conn.initiate_connection()
+            send_pending()
+        try:
+            while self._running:
+                data = conn.recv(65535)
+                if not data:
+                    break
+                with lock:
+                    events = h2conn.receive_data(data)
+                    for event in events:
+                        if isinstance(event, h2.events.RequestReceived):
+                            methods[event.stream_id] = dict(event.headers).get(':method')
+                        elif isinstance(event, h2.events.DataReceived):
+                            h2conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            self.requests += 1
+                            timer = threading.Timer(self.latency_ms / 1000.0, respond, args=(event.stream_id,))
+                            timer.daemon = True
+                            timer.start()
+                    send_pending()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            conn.close()
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+pytest运行单元测试时把日志写到临时目录，不在仓库或运行目录中留下jd_seckill.log
+"""
+import os
+import tempfile
+
+os.environ.setdefault('JD_SECKILL_LOG', os.path.join(tempfile.mkdtemp(prefix='jd_seckill_test_'), 'jd_seckill.log'))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试asyncio抢购引擎（用模拟的抢购步骤代替真实请求，无需网络）
+"""
+
+import os
+import sys
+import time
+import threading
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.async_engine import AsyncSeckillEngine
+
+
+class SimulatedSeckill(object):
+    """模拟JdSeckill的抢购步骤：每步耗时step_seconds，第success_on次下单成功"""
+
+    def __init__(self, step_seconds=0.02, success_on=None, hang_on=None):
+        self.step_seconds = step_seconds
+        self.success_on = success_on
+        self.hang_on = hang_on
+        self.submits = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def request_seckill_checkout_page(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.step_seconds)
+        with self._lock:
+            self.in_flight -= 1
+
+    def submit_seckill_order(self):
+        with self._lock:
+            self.submits += 1
+            n = self.submits
+        time.sleep(self.hang_on[1] if self.hang_on and n == self.hang_on[0] else self.step_seconds)
+        return self.success_on is not None and n == self.success_on
+
+    def smart_error_handler(self, error_msg):
+        return 0.01
+
+
+def test_success_cancels_remaining():
+    """任一尝试成功后立即结束"""
+    seckill = SimulatedSeckill(success_on=20)
+    engine = AsyncSeckillEngine(seckill, concurrency=8, max_attempts=1000, duration=10)
+    start = time.perf_counter()
+    assert engine.run() is True
+    elapsed = time.perf_counter() - start
+    print(f"尝试 {engine.attempts} 次，最大并发 {seckill.max_in_flight}，耗时 {elapsed:.2f}秒")
+    assert elapsed < 1.0
+    assert engine.attempts < 40
+    assert seckill.max_in_flight <= 8
+
+
+def test_max_attempts_failure():
+    """达到尝试次数上限后返回False"""
+    seckill = SimulatedSeckill(step_seconds=0.005)
+    engine = AsyncSeckillEngine(seckill, concurrency=4, max_attempts=30, duration=10)
+    assert engine.run() is False
+    assert engine.attempts == 30
+
+
+def test_request_timeout():
+    """卡住的下单请求超时后被放弃，其余尝试继续"""
+    seckill = SimulatedSeckill(success_on=40, hang_on=(3, 1.0))
+    engine = AsyncSeckillEngine(seckill, concurrency=4, max_attempts=100, duration=10, request_timeout=0.2)
+    start = time.perf_counter()
+    assert engine.run() is True
+    assert time.perf_counter() - start < 1.0
+    assert engine.timeouts == 1
+
+
+def test_timed_out_submit_success_counts():
+    """超时不再等待的下单请求之后成功，仍记为抢购成功且不再发出新的下单请求"""
+    seckill = SimulatedSeckill(step_seconds=0.01, success_on=3, hang_on=(3, 0.4))
+    engine = AsyncSeckillEngine(seckill, concurrency=2, max_attempts=1000, duration=10, request_timeout=0.1)
+    assert engine.run() is True
+    assert engine.timeouts == 1 and engine.successes == 1
+    submits = seckill.submits
+    time.sleep(0.05)
+    assert seckill.submits == submits
+
+
+def test_shared_stop_event_and_scheduler():
+    """共享的停止事件在成功时被设置，外部设置时不再发起尝试；尝试按调度器的时间槽错开"""
+    from maotai.coordination import AttemptScheduler
+    stop_event = threading.Event()
+    scheduler = AttemptScheduler(rate=100)
+    seckill = SimulatedSeckill(step_seconds=0.001, success_on=10)
+    engine = AsyncSeckillEngine(seckill, concurrency=4, max_attempts=1000, duration=10,
+                                stop_event=stop_event, attempt_scheduler=scheduler)
+    start = time.perf_counter()
+    assert engine.run() is True
+    # 10次尝试按100次/秒错开，至少约90ms
+    assert time.perf_counter() - start >= 0.08
+    assert stop_event.is_set() and scheduler.summary()['claimed'] >= 10
+
+    stop_event = threading.Event()
+    stop_event.set()
+    engine = AsyncSeckillEngine(SimulatedSeckill(), concurrency=4, max_attempts=1000, duration=10,
+                                stop_event=stop_event)
+    assert engine.run() is False and engine.attempts == 0
+
+
+if __name__ == "__main__":
+    test_success_cancels_remaining()
+    test_max_attempts_failure()
+    test_request_timeout()
+    test_timed_out_submit_success_counts()
+    test_shared_stop_event_and_scheduler()
+    print("[OK] asyncio抢购引擎测试通过")
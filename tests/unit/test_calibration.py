@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试抢购时序闭环校准：用合成的历史记录验证单向延迟只取marathon阶段的首轮请求、
+服务器Date约束的时间差区间与修正量、对比报告，抢购窗口内不写文件以及历史文件裁剪（不发送网络请求）
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai import calibration
+
+BUY_MS = 1700000000000.0
+
+
+def _record(campaign, stage, send_ms, rtt_ms, offset_ms=0.0, correction_ms=0.0, one_way_ms=10.0):
+    """
+    合成一条记录：本地推算的京东时间比真实服务器时间快offset_ms，服务器在往返中点处理请求
+    """
+    processed = send_ms + rtt_ms / 2.0 - offset_ms
+    return {
+        'campaign': campaign, 'stage': stage, 'buy_time_ms': BUY_MS, 'lead_ms': one_way_ms,
+        'correction_ms': correction_ms, 'one_way_ms': one_way_ms,
+        'intended_ms': send_ms, 'send_ms': send_ms, 'recv_ms': send_ms + rtt_ms,
+        'server_date_ms': processed - processed % 1000.0, 'result_code': None,
+    }
+
+
+def _campaign(campaign, offset_ms=0.0, correction_ms=0.0):
+    """itemko轮询往返200ms且最早发出，marathon请求往返40ms，发送时刻跨过一个整秒边沿"""
+    records = [_record(campaign, 'seckill_url', BUY_MS - 1000 + i * 50, 200, offset_ms, correction_ms)
+               for i in range(10)]
+    records += [_record(campaign, stage, BUY_MS - 130 + i * 37, 40, offset_ms, correction_ms)
+                for i, stage in enumerate(['seckill_page', 'checkout', 'init', 'submit'] * 2)]
+    return campaign, records
+
+
+def test_first_wave_uses_marathon_stages():
+    _, records = _campaign('20240101100000-1')
+    assert calibration._first_wave_one_way(records) == [20.0] * calibration.FIRST_WAVE_SIZE
+    assert calibration._first_wave_one_way(records, stages=('seckill_url',)) == [100.0] * 5
+
+    result = calibration.calibrate([_campaign('20240101100000-1')])
+    assert result['one_way_ms'] == 20.0
+    assert calibration.calibrate([])['one_way_ms'] is None
+
+
+def test_arrival_bounds_and_correction():
+    """本地推算快了300ms：区间包含300，修正量在此前修正量基础上减去区间中点"""
+    _, records = _campaign('20240101100000-1', offset_ms=300.0, correction_ms=5.0)
+    lower, upper = calibration._arrival_bounds(records)
+    assert lower <= 300.0 <= upper and upper - lower < 1000.0
+
+    result = calibration.calibrate([_campaign('20240101100000-1', offset_ms=300.0, correction_ms=5.0)])
+    assert abs(result['offset_correction_ms'] - (5.0 - (lower + upper) / 2.0)) < 1e-6
+    assert abs(result['offset_correction_error_ms'] - (upper - lower) / 2.0) < 1e-6
+
+    # 没有服务器Date时无法确定修正量
+    for r in records:
+        r['server_date_ms'] = None
+    assert calibration._arrival_bounds(records) == (float('-inf'), float('inf'))
+    assert calibration.calibrate([('c', records)])['offset_correction_ms'] is None
+
+
+def test_report():
+    dated = _campaign('20240101100000-1')
+    undated = ('20240102100000-1', [dict(r, server_date_ms=None) for r in dated[1]])
+    lines = calibration.report([dated, undated])
+    assert len(lines) == 2
+    assert lines[0].startswith('20240101100000-1: 18个请求') and '实测首轮单向延迟 20.0ms' in lines[0]
+    assert '无服务器Date' in lines[1]
+
+
+def test_recorder_writes_only_on_flush():
+    from maotai.timer import Timer
+    timer = Timer(sync=False)
+    timer.set_buy_time(datetime.now() + timedelta(minutes=1))
+    with tempfile.TemporaryDirectory() as directory:
+        history_file = os.path.join(directory, 'campaigns', 'timing_history.jsonl')
+        recorder = calibration.CampaignRecorder(history_file)
+        recorder.begin(timer, '100012043978')
+        for i in range(100):
+            item = recorder.record('submit', i, i, i + 40)
+        item['result_code'] = 90016
+        assert not os.path.exists(history_file), '抢购窗口内不应写文件'
+
+        recorder.flush()
+        with open(history_file, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 100 and lines[-1]['result_code'] == 90016
+
+
+def test_trim_history():
+    with tempfile.TemporaryDirectory() as directory:
+        history_file = os.path.join(directory, 'timing_history.jsonl')
+        campaigns = [_campaign('2024010{}100000-1'.format(day)) for day in range(1, 8)]
+        with open(history_file, 'w', encoding='utf-8') as f:
+            for _, records in campaigns:
+                f.write(''.join(json.dumps(r) + '\n' for r in records))
+
+        assert calibration.trim_history(history_file, max_campaigns=5) == 2
+        assert calibration.trim_history(history_file, max_campaigns=5) == 0
+        history = calibration.load_history(history_file, max_campaigns=10)
+        assert [c for c, _ in history] == [c for c, _ in campaigns[2:]]
+        assert all(len(records) == 18 for _, records in history)
+        assert os.listdir(directory) == ['timing_history.jsonl']
+
+
+def test_intended_time_taken_once():
+    """多个线程同时发出第一个请求时，只有一个请求记录计划触发时刻，其余按实际发送时刻记录"""
+    from maotai.jd_spider_requests import JdSeckill
+    from maotai.timer import Timer
+
+    class _Response(object):
+        headers = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        seckill = JdSeckill.__new__(JdSeckill)
+        seckill._init_campaign_state()
+        seckill.timers = Timer(sync=False)
+        seckill.timers.set_buy_time(datetime.now() - timedelta(seconds=1))
+        seckill.campaign_recorder = calibration.CampaignRecorder(os.path.join(directory, 'timing_history.jsonl'))
+        seckill.campaign_recorder.begin(seckill.timers, '100012043978')
+        trigger_ms = seckill.timers.trigger_time_ms()
+
+        for _ in range(20):
+            seckill._next_intended_ms = trigger_ms
+            barrier = threading.Barrier(8)
+            records = []
+
+            def send():
+                barrier.wait()
+                records.append(seckill._timed_send('checkout', _Response)[1])
+            threads = [threading.Thread(target=send) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert sum(1 for r in records if r['intended_ms'] == trigger_ms) == 1
+            assert seckill._next_intended_ms is None
+
+
+def test_campaign_flushed_on_every_exit():
+    """获取抢购链接失败、风控停止和抢购循环抛出异常时，已记录的请求时序都写入历史文件"""
+    from maotai.jd_spider_requests import JdSeckill
+    from maotai.timer import Timer
+
+    def run(history_file, url_error=None, loop_error=None):
+        seckill = JdSeckill.__new__(JdSeckill)
+        seckill._init_campaign_state()
+        seckill.timers = Timer(sync=False)
+        seckill.campaign_recorder = calibration.CampaignRecorder(history_file)
+        seckill.safe_preheat_connections = lambda: None
+
+        def request_seckill_url():
+            seckill.campaign_recorder.begin(seckill.timers, '100012043978')
+            seckill.campaign_recorder.record('seckill_url', 1.0, 1.0, 2.0)
+            if url_error:
+                raise url_error
+
+        def safe_seckill_loop(safe_config):
+            if loop_error:
+                raise loop_error
+            return False  # 风控停止
+        seckill.request_seckill_url = request_seckill_url
+        seckill._safe_seckill_loop = safe_seckill_loop
+        try:
+            return seckill.safe_enhanced_seckill({'description': 'test'})
+        except RuntimeError:
+            return None
+
+    with tempfile.TemporaryDirectory() as directory:
+        history_file = os.path.join(directory, 'timing_history.jsonl')
+        assert run(history_file, url_error=RuntimeError('模拟获取抢购链接失败')) is False
+        assert run(history_file) is False
+        assert run(history_file, loop_error=RuntimeError('模拟抢购循环异常')) is None
+        with open(history_file, encoding='utf-8') as f:
+            assert len(f.readlines()) == 3
+
+if __name__ == "__main__":
+    test_first_wave_uses_marathon_stages()
+    test_arrival_bounds_and_correction()
+    test_report()
+    test_recorder_writes_only_on_flush()
+    test_trim_history()
+    test_intended_time_taken_once()
+    test_campaign_flushed_on_every_exit()
+    print("[OK] 抢购时序闭环校准测试通过")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试后台时钟漂移跟踪：加权最小二乘拟合漂移率、越接近抢购时间采样越密且在冻结窗口前完成最后一次采样、
+发布预测值时整体替换锚点（用合成的测量数据代替网络请求）
+"""
+
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timedelta
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.timer import Timer, ClockDriftTracker, OffsetSample
+
+HOUR_MS = 3600000.0
+
+
+def _make_tracker(seconds_to_buy=3600):
+    timer = Timer(sync=False)
+    timer.set_buy_time(datetime.now() + timedelta(seconds=seconds_to_buy))
+    return ClockDriftTracker(timer, min_interval=30.0, max_interval=1800.0)
+
+
+def test_fit_recovers_drift():
+    """一小时内每10分钟测量一次，京东时间相对单调时钟每小时快12ms"""
+    tracker = _make_tracker()
+    for i in range(7):
+        mono_ms = 1e7 + i * 600000.0
+        tracker.history.append((mono_ms, 500.0 + 12.0 * mono_ms / HOUR_MS, 5.0))
+    intercept, slope = tracker._fit()
+    assert abs(slope * HOUR_MS - 12.0) < 1e-6
+    assert abs(intercept + slope * 1e7 - (500.0 + 12.0 * 1e7 / HOUR_MS)) < 1e-6
+
+    # 误差大的测量权重小：一次误差200ms的异常值几乎不影响拟合
+    tracker.history.append((1e7 + 7 * 600000.0, 900.0, 200.0))
+    _, slope = tracker._fit()
+    assert abs(slope * HOUR_MS - 12.0) < 1.0
+
+
+def test_fit_without_enough_span():
+    """测量次数不足3次或时间跨度不足10分钟时不估计漂移，取加权平均时间差"""
+    tracker = _make_tracker()
+    tracker.history.extend([(0.0, 100.0, 1.0), (60000.0, 200.0, 1.0)])
+    assert tracker._fit() == (150.0, 0.0)
+    tracker.history.append((120000.0, 300.0, 1.0))
+    assert tracker._fit() == (200.0, 0.0)
+
+
+def test_next_interval():
+    """采样间隔为距离抢购时间的1/10，限制在[min_interval, max_interval]内，且不进入冻结窗口"""
+    assert abs(_make_tracker(7200)._next_interval() - 720.0) < 1.0
+    assert _make_tracker(36000)._next_interval() == 1800.0
+    assert abs(_make_tracker(100)._next_interval() - 30.0) < 1e-6
+    # 距离抢购20秒：最后一次采样需在冻结窗口(5秒)开始前1秒完成
+    assert abs(_make_tracker(20)._next_interval() - 14.0) < 0.1
+    # 已过抢购时间
+    assert _make_tracker(-10)._next_interval() == 1800.0
+
+
+def test_publish_replaces_anchor():
+    """发布预测值后京东时间按拟合结果推算，锚点整体替换，触发时刻随之更新"""
+    tracker = _make_tracker()
+    timer = tracker.timer
+    now_mono_ms = time.monotonic_ns() / 1e6
+    tracker.history.extend([(now_mono_ms - 1000.0, 250.0, 2.0), (now_mono_ms, 250.0, 2.0)])
+    tracker._publish(OffsetSample('test', -250.0, 4.0, 2.0))
+
+    anchor_mono_ns, anchor_jd_ms = timer._anchor
+    assert abs(anchor_jd_ms - (anchor_mono_ns / 1e6 + 250.0)) < 1e-3
+    assert abs(timer.jd_now_ms() - (time.monotonic_ns() / 1e6 + 250.0)) < 5.0
+    assert timer.diff_time == -250 and timer.diff_error == 2.0
+    assert timer.deadline_ns == timer.monotonic_deadline_ns(timer.trigger_time_ms())
+    assert tracker.drift_ms_per_hour == 0.0
+
+
+def test_concurrent_readers_see_consistent_anchor():
+    """后台反复发布锚点时，读取线程推算的京东时间始终与某一个完整锚点一致"""
+    tracker = _make_tracker()
+    timer = tracker.timer
+    stop = threading.Event()
+    errors = []
+    mono_ns = time.monotonic_ns()
+    timer.anchor(mono_ns, mono_ns / 1e6)
+
+    def reader():
+        while not stop.is_set():
+            jd_ms = timer.jd_now_ms() - time.monotonic_ns() / 1e6
+            # 两个锚点推算的京东时间分别比单调时钟快0ms和慢1e6ms，混合读取会得到其他值
+            if min(abs(jd_ms), abs(jd_ms + 1e6)) > 50.0:
+                errors.append(jd_ms)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(20000):
+            mono_ns = time.monotonic_ns()
+            if i % 2:
+                timer.anchor(mono_ns - 10 ** 12, mono_ns / 1e6 - 2e6)
+            else:
+                timer.anchor(mono_ns, mono_ns / 1e6)
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors, errors[:5]
+
+
+def test_resync_replaces_anchor():
+    """未开启后台校时时按抢购日调用resync：重新测量时间差并整体替换锚点，保留历史修正量"""
+    timer = Timer(sync=False)
+    timer.set_buy_time(datetime.now() + timedelta(hours=1))
+    timer.set_correction(3.0)
+    timer.measure_offset = lambda: OffsetSample('test', -250.0, 4.0, 2.0)
+    assert timer.resync() == -250
+    assert timer.diff_error == 2.0
+    assert abs(timer.jd_now_ms() - (time.time() * 1000.0 + 253.0)) < 5.0
+    assert timer.deadline_ns == timer.monotonic_deadline_ns(timer.trigger_time_ms())
+
+
+if __name__ == "__main__":
+    test_fit_recovers_drift()
+    test_fit_without_enough_span()
+    test_next_interval()
+    test_publish_replaces_anchor()
+    test_concurrent_readers_see_consistent_anchor()
+    test_resync_replaces_anchor()
+    print("[OK] 后台时钟漂移跟踪测试通过")
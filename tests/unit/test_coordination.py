@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试多进程抢购协调：任一进程成功或到达截止时间后所有进程停止，进程异常被收集，
+启动闸门在触发时刻统一放行所有进程，尝试调度器把尝试均匀错开（不发送网络请求）
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.coordination import ProcessCampaign, ThreadCampaign, AttemptScheduler
+
+
+class SimulatedSeckill(object):
+    """模拟抢购进程：每个阶段耗时step_seconds，阶段之间检查停止事件"""
+
+    def __init__(self, win_file=None, win_after=0.1, step_seconds=0.02, duration=5.0):
+        self.win_file = win_file
+        self.win_after = win_after
+        self.step_seconds = step_seconds
+        self.duration = duration
+        self.stop_event = None
+        self.start_gate = None
+        self.release_skew_ms = None
+
+    def campaign(self):
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.duration:
+            if self.stop_event.is_set():
+                return False
+            time.sleep(self.step_seconds)
+            if self.win_file and time.perf_counter() - start >= self.win_after:
+                try:
+                    # 只有第一个创建文件的进程下单成功
+                    os.close(os.open(self.win_file, os.O_CREAT | os.O_EXCL))
+                    return True
+                except FileExistsError:
+                    pass
+        return False
+
+    def broken(self):
+        raise ValueError('模拟异常')
+
+    def gated(self, deadline_ns):
+        """准备完成后停在启动闸门上，被放行时不应早于deadline_ns"""
+        self.release_skew_ms = self.start_gate.wait(deadline_ns, spin_ms=5.0)
+        return time.monotonic_ns() >= deadline_ns and False
+
+
+class GateTimer(object):
+    """启动闸门的计时者：等待到deadline_ns"""
+
+    def __init__(self, deadline_ns):
+        self.deadline_ns = deadline_ns
+
+    def start(self):
+        while time.monotonic_ns() < self.deadline_ns:
+            time.sleep(0.001)
+
+
+def test_first_success_stops_all():
+    with tempfile.TemporaryDirectory() as directory:
+        seckill = SimulatedSeckill(win_file=os.path.join(directory, 'win'))
+        result = ProcessCampaign(4).run(seckill, 'campaign')
+    print(f"耗时 {result.elapsed:.2f}秒，结果 {result.results}")
+    assert result.success and result.stop_reason == 'success'
+    assert sum(1 for item in result.results if item['success']) == 1
+    assert result.elapsed < 2.0
+
+
+def test_deadline_stops_all():
+    result = ProcessCampaign(3, deadline_seconds=0.3).run(SimulatedSeckill(), 'campaign')
+    assert not result.success and result.stop_reason == 'deadline'
+    assert all(item['stopped'] for item in result.results)
+    assert result.elapsed < 2.0
+
+
+def test_worker_errors_collected():
+    result = ProcessCampaign(2).run(SimulatedSeckill(), 'broken')
+    assert not result.success
+    assert len(result.errors) == 2 and '模拟异常' in result.errors[0]
+
+
+def test_start_gate_releases_all():
+    """子进程停在启动闸门上，父进程在触发时刻放行，每个进程都报告放行偏差"""
+    # 留出启动子进程的时间
+    deadline_ns = time.monotonic_ns() + int(3e9)
+    result = ProcessCampaign(3, timer=GateTimer(deadline_ns)).run(SimulatedSeckill(), 'gated', deadline_ns)
+    skews = [item['release_skew_ms'] for item in result.results]
+    print(f"放行偏差 {skews}")
+    assert len(skews) == 3 and not result.errors
+    assert all(0 <= skew < 100 for skew in skews)
+    assert time.monotonic_ns() >= deadline_ns
+
+
+def test_thread_campaign_shares_object():
+    """线程方式共享同一个对象，第一个成功后其余线程停止"""
+    with tempfile.TemporaryDirectory() as directory:
+        seckill = SimulatedSeckill(win_file=os.path.join(directory, 'win'))
+        seckill.stop_event = threading.Event()
+        result = ThreadCampaign(4).run(seckill.campaign, seckill.stop_event)
+    assert result.success and result.stop_reason == 'success'
+    assert sum(1 for item in result.results if item['success']) == 1
+    assert sum(1 for item in result.results if item['stopped']) == 3
+    assert result.elapsed < 1.0
+
+
+def test_attempt_scheduler_slots():
+    """时间槽依次分配，过期超过一个间隔的时间槽被跳过"""
+    scheduler = AttemptScheduler(100)  # 每10ms一次
+    start = 10 ** 9
+    assert scheduler.claim(start) == 0
+    assert abs(scheduler.claim(start) - 0.010) < 1e-9
+    assert abs(scheduler.claim(start + int(5e6)) - 0.015) < 1e-9
+    # 晚于时间槽不足一个间隔时立即尝试
+    assert scheduler.claim(start + int(38e6)) == 0
+    # 100ms时下一个时间槽(40ms)已过期，跳过到100ms
+    assert scheduler.claim(start + int(100e6)) == 0
+    summary = scheduler.summary()
+    assert summary['claimed'] == 5 and summary['skipped'] == 6
+    assert abs(summary['coverage'] - 5 / 11.0) < 1e-9
+    assert abs(summary['effective_interval_ms'] - 25.0) < 1e-9
+
+
+def test_attempt_scheduler_rebalances_stalled_worker():
+    """一个线程卡住时其他线程领取后续时间槽，合计速率不变"""
+    scheduler = AttemptScheduler(200)  # 每5ms一次
+    times = []
+    lock = threading.Lock()
+
+    def worker(stall):
+        for i in range(15):
+            time.sleep(scheduler.claim())
+            with lock:
+                times.append(time.monotonic())
+            if stall and i == 1:
+                time.sleep(0.1)
+
+    threads = [threading.Thread(target=worker, args=(i == 0,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = scheduler.summary()
+    print(f"尝试调度 {summary}")
+    gaps = sorted((b - a) * 1000.0 for a, b in zip(sorted(times), sorted(times)[1:]))
+    assert summary['claimed'] == 60
+    # 线程卡住期间其余线程维持速率，尝试不集中也不留出长空档
+    assert 3.0 < gaps[len(gaps) // 2] < 8.0
+    assert summary['coverage'] > 0.8
+
+
+if __name__ == "__main__":
+    test_first_success_stops_all()
+    test_deadline_stops_all()
+    test_worker_errors_collected()
+    test_start_gate_releases_all()
+    test_attempt_scheduler_slots()
+    test_attempt_scheduler_rebalances_stalled_worker()
+    test_thread_campaign_shares_object()
+    print("[OK] 多进程抢购协调测试通过")
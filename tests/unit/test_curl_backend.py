@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试libcurl后端与requests后端的行为一致性（本地服务器，无需网络，需要pycurl）
+"""
+
+import os
+import sys
+import json
+import pickle
+import threading
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """/login 设置Cookie并302到/echo；/echo 返回收到的方法、Cookie、表单和请求体"""
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode('utf-8') if length else ''
+        form = parse_qs(raw)
+        if self.path.startswith('/login'):
+            self._reply(302, headers=[('Location', '/echo?from=login'),
+                                      ('Set-Cookie', 'thor=abc; Path=/'),
+                                      ('Set-Cookie', 'pin=user1; Path=/')])
+        else:
+            body = json.dumps({'method': self.command, 'path': self.path, 'cookie': self.headers.get('Cookie'),
+                               'host': self.headers.get('Host'), 'form': form, 'body': raw,
+                               'content_type': self.headers.get('Content-Type')}).encode('utf-8')
+            self._reply(200, body, [('Content-Type', 'application/json; charset=utf-8')])
+
+    do_GET = do_POST = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+
+def _sessions():
+    from maotai.curl_backend import CurlSession
+    return [('requests', requests.Session()), ('curl', CurlSession())]
+
+
+def test_cookies_and_redirects():
+    """重定向中间响应的Set-Cookie进入jar，后续请求携带Cookie，POST的302改为GET"""
+    server, base = _start_server()
+    try:
+        results = dict()
+        for name, session in _sessions():
+            resp = session.post(base + '/login', data={'a': '1'})
+            echo = resp.json()
+            results[name] = (resp.status_code, echo['method'], echo['path'], len(resp.history),
+                             session.cookies.get('thor'), sorted(echo['cookie'].split('; ')))
+        print(results)
+        assert results['curl'] == results['requests']
+    finally:
+        server.shutdown()
+
+
+def test_form_params_and_headers():
+    """表单、查询参数和自定义请求头的编码与requests一致"""
+    server, base = _start_server()
+    try:
+        results = dict()
+        for name, session in _sessions():
+            session.headers.update({'User-Agent': 'test'})
+            resp = session.post(base + '/echo', params={'skuId': '100', 'rid': 1},
+                                data={'name': '张三', 'token': 'a b&c'}, headers={'Host': 'marathon.jd.com'},
+                                allow_redirects=False)
+            echo = resp.json()
+            results[name] = (echo['path'], echo['form'], echo['host'], resp.headers.get('content-type'))
+        print(results)
+        assert results['curl'] == results['requests']
+    finally:
+        server.shutdown()
+
+
+def test_json_body_and_unsupported_kwargs():
+    """json请求体的编码与requests一致；不支持的参数抛出TypeError而不是被忽略"""
+    from maotai.curl_backend import CurlSession
+    server, base = _start_server()
+    try:
+        results = dict()
+        for name, session in _sessions():
+            echo = session.post(base + '/echo', json={'skuId': 100, 'name': '张三', 'items': [1, None]}).json()
+            results[name] = (echo['content_type'], json.loads(echo['body']))
+        print(results)
+        assert results['curl'] == results['requests']
+
+        session = CurlSession()
+        for kwargs in ({'verify': False}, {'proxies': {'https': 'http://127.0.0.1:1'}}, {'cookies': {'a': '1'}},
+                       {'stream': True}):
+            try:
+                session.get(base + '/echo', **kwargs)
+                assert False, f'{kwargs} 应抛出TypeError'
+            except TypeError as e:
+                assert list(kwargs)[0] in str(e)
+        assert session.connection_stats() == {}
+    finally:
+        server.shutdown()
+
+
+def test_connection_reuse_and_pickle():
+    """连接复用统计；序列化后Cookie保留且可继续请求"""
+    from maotai.curl_backend import CurlSession
+    server, base = _start_server()
+    try:
+        session = CurlSession()
+        for _ in range(5):
+            session.get(base + '/login')
+        stats = session.connection_stats()['127.0.0.1']
+        print(f"连接统计: {stats}")
+        assert stats['connections'] == 1
+        assert stats['requests'] == 10
+
+        restored = pickle.loads(pickle.dumps(session))
+        assert restored.cookies.get('pin') == 'user1'
+        assert 'thor=abc' in restored.get(base + '/echo').json()['cookie']
+    finally:
+        server.shutdown()
+
+
+def test_pinned_ip():
+    """固定IP后连接到该IP，Host头仍为域名"""
+    from maotai.curl_backend import CurlSession
+    server, base = _start_server()
+    try:
+        port = server.server_address[1]
+        host = 'seckill.pinned.invalid'
+        session = CurlSession(pinned_ips={host: '127.0.0.1'})
+        echo = session.get('http://{}:{}/echo'.format(host, port)).json()
+        assert echo['host'] == '{}:{}'.format(host, port)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        import pycurl
+    except ImportError:
+        print("未安装pycurl，跳过")
+        sys.exit(0)
+    test_cookies_and_redirects()
+    test_form_params_and_headers()
+    test_json_body_and_unsupported_kwargs()
+    test_connection_reuse_and_pickle()
+    test_pinned_ip()
+    print("[OK] libcurl后端测试通过")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试HTTP/2客户端的建立与回退：未安装httpx、服务器只协商HTTP/1.1、连接失败时open返回False且不保留客户端，
+调用方继续使用requests；协商成功时共享Session的请求头与Cookie（本地模拟服务器，无需网络）
+"""
+
+import os
+import sys
+import socket
+
+import requests
+
+# 添加项目根目录与benchmark目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'tests', 'benchmark'))
+
+from fake_clock_server import FakeClockServer
+from maotai.http2_client import Http2Client
+
+
+def _has_http2():
+    try:
+        import httpx
+        import h2
+    except ImportError:
+        return False
+    return True
+
+
+def _make_client(http1=True):
+    session = requests.Session()
+    session.headers.update({'User-Agent': 'Mozilla/5.0 test'})
+    session.cookies.set('thor', 'abc', domain='127.0.0.1')
+    return Http2Client(session, ['127.0.0.1'], timeout=2, http1=http1)
+
+
+def test_fallback_without_httpx():
+    """未安装httpx时回退"""
+    saved = sys.modules.get('httpx')
+    sys.modules['httpx'] = None  # 使import httpx抛出ImportError
+    try:
+        client = _make_client()
+        assert client.open(['http://127.0.0.1:1/']) is False
+        assert client.client is None and not client.handles('http://127.0.0.1/echo')
+    finally:
+        if saved is None:
+            sys.modules.pop('httpx', None)
+        else:
+            sys.modules['httpx'] = saved
+
+
+def test_fallback_when_negotiation_fails():
+    """服务器只支持HTTP/1.1，或连接失败时回退并关闭客户端"""
+    if not _has_http2():
+        print("未安装httpx[http2]，跳过")
+        return
+    with FakeClockServer() as server:
+        client = _make_client()
+        assert client.open([server.url]) is False
+        assert client.http_version == 'HTTP/1.1'
+        assert client.client is None and not client.handles(server.url)
+
+    # 没有服务在监听的端口
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    client = _make_client()
+    assert client.open(['http://127.0.0.1:{}/'.format(port)]) is False
+    assert client.client is None
+
+
+def test_open_shares_session_state():
+    """协商到HTTP/2时复用同一个连接，并共享Session的请求头与cookie jar"""
+    if not _has_http2():
+        print("未安装httpx[http2]，跳过")
+        return
+    from fake_h2_server import FakeH2Server
+    with FakeH2Server() as server:
+        client = _make_client(http1=False)
+        try:
+            assert client.open([server.url]) is True
+            assert client.http_version == 'HTTP/2' and client.handles(server.url)
+            assert client.client.headers['User-Agent'] == 'Mozilla/5.0 test'
+            assert client.client.cookies.jar is client.session.cookies
+            for _ in range(3):
+                assert client.request('POST', server.url, data={'a': '1'}).status_code == 200
+            assert server.connections == 1
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    test_fallback_without_httpx()
+    test_fallback_when_negotiation_fails()
+    test_open_shares_session_state()
+    print("[OK] HTTP/2客户端测试通过")
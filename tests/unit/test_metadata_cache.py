@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试用户与商品信息缓存：有效期、本地文件持久化，以及抢购流程只读缓存（不发送网络请求）
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import requests
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.metadata_cache import MetadataCache
+
+
+def test_cache_ttl_and_persistence():
+    """缓存写入本地文件，新实例可读取；过期后重新获取，空值不缓存"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, 'metadata_cache.json')
+        cache = MetadataCache(cache_file, ttl=60)
+        calls = []
+        fetch = lambda: calls.append(1) or '飞天茅台'
+        assert cache.get_or_fetch('sku_title:1', fetch) == '飞天茅台'
+        assert cache.get_or_fetch('sku_title:1', fetch) == '飞天茅台'
+        assert len(calls) == 1
+
+        reloaded = MetadataCache(cache_file, ttl=60)
+        assert reloaded.get('sku_title:1') == '飞天茅台'
+        reloaded._items['sku_title:1']['updated_at'] = time.time() - 120
+        assert reloaded.get('sku_title:1') is None
+
+        cache.set('username:pin', None)
+        assert cache.get_or_fetch('username:pin', lambda: None) is None
+        assert 'username:pin' not in cache._items
+
+
+def test_seckill_reads_cache_only():
+    """cached_only时不发送请求，缓存中没有时返回登录昵称或商品ID"""
+    from maotai.jd_spider_requests import JdSeckill
+    from maotai.config import global_config
+
+    with tempfile.TemporaryDirectory() as directory:
+        seckill = JdSeckill.__new__(JdSeckill)
+        seckill.metadata_cache = MetadataCache(os.path.join(directory, 'metadata_cache.json'))
+        seckill.session = requests.Session()
+        seckill.session.cookies.set('pt_pin', 'user', domain='.jd.com')
+        seckill.nick_name = '登录昵称'
+
+        def no_request():
+            raise AssertionError('抢购流程不应发送请求')
+        seckill._fetch_username = no_request
+        seckill._fetch_sku_title = lambda sku_id: no_request()
+
+        sku_id = global_config.getRaw('config', 'sku_id')
+        assert seckill.get_username(cached_only=True) == '登录昵称'
+        assert seckill.get_sku_title(cached_only=True) == '商品ID: {}'.format(sku_id)
+        # 抢购失败通知在抢购窗口内生成，缓存中没有商品名称时也不发送请求
+        message = seckill._generate_markdown_message({'type': '抢购通知', 'title': '抢购失败', 'seckill_success': False})
+        assert '商品ID: {}'.format(sku_id) in message
+
+        seckill.metadata_cache.set('username:user', '缓存昵称')
+        seckill.metadata_cache.set('sku_title:{}'.format(sku_id), '飞天茅台')
+        assert seckill.get_username(cached_only=True) == '缓存昵称'
+        assert seckill.get_sku_title() == '飞天茅台'
+
+
+def test_prefetch_fills_empty_cache():
+    """首次运行缓存为空：抢购前的预取请求一次并写入缓存，抢购流程只读缓存也能显示商品名称"""
+    from maotai.jd_spider_requests import JdSeckill
+
+    with tempfile.TemporaryDirectory() as directory:
+        seckill = JdSeckill.__new__(JdSeckill)
+        seckill.metadata_cache = MetadataCache(os.path.join(directory, 'metadata_cache.json'))
+        seckill.session = requests.Session()
+        seckill.session.cookies.set('pt_pin', 'user', domain='.jd.com')
+        seckill.nick_name = '登录昵称'
+        calls = []
+        seckill._fetch_username = lambda: calls.append('username') or '用户昵称'
+        seckill._fetch_sku_title = lambda sku_id: calls.append('sku_title') or '飞天茅台'
+
+        seckill.prefetch_metadata()
+        assert calls == ['username', 'sku_title']
+        assert seckill.get_username(cached_only=True) == '用户昵称'
+        assert seckill.get_sku_title(cached_only=True) == '飞天茅台'
+        # 准备阶段的普通调用命中缓存，不再请求
+        assert seckill.get_sku_title() == '飞天茅台'
+        assert calls == ['username', 'sku_title']
+
+
+if __name__ == "__main__":
+    test_cache_ttl_and_persistence()
+    test_seckill_reads_cache_only()
+    test_prefetch_fills_empty_cache()
+    print("[OK] 信息缓存测试通过")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试等待锚定在单调时钟上：等待期间系统时间向前或向后跳变，触发时刻与京东时间推算不变；
+全自动化模式的状态检查等待不越过秒杀准备时刻（模拟系统时间，无需网络）
+"""
+
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timedelta
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.timer import Timer
+
+
+def _jump_wall_clock(delay, jump_seconds):
+    """delay秒后把time.time整体拨动jump_seconds秒，返回恢复函数"""
+    real_time = time.time
+
+    def jump():
+        time.sleep(delay)
+        time.time = lambda: real_time() + jump_seconds
+    thread = threading.Thread(target=jump)
+    thread.start()
+
+    def restore():
+        thread.join()
+        time.time = real_time
+    return restore
+
+
+def test_sleep_until_ignores_wall_clock_jump():
+    for jump_seconds in (3600, -3600):
+        timer = Timer(sync=False)
+        timer.set_buy_time(datetime.now() + timedelta(milliseconds=300))
+        deadline_ns = timer.deadline_ns
+        jd_before = timer.jd_now_ms() - time.monotonic_ns() / 1e6
+
+        start = time.perf_counter()
+        restore = _jump_wall_clock(0.05, jump_seconds)
+        try:
+            wake_error = timer.sleep_until()
+            elapsed = time.perf_counter() - start
+            assert timer.deadline_ns == deadline_ns
+            # 京东时间由单调时钟推算，不随系统时间跳变
+            assert abs(timer.jd_now_ms() - time.monotonic_ns() / 1e6 - jd_before) < 1.0
+        finally:
+            restore()
+        print(f"系统时间跳变 {jump_seconds:+d}秒：等待 {elapsed * 1000:.1f}ms，唤醒误差 {wake_error:.3f}ms")
+        assert 0.2 < elapsed < 0.5
+        assert abs(wake_error) < 10.0
+
+
+def test_auto_mode_wait_stops_at_prepare_point():
+    """状态检查等待最多max_wait秒，且在秒杀准备时刻醒来；准备时刻已过时只按max_wait等待"""
+    from maotai.jd_spider_requests import JdSeckill
+    seckill = JdSeckill.__new__(JdSeckill)
+    seckill.timers = Timer(sync=False)
+    seckill.seckill_prepare_seconds = 30
+
+    # 距离抢购30.2秒：在准备时刻（约0.2秒后）醒来，而不是等满max_wait
+    status = {'next_action_time': datetime.now() + timedelta(seconds=30.2)}
+    start = time.perf_counter()
+    seckill._sleep_before_action(status, 5)
+    assert 0.1 < time.perf_counter() - start < 0.5
+
+    # 已进入抢购时间段：按max_wait等待，不会因准备时刻已过而立即返回
+    status = {'next_action_time': datetime.now() - timedelta(seconds=10)}
+    start = time.perf_counter()
+    seckill._sleep_before_action(status, 0.2)
+    assert 0.15 < time.perf_counter() - start < 0.5
+
+
+if __name__ == "__main__":
+    test_sleep_until_ignores_wall_clock_jump()
+    test_auto_mode_wait_stops_at_prepare_point()
+    print("[OK] 单调时钟等待测试通过")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试下单模板缓存：init.action只在首次提交和token被拒绝后调用，多线程同时获取时只调用一次（不发送网络请求）
+"""
+
+import os
+import sys
+import time
+import threading
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def _make_seckill():
+    from maotai.jd_spider_requests import JdSeckill
+    seckill = JdSeckill.__new__(JdSeckill)
+    seckill._init_campaign_state()
+    seckill.sku_id = '100012043978'
+    seckill.seckill_order_data = dict()
+    seckill.seckill_init_info = dict()
+    tokens = iter('token{}'.format(i) for i in range(100))
+
+    def init_info():
+        # 模拟init.action的往返耗时
+        time.sleep(0.02)
+        return {'token': next(tokens)}
+    seckill._get_seckill_init_info = init_info
+    seckill._get_seckill_order_data = lambda: {'addressId': '1', 'token': init_info()['token']}
+    return seckill
+
+
+def test_template_reused():
+    """多次提交只调用一次init.action"""
+    seckill = _make_seckill()
+    first = seckill._get_order_template()
+    for _ in range(5):
+        assert seckill._get_order_template() is first
+    assert seckill.order_stats['init_calls'] == 1
+    assert first['token'] == 'token0'
+
+
+def test_token_refreshed_on_rejection():
+    """token被拒绝后只刷新token，其余字段保持不变"""
+    seckill = _make_seckill()
+    template = seckill._get_order_template()
+    assert not seckill._is_order_token_rejected({'errorMessage': '很遗憾没有抢到，再接再厉哦。', 'resultCode': 60074})
+    assert not seckill._is_order_token_rejected({'errorMessage': '抱歉，您提交过快，请稍后再提交订单！'})
+    assert seckill._is_order_token_rejected({'errorMessage': 'Token已过期，请刷新页面'})
+    assert not seckill._is_order_token_rejected({'errorMessage': '参数错误，请刷新后重试'})
+
+    seckill._mark_order_token_stale(template)
+    refreshed = seckill._get_order_template()
+    # 刷新时生成新的模板，其他线程正在提交的旧模板不变
+    assert refreshed is not template and template['token'] == 'token0'
+    assert refreshed['token'] == 'token1'
+    assert refreshed['addressId'] == '1'
+    assert seckill.order_stats['init_calls'] == 2
+    assert not seckill._order_token_stale
+    # 旧模板再次被拒绝时不重复刷新
+    seckill._mark_order_token_stale(template)
+    assert seckill._get_order_template() is refreshed
+    try:
+        refreshed['token'] = 'x'
+        assert False, '下单模板应为只读'
+    except TypeError:
+        pass
+
+
+def test_concurrent_cold_template():
+    """多个线程同时获取尚未生成的模板时只调用一次init.action"""
+    seckill = _make_seckill()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(seckill._get_order_template())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seckill.order_stats['init_calls'] == 1
+    assert all(item is results[0] for item in results)
+
+
+if __name__ == "__main__":
+    test_template_reused()
+    test_token_refreshed_on_rejection()
+    test_concurrent_cold_template()
+    print("[OK] 下单模板缓存测试通过")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试流水线抢购引擎（用模拟的抢购阶段代替真实请求，无需网络）
+"""
+
+import os
+import sys
+import time
+import threading
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.pipeline import PipelinedSeckillEngine
+
+
+class SimulatedSeckill(object):
+    """模拟JdSeckill的两个抢购阶段：每个阶段耗时step_seconds，第success_on次下单成功"""
+
+    def __init__(self, step_seconds=0.03, success_on=None):
+        self.step_seconds = step_seconds
+        self.success_on = success_on
+        self.submits = 0
+        # 每个请求的(阶段, 开始时刻, 结束时刻)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _request(self, stage):
+        start = time.perf_counter()
+        time.sleep(self.step_seconds)
+        with self._lock:
+            self.requests.append((stage, start, time.perf_counter()))
+
+    def request_seckill_checkout_page(self):
+        self._request('checkout')
+
+    def submit_seckill_order(self):
+        self._request('submit')
+        with self._lock:
+            self.submits += 1
+            return self.success_on is not None and self.submits == self.success_on
+
+    def smart_error_handler(self, error_msg):
+        return 0.01
+
+
+def test_checkout_overlaps_submit():
+    """下单等待响应时下一个尝试的结算页请求已经在途，各阶段统计完整"""
+    seckill = SimulatedSeckill()
+    engine = PipelinedSeckillEngine(seckill, depth=3, max_attempts=12, duration=10)
+    start = time.perf_counter()
+    assert engine.run() is False
+    elapsed = time.perf_counter() - start
+    # 顺序执行需要12 * 2 * 30ms = 0.72秒，流水线约为其1/3
+    print(f"尝试 {engine.attempts} 次，耗时 {elapsed:.2f}秒")
+    assert engine.attempts == 12
+    assert elapsed < 0.5
+
+    submits = [r for r in seckill.requests if r[0] == 'submit']
+    checkouts = [r for r in seckill.requests if r[0] == 'checkout']
+    overlapped = sum(1 for _, s_start, s_end in submits
+                     if any(s_start < c_end and c_start < s_end for _, c_start, c_end in checkouts))
+    assert overlapped >= len(submits) // 2
+
+    summaries = [stats.summary() for stats in engine.stage_stats]
+    assert [item['stage'] for item in summaries] == ['checkout', 'submit']
+    assert all(item['count'] == 12 for item in summaries)
+    assert all(item['p50_ms'] >= 25 for item in summaries)
+
+
+def test_success_stops_pipeline():
+    """任一尝试成功后不再开始新的尝试"""
+    seckill = SimulatedSeckill(step_seconds=0.01, success_on=5)
+    engine = PipelinedSeckillEngine(seckill, depth=4, max_attempts=1000, duration=10)
+    assert engine.run() is True
+    assert engine.attempts < 15
+    # run返回时已发出的请求都已结束，之后不再有新的请求
+    count = len(seckill.requests)
+    time.sleep(0.05)
+    assert len(seckill.requests) == count
+
+
+def test_duration_bounds_run():
+    """到达最长抢购时间后停止，并等待在途请求结束后才返回"""
+    seckill = SimulatedSeckill(step_seconds=0.05)
+    engine = PipelinedSeckillEngine(seckill, depth=2, max_attempts=1000, duration=0.2)
+    start = time.perf_counter()
+    assert engine.run() is False
+    assert time.perf_counter() - start < 0.5
+    assert not any(t.name.startswith('pipeline-') for t in threading.enumerate())
+
+
+if __name__ == "__main__":
+    test_checkout_overlaps_submit()
+    test_success_stops_pipeline()
+    test_duration_bounds_run()
+    print("[OK] 流水线抢购引擎测试通过")
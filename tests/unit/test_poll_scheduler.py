@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试抢购链接轮询调度：距离抢购时间远时稀疏、抢购前后密集、不会睡过密集窗口起点，
+等待期间收到停止信号立即返回（不发送网络请求）
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def _make_scheduler():
+    from maotai.timer import Timer, PollScheduler
+    timer = Timer(sync=False)
+    timer.set_buy_time(datetime.now() + timedelta(minutes=1))
+    return PollScheduler(timer, fast_rate=20, fast_before_ms=2000, fast_after_ms=3000,
+                         slow_interval_ms=500, settle_interval_ms=200)
+
+
+def test_poll_intervals():
+    scheduler = _make_scheduler()
+    buy_ms = scheduler.timer.buy_time_ms
+    # 远离抢购时间：稀疏轮询
+    assert 450 <= scheduler.interval_ms(buy_ms - 60000) <= 550
+    # 临近密集窗口：不睡过窗口起点
+    assert scheduler.interval_ms(buy_ms - 2100) <= 100
+    # 密集窗口内（抢购前后）：20次/秒
+    for offset in (-1500, 0, 2500):
+        assert 45 <= scheduler.interval_ms(buy_ms + offset) <= 55
+    # 密集窗口后
+    assert 180 <= scheduler.interval_ms(buy_ms + 4000) <= 220
+    assert abs(scheduler.latency_ms(buy_ms + 150) - 150) < 1e-6
+
+
+def test_wait_stops_on_signal():
+    """等待函数报告收到停止信号时wait返回True，轮询循环据此退出"""
+    import threading
+    scheduler = _make_scheduler()
+    stop_event = threading.Event()
+    stop_event.set()
+    assert scheduler.wait(stop_event.wait) is True
+    assert scheduler.wait(lambda seconds: None) is False
+    assert scheduler.polls == 2
+
+
+if __name__ == "__main__":
+    test_poll_intervals()
+    test_wait_stops_on_signal()
+    print("[OK] 轮询调度测试通过")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试预处理的结算页与下单请求：发出的请求与逐次构造的请求一致（不发送网络请求）
+"""
+
+import os
+import sys
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.prepared_requests import PreparedSeckillRequests
+
+SKU_ID = '100012043978'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+
+
+class RecordingAdapter(BaseAdapter):
+    """记录发出的请求，返回空的200响应"""
+
+    def __init__(self):
+        super(RecordingAdapter, self).__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = request.url
+        resp.request = request
+        resp._content = b'{}'
+        return resp
+
+    def close(self):
+        pass
+
+
+def _make_session():
+    session = requests.Session()
+    adapter = RecordingAdapter()
+    session.mount('https://', adapter)
+    session.cookies.set('pt_key', 'abc', domain='.jd.com', path='/')
+    return session, adapter
+
+
+def test_submit_matches_unprepared():
+    """下单请求体与requests编码一致，token变化后只替换token，Cookie按最新jar生成"""
+    session, adapter = _make_session()
+    order = {'skuId': SKU_ID, 'num': '2', 'name': '张三', 'invoiceTitle': -1, 'password': None,
+             'token': 'a b+c', 'pru': ''}
+    session.post('https://marathon.jd.com/seckillnew/orderService/pc/submitOrder.action',
+                 params={'skuId': SKU_ID}, data=order)
+    prepared = PreparedSeckillRequests(session, SKU_ID, '2', USER_AGENT)
+    prepared.submit(order)
+    expected, actual = adapter.sent
+    assert actual.method == 'POST'
+    assert actual.url == expected.url
+    assert sorted(parse_qsl(actual.body.decode())) == sorted(parse_qsl(expected.body))
+    assert actual.headers['Content-Length'] == str(len(actual.body))
+    assert actual.headers['Cookie'] == 'pt_key=abc'
+    assert actual.headers['Referer'].startswith(
+        'https://marathon.jd.com/seckill/seckill.action?skuId={}&num=2&rid='.format(SKU_ID))
+
+    order['token'] = 'new-token'
+    session.cookies.set('pt_pin', 'user', domain='.jd.com', path='/')
+    prepared.submit(order)
+    refreshed = adapter.sent[-1]
+    assert dict(parse_qsl(refreshed.body.decode()))['token'] == 'new-token'
+    assert dict(parse_qsl(refreshed.body.decode()))['name'] == '张三'
+    assert 'pt_pin=user' in refreshed.headers['Cookie']
+
+
+def test_checkout_rid():
+    """结算页请求每次发送时生成rid"""
+    session, adapter = _make_session()
+    prepared = PreparedSeckillRequests(session, SKU_ID, '2', USER_AGENT)
+    prepared.checkout()
+    sent = adapter.sent[-1]
+    query = dict(parse_qsl(urlsplit(sent.url).query))
+    assert query['skuId'] == SKU_ID and query['num'] == '2'
+    assert int(query['rid']) > 0
+    assert sent.headers['Referer'] == 'https://item.jd.com/{}.html'.format(SKU_ID)
+    assert sent.headers['User-Agent'] == USER_AGENT
+
+
+if __name__ == "__main__":
+    test_submit_matches_unprepared()
+    test_checkout_rid()
+    print("[OK] 预处理请求测试通过")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试多时间源并发校时：得到quorum个结果后取消慢时间源、失败的时间源被忽略、超时后返回已有结果，
+以及按误差倒数加权取中位数（用模拟的时间源代替网络请求）
+"""
+
+import os
+import sys
+import time
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.timer import Timer, OffsetSample
+
+
+def _make_timer(quorum=2, samples=3, timeout=2.0):
+    timer = Timer(sync=False)
+    timer.sync_quorum = quorum
+    timer.sync_samples = samples
+    timer.sync_timeout = timeout
+    return timer
+
+
+def _source(name, offset_ms=0.0, delay=0.0, fail=False, calls=None):
+    """模拟时间源：每次调用耗时delay秒，返回比本地时间慢offset_ms的服务器时间"""
+    def source():
+        if calls is not None:
+            calls.append(name)
+        time.sleep(delay)
+        if fail:
+            raise IOError('模拟时间源失败')
+        return int(time.time() * 1000.0 - offset_ms)
+    source.__name__ = name
+    return source
+
+
+def test_quorum_cancels_slow_source():
+    """两个快速时间源凑够quorum后立即返回，慢时间源被停止，不再继续采样"""
+    timer = _make_timer(quorum=2, samples=3)
+    slow_calls = []
+    sources = [_source('fast_a', 100.0, delay=0.005), _source('fast_b', 100.0, delay=0.005),
+               _source('slow', 100.0, delay=0.5, calls=slow_calls)]
+    start = time.perf_counter()
+    results = timer._probe_sources_concurrently(sources)
+    elapsed = time.perf_counter() - start
+    assert sorted(s.source for s in results) == ['fast_a', 'fast_b']
+    assert elapsed < 0.3, f'凑够quorum后应立即返回，实际耗时 {elapsed:.3f}秒'
+    for sample in results:
+        assert abs(sample.offset - 100.0) < 20.0
+    # 慢时间源在收到停止信号后不再发起新的采样
+    time.sleep(0.6)
+    assert len(slow_calls) == 1
+
+
+def test_failing_source_ignored():
+    """失败的时间源不计入结果，其余时间源仍可凑够quorum"""
+    timer = _make_timer(quorum=2, samples=2)
+    sources = [_source('broken', fail=True), _source('fast_a', 50.0, delay=0.005),
+               _source('fast_b', 50.0, delay=0.01)]
+    results = timer._probe_sources_concurrently(sources)
+    assert sorted(s.source for s in results) == ['fast_a', 'fast_b']
+
+
+def test_timeout_returns_partial_results():
+    """超时后返回已得到的结果，不等待慢时间源"""
+    timer = _make_timer(quorum=3, samples=1, timeout=0.2)
+    sources = [_source('fast', 10.0, delay=0.005), _source('broken', fail=True),
+               _source('slow', 10.0, delay=1.0)]
+    start = time.perf_counter()
+    results = timer._probe_sources_concurrently(sources)
+    assert time.perf_counter() - start < 0.5
+    assert [s.source for s in results] == ['fast']
+
+    # 全部失败时返回空列表，measure_offset据此退回本地时间
+    timer = _make_timer(quorum=2, samples=1, timeout=0.2)
+    assert timer._probe_sources_concurrently([_source('a', fail=True), _source('b', fail=True)]) == []
+
+
+def test_weighted_median():
+    """误差小的时间源权重大：一个高精度时间源可以压过两个低精度时间源"""
+    precise = OffsetSample('precise', 10.0, 4.0, 2.0)
+    coarse_a = OffsetSample('coarse_a', 300.0, 40.0, 500.0)
+    coarse_b = OffsetSample('coarse_b', 400.0, 40.0, 500.0)
+    assert Timer._weighted_median([coarse_a, precise, coarse_b]) is precise
+
+    # 误差相同时即普通中位数
+    samples = [OffsetSample(str(i), float(offset), 10.0, 10.0) for i, offset in enumerate([30, -5, 12])]
+    assert Timer._weighted_median(samples).offset == 12.0
+    assert Timer._weighted_median(samples[:1]) is samples[0]
+
+    # 误差小于1ms按1ms计，避免权重无限大
+    exact = OffsetSample('exact', 0.0, 0.0, 0.0)
+    near = [OffsetSample('n{}'.format(i), 5.0, 1.0, 1.0) for i in range(2)]
+    assert Timer._weighted_median([exact] + near).offset == 5.0
+
+
+if __name__ == "__main__":
+    test_quorum_cancels_slow_source()
+    test_failing_source_ignored()
+    test_timeout_returns_partial_results()
+    test_weighted_median()
+    print("[OK] 多时间源并发校时测试通过")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试校时与触发精度（使用本地模拟时间服务器，无需网络）
+详细的百分位数对比见 tests/benchmark/bench_timer_precision.py
+"""
+
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+# 添加项目根目录与benchmark目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'tests', 'benchmark'))
+
+from fake_clock_server import FakeClockServer
+
+
+def _make_timer(server):
+    from maotai.timer import Timer
+    timer = Timer(sync=False)
+    timer.sync_url = server.url
+    return timer
+
+
+def test_date_edge_offset():
+    """Date头边沿检测应恢复到毫秒级的时间差"""
+    with FakeClockServer(skew_ms=random.uniform(-1500.0, 1500.0)) as server:
+        timer = _make_timer(server)
+        sample = timer.measure_offset_by_date_edge()
+        assert sample is not None
+        error = sample.offset - (-server.skew_ms)
+        print(f"边沿检测误差: {error:.3f}ms (声明误差 ±{sample.error:.3f}ms)")
+        assert abs(error) <= sample.error + 2.0
+
+
+def test_multi_sample_offset():
+    """Date头多次采样的误差应在声明的误差范围内"""
+    with FakeClockServer(skew_ms=random.uniform(-1500.0, 1500.0), latency_ms=20.0) as server:
+        timer = _make_timer(server)
+        samples = timer._sample_source(timer._get_jd_time_from_page, 5)
+        best = timer._select_best_sample(samples)
+        error = best.offset - (-server.skew_ms)
+        print(f"多次采样误差: {error:.3f}ms (声明误差 ±{best.error:.3f}ms)")
+        assert abs(error) <= best.error + 2.0
+
+
+def test_precise_wake_error():
+    """高精度触发的唤醒误差中位数应小于1ms（个别次数可能受系统调度影响）"""
+    with FakeClockServer() as server:
+        timer = _make_timer(server)
+        timer.trigger_mode = 'precise'
+        for _ in range(5):
+            timer.set_buy_time(datetime.now() + timedelta(milliseconds=100))
+            timer.start()
+        print(f"唤醒误差: {['%.3f' % e for e in timer.wake_errors]}")
+        errors = sorted(abs(e) for e in timer.wake_errors)
+        assert errors[len(errors) // 2] < 1.0
+        assert errors[-1] < 10.0
+
+
+if __name__ == "__main__":
+    test_date_edge_offset()
+    test_multi_sample_offset()
+    test_precise_wake_error()
+    print("[OK] 校时与触发精度测试通过")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试抢购连接池适配器（使用本地模拟服务器，无需网络）
+"""
+
+import os
+import sys
+import time
+import pickle
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# 添加项目根目录与benchmark目录到sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'tests', 'benchmark'))
+
+from fake_clock_server import FakeClockServer
+from maotai.transport import (TunedHTTPAdapter, mount_tuned_adapter, diff_connection_stats, ConnectionWarmer,
+                              HostResolver)
+
+
+def _host(server):
+    return server.url.split('//')[1].rstrip('/')
+
+
+def test_socket_options():
+    """连接应开启TCP_NODELAY与SO_KEEPALIVE"""
+    with FakeClockServer() as server:
+        session = requests.Session()
+        adapter = mount_tuned_adapter(session, 4, hosts=(_host(server),))
+        session.get(server.url, timeout=3)
+        pool = next(iter(adapter.poolmanager.pools._container.values()))
+        conn = pool.pool.get_nowait()
+        assert conn.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert conn.sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+
+
+def test_pool_reuse_under_concurrency():
+    """并发数不超过连接池大小时，预热后的请求全部复用已有连接"""
+    workers = 12
+    with FakeClockServer(latency_ms=20.0) as server:
+        session = requests.Session()
+        adapter = mount_tuned_adapter(session, workers, hosts=(_host(server),))
+        barrier = threading.Barrier(workers)
+
+        def warm(_):
+            barrier.wait()
+            return session.get(server.url, timeout=3)
+
+        with ThreadPoolExecutor(workers) as pool:
+            # 所有线程同时发出请求，建立workers个连接
+            list(pool.map(warm, range(workers)))
+            before = adapter.connection_stats()
+            list(pool.map(lambda _: session.get(server.url, timeout=3), range(workers * 5)))
+        delta = diff_connection_stats(before, adapter.connection_stats())
+        print(f"连接统计: {adapter.connection_stats()}，预热后增量: {delta}")
+        item = delta[server.url.split('//')[1].split(':')[0]]
+        assert item['connections'] == 0
+        assert item['reused'] == workers * 5
+
+
+def test_adapter_pickle():
+    """多进程抢购会序列化Session，适配器配置需保留"""
+    adapter = TunedHTTPAdapter(pool_maxsize=20)
+    restored = pickle.loads(pickle.dumps(adapter))
+    assert restored._pool_maxsize == 20
+    assert restored.socket_options == adapter.socket_options
+    assert restored.poolmanager.connection_pool_kw['socket_options'] == adapter.socket_options
+
+
+def test_connection_warmer():
+    """预热并保活到触发时刻后，抢购请求复用预热的连接"""
+    connections = 3
+    with FakeClockServer(latency_ms=10.0) as server:
+        session = requests.Session()
+        adapter = mount_tuned_adapter(session, connections, hosts=(_host(server),))
+        warmer = ConnectionWarmer(session, [server.url], connections=connections, keepalive_interval=0.3)
+        deadline_ns = time.monotonic_ns() + int(1.5e9)
+        warmer.start(deadline_ns, warm_seconds=1.0, stop_margin=0.2)
+        time.sleep((deadline_ns - time.monotonic_ns()) / 1e9)
+        warmer.stop()
+        before = adapter.connection_stats()
+        with ThreadPoolExecutor(connections) as pool:
+            list(pool.map(lambda _: session.get(server.url, timeout=3), range(connections * 4)))
+        delta = diff_connection_stats(before, adapter.connection_stats())
+        host = server.url.split('//')[1].split(':')[0]
+        print(f"预热 {warmer.warmed}，保活 {warmer.rounds} 轮，触发后增量: {delta}")
+        assert warmer.rounds >= 2
+        assert warmer.warmed[host] == connections
+        assert delta[host]['connections'] == 0
+
+
+def test_host_resolver():
+    """只有可达的IP参与排序"""
+    with FakeClockServer() as server:
+        port = int(_host(server).split(':')[1])
+        resolver = HostResolver(hosts=('localhost',), port=port, probes=2)
+        pinned = resolver.rank()
+        print(f"排序结果: {resolver.ranking}")
+        assert pinned == {'localhost': '127.0.0.1'}
+
+
+def test_pinned_ip_keeps_host():
+    """固定IP后连接到该IP，Host头仍为域名"""
+    with FakeClockServer() as server:
+        port = int(_host(server).split(':')[1])
+        host = 'seckill.pinned.invalid'
+        session = requests.Session()
+        adapter = mount_tuned_adapter(session, 4, hosts=('{}:{}'.format(host, port),), pinned_ips={host: '127.0.0.1'})
+        resp = session.get('http://{}:{}/'.format(host, port), timeout=3)
+        assert resp.status_code == 200
+        assert server.last_headers.get('Host') == '{}:{}'.format(host, port)
+        # 序列化后固定的IP保留
+        restored = pickle.loads(pickle.dumps(adapter))
+        assert restored.poolmanager.pinned_ips == {host: '127.0.0.1'}
+
+
+if __name__ == "__main__":
+    test_socket_options()
+    test_pool_reuse_under_concurrency()
+    test_adapter_pickle()
+    test_connection_warmer()
+    test_host_resolver()
+    test_pinned_ip_keeps_host()
+    print("[OK] 连接池适配器测试通过")
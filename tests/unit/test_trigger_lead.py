@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试提前触发量：针对触发后第一个请求的域名（itemko）测量，优先使用历史抢购中该阶段的首轮单向延迟，
+不超过风控策略的提前上限，测量失败时不提前（不发送网络请求）
+"""
+
+import os
+import sys
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def _make_seckill(history_file, measured=(15.0, 30.0)):
+    from maotai.jd_spider_requests import JdSeckill
+    from maotai.timer import Timer
+    from maotai.calibration import CampaignRecorder
+    seckill = JdSeckill.__new__(JdSeckill)
+    seckill.timers = Timer(sync=False)
+    seckill.timers.set_buy_time(datetime.now() + timedelta(minutes=1))
+    seckill.campaign_recorder = CampaignRecorder(history_file)
+    seckill.measured_urls = []
+
+    def measure(url='https://marathon.jd.com/', samples=5):
+        seckill.measured_urls.append(url)
+        return measured
+    seckill.measure_one_way_latency = measure
+    return seckill
+
+
+def _write_history(history_file, stage_rtts):
+    """写入一次历史抢购：每个阶段若干个往返耗时为rtt的请求"""
+    with open(history_file, 'w', encoding='utf-8') as f:
+        send_ms = 1700000000000.0
+        for stage, rtt in stage_rtts:
+            for _ in range(5):
+                f.write(json.dumps({'campaign': '20240101100000-1', 'stage': stage, 'send_ms': send_ms,
+                                    'recv_ms': send_ms + rtt, 'server_date_ms': None}) + '\n')
+                send_ms += 10
+
+
+def test_lead_uses_measurement_and_limit():
+    with tempfile.TemporaryDirectory() as directory:
+        history_file = os.path.join(directory, 'timing_history.jsonl')
+        seckill = _make_seckill(history_file)
+        assert seckill.apply_trigger_lead({'advance_time_limit': 0.8}) == 15.0
+        assert seckill.measured_urls == ['https://itemko.jd.com/']
+        assert seckill.timers.lead_ms == 15.0
+        assert seckill.timers.trigger_time_ms() == seckill.timers.buy_time_ms - 15.0
+        assert seckill.trigger_lead_info['measured_one_way_ms'] == 15.0
+        assert seckill.trigger_lead_info['history_one_way_ms'] is None
+
+        # 不超过风控策略的提前上限
+        seckill = _make_seckill(history_file, measured=(500.0, 1000.0))
+        assert seckill.apply_trigger_lead({'advance_time_limit': 0.2}) == 200.0
+        assert seckill.trigger_lead_info['one_way_ms'] == 500.0
+
+        # 测量失败且无历史时不提前
+        seckill = _make_seckill(history_file, measured=(None, None))
+        assert seckill.apply_trigger_lead({'advance_time_limit': 0.8}) == 0.0
+        assert seckill.timers.trigger_time_ms() == seckill.timers.buy_time_ms
+
+
+def test_lead_prefers_history_of_first_request():
+    """历史中itemko轮询单向延迟40ms，marathon请求10ms：提前量取itemko的40ms"""
+    with tempfile.TemporaryDirectory() as directory:
+        history_file = os.path.join(directory, 'timing_history.jsonl')
+        _write_history(history_file, [('seckill_url', 80.0), ('checkout', 20.0), ('submit', 20.0)])
+        seckill = _make_seckill(history_file)
+        assert seckill.apply_trigger_lead({'advance_time_limit': 0.8}) == 40.0
+        assert seckill.trigger_lead_info['history_one_way_ms'] == 40.0
+        assert seckill.trigger_lead_info['measured_one_way_ms'] == 15.0
+
+
+if __name__ == "__main__":
+    test_lead_uses_measurement_and_limit()
+    test_lead_prefers_history_of_first_request()
+    print("[OK] 提前触发量测试通过")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试抢购子进程的启动数据：WorkerContext序列化后很小，子进程据此重建的JdSeckill
+沿用父进程的Cookie、固定IP、京东时间与提前量，且不包含安全配置等对象（不发送网络请求）
+"""
+
+import os
+import sys
+import time
+import pickle
+from datetime import datetime, timedelta
+
+# 添加项目根目录到sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from maotai.worker_context import WorkerContext
+
+
+def make_context():
+    return WorkerContext(
+        sku_id='100012043978',
+        seckill_num='2',
+        user_agent='Mozilla/5.0 test',
+        cookies=(('pt_key', 'key-value', '.jd.com', '/', True, None),
+                 ('pt_pin', 'jd_user', '.jd.com', '/', False, int(time.time()) + 3600)),
+        pinned_ips=(('marathon.jd.com', '10.0.0.1'),),
+        buy_time=datetime.now().replace(microsecond=0) + timedelta(hours=1),
+        jd_offset_ms=-1500.0,
+        lead_ms=12.5,
+        trigger_lead_info=(('lead_ms', 12.5), ('one_way_ms', 12.5)),
+        payment_password='123456',
+    )
+
+
+def test_context_is_small_and_immutable():
+    context = make_context()
+    payload = pickle.dumps(context)
+    print(f"WorkerContext序列化 {len(payload)} 字节")
+    assert len(payload) < 2048
+    assert pickle.loads(payload) == context
+    try:
+        context.sku_id = '1'
+        assert False, 'WorkerContext应不可修改'
+    except AttributeError:
+        pass
+
+
+def test_rebuild_in_worker():
+    """重建的JdSeckill沿用父进程的状态，且只包含抢购所需的对象"""
+    context = make_context()
+    seckill = pickle.loads(pickle.dumps(context)).build()
+
+    cookies = seckill.session.cookies
+    assert cookies.get('pt_key', domain='.jd.com') == 'key-value'
+    assert cookies.get('pt_pin', domain='.jd.com') == 'jd_user'
+    assert seckill.spider_session.pinned_ips == {'marathon.jd.com': '10.0.0.1'}
+    assert seckill.qrlogin is None and seckill.secure_config is None and seckill.device_collector is None
+    assert seckill.get_secure_payment_password(required=False) == '123456'
+
+    timers = seckill.timers
+    assert abs(timers.jd_now_ms() - (time.time() * 1000.0 + 1500.0)) < 50
+    assert timers.buy_time == context.buy_time and timers.lead_ms == 12.5
+    assert timers.trigger_time_ms() == timers.buy_time_ms - 12.5
+    assert seckill.trigger_lead_info == {'lead_ms': 12.5, 'one_way_ms': 12.5}
+
+    # 子进程据此再生成的WorkerContext与原始数据一致
+    rebuilt = WorkerContext.from_seckill(seckill)
+    assert rebuilt._replace(jd_offset_ms=0.0) == context._replace(jd_offset_ms=0.0, cookies=rebuilt.cookies)
+    assert sorted(rebuilt.cookies) == sorted(context.cookies)
+    assert abs(rebuilt.jd_offset_ms - context.jd_offset_ms) < 50
+
+
+if __name__ == "__main__":
+    test_context_is_small_and_immutable()
+    test_rebuild_in_worker()
+    print("[OK] 抢购子进程启动数据测试通过")